@@ -0,0 +1,123 @@
+"""
+Distributed run check: several `python main.py worker` processes sharing one work queue.
+
+Serves a generated corpus from the local stand-in, fills a queue file in a temporary
+directory and launches `--workers` worker processes against it (every player profile
+is fetched, so there is enough work to share). While the run is in progress
+`--uccidi` of the workers are killed with SIGKILL: the items they had leased must
+expire after `--visibilita` seconds and be finished by the others. The run is first
+timed with a single worker for comparison. Exits with status 1 if a team file is
+missing or incomplete, or if an item ended up failed.
+
+Usage:
+    python -m benchmarks.bench_distributed [--workers N] [--thread N] [--squadre N] [--giocatori N]
+                                           [--latenza S] [--visibilita S] [--uccidi N]
+"""
+import argparse
+import csv
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import build_corpus, competition_urls
+from benchmarks.server import StandInServer
+from src.processing.distributed import riempi_coda
+from src.utils.work_queue import WorkQueue
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LEAGUES = {"serie a": "IT1", "premier league": "GB1"}
+
+
+def esegui(server, cartella, workers, thread, visibilita, uccidi=0):
+    """
+    Fills the queue in `cartella` and runs `workers` worker processes until it is empty, killing `uccidi` of them
+    once a quarter of the players are done. Returns (seconds, counts per (tipo, stato), items claimed more than once).
+    """
+    percorso = os.path.join(cartella, "data", "coda.sqlite")
+    coda = WorkQueue(percorso, visibilita=visibilita)
+    coda.imposta_parametri({"base_url": server.base_url, "rosa_dettagliata": False})
+    riempi_coda(coda, competition_urls(server.base_url, LEAGUES), ["2024"])
+    comando = [
+        sys.executable, os.path.join(ROOT, "main.py"), "worker", "--coda", percorso, "--thread", str(thread),
+        "--richieste-al-secondo", "1000", "--visibilita", str(visibilita),
+    ]
+    inizio = time.perf_counter()
+    with open(os.path.join(cartella, "worker.log"), "w") as log:
+        processi = [subprocess.Popen(comando, cwd=cartella, stdout=log, stderr=log) for _ in range(workers)]
+        if uccidi:
+            totale = len([p for p in server.pages if "/profil/spieler/" in p])
+            while coda.conteggi().get(("giocatore", "fatto"), 0) < totale // 4:
+                time.sleep(0.05)
+            for processo in processi[:uccidi]:
+                os.kill(processo.pid, signal.SIGKILL)
+        for processo in processi:
+            processo.wait()
+    tempo = time.perf_counter() - inizio
+    conteggi = coda.conteggi()
+    coda.chiudi()
+    db = sqlite3.connect(percorso)
+    ripresi = db.execute("SELECT COUNT(*) FROM lavori WHERE tentativi > 1").fetchone()[0]
+    db.close()
+    return tempo, conteggi, ripresi
+
+
+def verifica(cartella, squadre, giocatori):
+    """
+    Returns the problems found in the team files written by the run.
+    """
+    problemi = []
+    for campionato in LEAGUES:
+        cartella_stagione = os.path.join(cartella, "data", "raw", campionato, "2024")
+        nomi = sorted(os.listdir(cartella_stagione)) if os.path.isdir(cartella_stagione) else []
+        nomi = [nome for nome in nomi if os.path.isdir(os.path.join(cartella_stagione, nome))]
+        if len(nomi) != squadre:
+            problemi.append(f"{campionato}: {len(nomi)} squadre invece di {squadre}")
+        for nome in nomi:
+            percorso = os.path.join(cartella_stagione, nome, "informazioni_giocatori.csv")
+            if not os.path.isfile(percorso):
+                problemi.append(f"{nome}: file dei dettagli mancante")
+                continue
+            with open(percorso, encoding="utf-8", newline="") as f:
+                righe = list(csv.DictReader(f))
+            if len(righe) != giocatori or any(not riga["cognome"] for riga in righe):
+                problemi.append(f"{nome}: {len(righe)} righe, non tutte complete")
+    return problemi
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--thread", type=int, default=2)
+    parser.add_argument("--squadre", type=int, default=6)
+    parser.add_argument("--giocatori", type=int, default=20)
+    parser.add_argument("--latenza", type=float, default=0.05, help="secondi di latenza per risposta")
+    parser.add_argument("--visibilita", type=float, default=3, help="secondi di lease dei lavori")
+    parser.add_argument("--uccidi", type=int, default=1, help="worker uccisi durante il run")
+    args = parser.parse_args()
+
+    pages = build_corpus(args.squadre, args.giocatori, seasons=("2024",), leagues=LEAGUES)
+    esito = 0
+    with StandInServer(pages, args.latenza) as server:
+        for workers, uccidi in [(1, 0), (args.workers, args.uccidi)]:
+            with tempfile.TemporaryDirectory() as cartella:
+                tempo, conteggi, ripresi = esegui(server, cartella, workers, args.thread, args.visibilita, uccidi)
+                problemi = verifica(cartella, args.squadre, args.giocatori)
+                falliti = sum(n for (_, stato), n in conteggi.items() if stato == "fallito")
+                giocatori = conteggi.get(("giocatore", "fatto"), 0)
+                print(
+                    f"{workers} worker ({uccidi} uccisi): {tempo:6.2f} s  {giocatori / tempo:7.1f} giocatori/s  "
+                    f"{ripresi} lavori ripresi  {falliti} falliti"
+                )
+                for problema in problemi:
+                    print(f"  {problema}")
+                if problemi or falliti:
+                    esito = 1
+    sys.exit(esito)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Memory check: peak traced memory per in-flight page while player profiles are fetched concurrently.
+
+Fetches the player pages of a generated corpus from the local stand-in with
+`--workers` threads and measures with tracemalloc the peak memory above the
+baseline, divided by the number of pages in flight. The run is repeated with the
+parse trees torn down after extraction (the scraper's behaviour), without it
+(trees left to the garbage collector) and with a MemoryBudget. Exits with status 1
+if the peak per in-flight page of the scraper exceeds `--limite-kb`, or if the
+peak of the run with the budget exceeds the budget.
+
+Usage:
+    python -m benchmarks.bench_memory [--workers N] [--squadre N] [--giocatori N] [--latenza S] [--limite-kb KB] [--budget-mb MB]
+"""
+import argparse
+import contextlib
+import gc
+import sys
+import time
+import tracemalloc
+from unittest import mock
+
+from benchmarks.corpus import build_corpus
+from benchmarks.server import StandInServer
+from src.scraping.scraper import TransfermarktScraper
+from src.utils.memory_budget import MemoryBudget
+from src.utils.rate_limiter import TokenBucket
+
+
+def misura(base_url, percorsi, workers, rilascio=True, budget=None):
+    """
+    Fetches and parses every player page with `workers` pages in flight.
+    Returns (peak KB above the baseline, seconds).
+    """
+    scraper = TransfermarktScraper(
+        base_url=base_url, rate_limiter=TokenBucket(rate=float("inf")), pool_size=workers, memory_budget=budget
+    )
+    url = [base_url + percorso for percorso in percorsi]
+    # Riscaldamento: connessioni, cache delle regex e metriche già allocate prima della misura
+    list(scraper.iter_player_details(url[:workers], workers))
+    patch = mock.patch("src.scraping.scraper.release_soup", lambda soup: None) if not rilascio else contextlib.nullcontext()
+    gc.collect()
+    with patch:
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        inizio = time.perf_counter()
+        for _, record in scraper.iter_player_details(url, workers):
+            assert record["cognome"] is not None
+        tempo = time.perf_counter() - inizio
+        picco = tracemalloc.get_traced_memory()[1] - base
+        tracemalloc.stop()
+    return picco / 1024, tempo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--squadre", type=int, default=8)
+    parser.add_argument("--giocatori", type=int, default=25)
+    parser.add_argument("--latenza", type=float, default=0.02, help="secondi di latenza per risposta")
+    parser.add_argument("--limite-kb", type=float, default=512, help="picco massimo per pagina in corso")
+    parser.add_argument("--budget-mb", type=float, default=2, help="budget della terza misura")
+    args = parser.parse_args()
+
+    pages = build_corpus(args.squadre, args.giocatori, seasons=("2024",), leagues={"serie a": "IT1"})
+    percorsi = sorted(percorso for percorso in pages if "/profil/spieler/" in percorso)
+    budget = MemoryBudget(args.budget_mb)
+    esito = 0
+    with StandInServer(pages, args.latenza) as server:
+        for nome, opzioni in [
+            ("rilascio", {}),
+            ("senza rilascio", {"rilascio": False}),
+            (f"budget {args.budget_mb:g} MB", {"budget": budget}),
+        ]:
+            picco, tempo = misura(server.base_url, percorsi, args.workers, **opzioni)
+            print(
+                f"{nome:16} picco {picco:9.0f} KB  per pagina in corso {picco / args.workers:7.0f} KB  "
+                f"{len(percorsi) / tempo:7.1f} pagine/s"
+            )
+            if nome == "rilascio" and picco / args.workers > args.limite_kb:
+                print(f"  oltre il limite di {args.limite_kb:g} KB per pagina in corso")
+                esito = 1
+            if "budget" in opzioni and picco * 1024 > budget.limite:
+                print(f"  oltre il budget di {args.budget_mb:g} MB")
+                esito = 1
+    print(f"budget: picco stimato {budget.picco / 1024:.0f} KB, {budget.attese} attese")
+    sys.exit(esito)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Micro-benchmark: extraction time per player page, label-by-label scans vs the one-pass label index.
+
+Usage:
+    python -m benchmarks.bench_parse_player [--ripetizioni N]
+"""
+import argparse
+import os
+import re
+import time
+
+from bs4 import BeautifulSoup
+
+from src.scraping.scraper import TransfermarktScraper
+from src.utils.scraper_utils import (
+    extract_altri_ruoli,
+    extract_nationalities,
+    extract_player_details_from_header,
+    extract_value_from_div,
+    find_label_content,
+)
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "giocatore.html")
+
+
+def estrazione_per_etichetta(soup):
+    """
+    Reference implementation of the previous extraction: one regex compile and one scan
+    of the info table for every label.
+    """
+    dettagli = extract_player_details_from_header(soup.find("h1", class_="data-header__headline-wrapper"))
+    info_table = soup.select_one("div.info-table.info-table--right-space")
+    for campo, etichetta in [
+        ("nato_il", r"Nato il:"),
+        ("luogo_nascita", r"Luogo di nascita:"),
+        ("altezza", r"Altezza:"),
+        ("posizione", r"Posizione:"),
+        ("piede", r"Piede:"),
+        ("squadra_attuale", r"Squadra attuale:"),
+        ("in_rosa_da", r"In rosa da:"),
+        ("scadenza", r"Scadenza:"),
+    ]:
+        dettagli[campo] = find_label_content(info_table, etichetta)
+    nazionalita_span = info_table.find("span", string=re.compile(r"Nazionalità:", re.I))
+    if nazionalita_span:
+        dettagli["nazionalità"] = extract_nationalities(
+            nazionalita_span.find_next_sibling("span", class_="info-table__content--bold")
+        )
+    detail_position = soup.find("div", class_="detail-position__box")
+    dettagli["ruolo_naturale"] = find_label_content(detail_position, r"Ruolo naturale:")
+    dettagli["altri_ruoli"] = extract_altri_ruoli(detail_position)
+    valore_div = soup.find("div", class_=re.compile(r"\bcurrent-and-max\b"))
+    dettagli["valore_attuale"] = extract_value_from_div(valore_div, re.compile(r"\bcurrent-value\b"))
+    max_div = valore_div.find("div", class_=re.compile(r"\bmax\b"))
+    dettagli["valore_piu_alto"] = extract_value_from_div(max_div, re.compile(r"\bmax-value\b"))
+    return dettagli
+
+
+def misura(funzione, soup, ripetizioni):
+    inizio = time.perf_counter()
+    for _ in range(ripetizioni):
+        funzione(soup)
+    return (time.perf_counter() - inizio) / ripetizioni * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ripetizioni", type=int, default=500)
+    args = parser.parse_args()
+
+    with open(FIXTURE, encoding="utf-8") as f:
+        soup = BeautifulSoup(f.read(), "html.parser")
+    scraper = TransfermarktScraper()
+
+    prima = misura(estrazione_per_etichetta, soup, args.ripetizioni)
+    dopo = misura(scraper.parse_player_details, soup, args.ripetizioni)
+    print(f"estrazione per etichetta (prima): {prima:.3f} ms/pagina")
+    print(f"indice delle etichette (dopo):    {dopo:.3f} ms/pagina")
+    print(f"speedup: {prima / dopo:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Benchmark: parse + extraction time per page for each parser backend, full vs restricted parsing.
+
+Usage:
+    python -m benchmarks.bench_parser_backend [--ripetizioni N]
+"""
+import argparse
+import os
+import time
+
+from src.scraping.scraper import TransfermarktScraper
+from src.utils.scraper_utils import PARSER_BACKENDS, available_parser
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+PAGINE = [
+    ("giocatore", "giocatore.html", lambda scraper, soup: scraper.parse_player_details(soup)),
+    ("squadra", "squadra.html", lambda scraper, soup: scraper.parse_squad(soup)),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ripetizioni", type=int, default=100)
+    args = parser.parse_args()
+
+    backends = [b for b in PARSER_BACKENDS if available_parser(b) == b]
+    for tipo, nome_file, estrai in PAGINE:
+        with open(os.path.join(FIXTURES, nome_file), encoding="utf-8") as f:
+            html = f.read()
+        risultati = {}
+        for backend in backends:
+            for ristretto in (False, True):
+                scraper = TransfermarktScraper(parser=backend, restricted_parsing=ristretto)
+                inizio = time.perf_counter()
+                for _ in range(args.ripetizioni):
+                    record = estrai(scraper, scraper.make_soup(html, tipo))
+                ms = (time.perf_counter() - inizio) / args.ripetizioni * 1000
+                risultati[(backend, ristretto)] = record
+                print(f"{tipo:10} {backend:12} {'ristretto' if ristretto else 'completo':10} {ms:8.3f} ms/pagina")
+        # Tutte le combinazioni devono estrarre gli stessi dati
+        assert len({repr(r) for r in risultati.values()}) == 1, f"risultati diversi tra i backend per {tipo}"
+
+
+if __name__ == "__main__":
+    main()
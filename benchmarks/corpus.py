@@ -0,0 +1,241 @@
+"""
+Page corpus for the offline benchmarks: competition, team and player pages keyed by path.
+
+`build_corpus` generates a deterministic corpus with the markup of transfermarkt.it
+(the fixtures in benchmarks/fixtures come from it); `load_corpus_from_cache` replays
+the pages recorded by a real run in the PageCache instead.
+"""
+import random
+import unicodedata
+from urllib.parse import urlsplit
+
+from src.utils.page_cache import PageCache
+
+NOMI = ["Marco", "Luca", "Davide", "Federico", "Alessandro", "Nicolò", "Sandro", "Jean", "Pierre", "Mike", "Rafael", "Theo", "Lukas", "Kai", "Joshua"]
+COGNOMI = ["Rossi", "Bianchi", "Barella", "Tonali", "Maignan", "Leão", "Hernández", "Müller", "Kimmich", "Havertz", "Dubois", "Martin", "García", "López", "Silva"]
+POSIZIONI = [
+    ("Portiere", "Portiere"),
+    ("Difensore centrale", "Difesa"),
+    ("Terzino sinistro", "Difesa"),
+    ("Terzino destro", "Difesa"),
+    ("Mediano", "Centrocampo"),
+    ("Centrale", "Centrocampo"),
+    ("Trequartista", "Centrocampo"),
+    ("Ala sinistra", "Attacco"),
+    ("Ala destra", "Attacco"),
+    ("Punta centrale", "Attacco"),
+]
+NAZIONI = ["Italia", "Francia", "Germania", "Spagna", "Portogallo", "Brasile", "Argentina", "Inghilterra"]
+PIEDI = ["destro", "sinistro", "ambidestro"]
+CAMPIONATI = {
+    "serie a": "IT1",
+    "premier league": "GB1",
+    "la liga": "ES1",
+    "bundesliga": "L1",
+    "ligue 1": "FR1",
+}
+
+PAGE_HEAD = """<!DOCTYPE html>
+<html lang="it"><head><meta charset="utf-8"><title>{title} | Transfermarkt</title>
+<script>window.dataLayer = window.dataLayer || [];{padding}</script>
+<link rel="stylesheet" href="/css/main.css"></head>
+<body><nav class="main-navbar">{nav}</nav><!-- ad slot --><div class="ad-container">{ads}</div>
+<main>"""
+PAGE_FOOT = """</main><footer class="footer">{nav}</footer><script>{padding}</script></body></html>"""
+
+
+def _chrome(rng):
+    nav = "".join(f'<a href="/link/{i}">Voce di menu {i}</a>' for i in range(120))
+    ads = "".join(f'<div class="ad" data-slot="{i}"><iframe src="about:blank"></iframe></div>' for i in range(20))
+    padding = "var x=" + "1;" * 3000
+    return nav, ads, padding
+
+
+def _slug(*parts):
+    text = "-".join(parts).lower()
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+
+
+def _money(rng, lo, hi):
+    value = rng.uniform(lo, hi)
+    if value >= 1:
+        return f"€ {value:.2f}".replace(".", ",") + " mln"
+    return f"€ {int(value * 1000)} mila"
+
+
+def _date(rng, y0, y1):
+    return f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(y0, y1)}"
+
+
+def build_corpus(num_teams=20, players_per_team=26, seed=7, seasons=("2024",), leagues=None):
+    """
+    Returns a dict path -> html for a full corpus: `num_teams` teams per league, each
+    with a compact and a detailed roster of `players_per_team` players and their profiles.
+
+    Player ids are global so the same profile can appear in several seasons.
+    """
+    rng = random.Random(seed)
+    nav, ads, padding = _chrome(rng)
+    pages = {}
+    player_id = 100000
+    leagues = leagues or CAMPIONATI
+    players_by_slot = {}
+    team_counter = 0
+    for nome, code in leagues.items():
+        slug = nome.replace(" ", "-")
+        teams = []
+        for t in range(num_teams):
+            team_counter += 1
+            teams.append((f"squadra-{code.lower()}-{t}", f"Squadra {code} {t}", team_counter))
+        for stagione in seasons:
+            rows = "".join(
+                f'<tr class="{"odd" if i % 2 == 0 else "even"}"><td class="zentriert no-border-rechts"><a href="/{ts}/startseite/verein/{tid}/saison_id/{stagione}"><img src="/logo/{tid}.png" title="{tn}"></a></td>'
+                f'<td class="hauptlink no-border-links"><a title="{tn}" href="/{ts}/startseite/verein/{tid}/saison_id/{stagione}">{tn}</a></td>'
+                f'<td class="zentriert"><a href="/{ts}/kader/verein/{tid}/saison_id/{stagione}">{players_per_team}</a></td>'
+                f'<td class="rechts"><a href="/{ts}/kader/verein/{tid}/saison_id/{stagione}">€ 300,00 mln</a></td></tr>'
+                for i, (ts, tn, tid) in enumerate(teams)
+            )
+            body = (
+                f'<div class="data-header"><h1 class="data-header__headline-wrapper">{nome.title()}</h1></div>'
+                f'<div class="responsive-table"><div class="grid-view"><table class="items"><thead><tr><th>Club</th><th>Nome</th><th>Rosa</th><th>Valore</th></tr></thead>'
+                f"<tbody>{rows}</tbody></table></div></div>"
+            )
+            html = PAGE_HEAD.format(title=nome, nav=nav, ads=ads, padding=padding) + body + PAGE_FOOT.format(nav=nav, padding=padding)
+            pages[f"/{slug}/startseite/wettbewerb/{code}/plus/?saison_id={stagione}"] = html
+            if stagione == seasons[-1]:
+                pages[f"/{slug}/startseite/wettbewerb/{code}"] = html
+
+            for ts, tn, tid in teams:
+                squad = []
+                for p in range(players_per_team):
+                    slot = (tid, p)
+                    # Most players stay with the team across seasons
+                    if slot not in players_by_slot or rng.random() < 0.15:
+                        player_id += 1
+                        players_by_slot[slot] = (player_id, f"{rng.choice(NOMI)}", f"{rng.choice(COGNOMI)}", rng.choice(POSIZIONI), rng.sample(NAZIONI, rng.choice([1, 1, 2])))
+                    squad.append(players_by_slot[slot])
+                pages.update(_team_pages(rng, ts, tn, tid, stagione, squad, nav, ads, padding, latest=stagione == seasons[-1]))
+                for pid, n, c, pos, naz in squad:
+                    pages[f"/{_slug(n, c)}/profil/spieler/{pid}"] = _player_page(random.Random(pid), pid, n, c, pos, naz, tn, tid, ts, nav, ads, padding)
+    return pages
+
+
+def _team_pages(rng, ts, tn, tid, stagione, squad, nav, ads, padding, latest):
+    pages = {}
+    compact_rows = []
+    detailed_rows = []
+    for i, (pid, n, c, pos, naz) in enumerate(squad):
+        prng = random.Random(pid)
+        href = f"/{_slug(n, c)}/profil/spieler/{pid}"
+        birth = _date(prng, 1990, 2005)
+        age = 2024 - int(birth[-4:])
+        height = f"{prng.uniform(1.65, 1.98):.2f}".replace(".", ",") + " m"
+        foot = prng.choice(PIEDI)
+        joined = _date(prng, 2018, 2024)
+        contract = _date(prng, 2025, 2029)
+        value = _money(prng, 0.3, 90)
+        flags = "".join(f'<img src="/flag/{x}.png" title="{x}" alt="{x}" class="flaggenrahmen">' for x in naz)
+        cls = "odd" if i % 2 == 0 else "even"
+        player_cell = (
+            f'<td class="posrela"><table class="inline-table"><tr><td rowspan="2"><img src="/portrait/{pid}.jpg" title="{n} {c}" class="bilderrahmen-fixed"></td>'
+            f'<td class="hauptlink"><a href="{href}">{n} {c}</a></td></tr><tr><td>{pos[0]}</td></tr></table></td>'
+        )
+        compact_rows.append(
+            f'<tr class="{cls}"><td class="zentriert rueckennummer bg_{pos[1]}"><div class="rn_nummer">{i + 1}</div></td>{player_cell}'
+            f'<td class="zentriert">{birth} ({age})</td><td class="zentriert">{flags}</td>'
+            f'<td class="rechts hauptlink"><a href="/{_slug(n, c)}/marktwertverlauf/spieler/{pid}">{value}</a></td></tr>'
+        )
+        detailed_rows.append(
+            f'<tr class="{cls}"><td class="zentriert rueckennummer bg_{pos[1]}"><div class="rn_nummer">{i + 1}</div></td>{player_cell}'
+            f'<td class="zentriert">{birth} ({age})</td><td class="zentriert">{flags}</td>'
+            f'<td class="zentriert">{height}</td><td class="zentriert">{foot}</td><td class="zentriert">{joined}</td>'
+            f'<td class="zentriert"><a title="Club precedente" href="/verein/1"><img src="/logo/1.png"></a></td>'
+            f'<td class="zentriert">{contract}</td>'
+            f'<td class="rechts hauptlink"><a href="/{_slug(n, c)}/marktwertverlauf/spieler/{pid}">{value}</a></td></tr>'
+        )
+    head = PAGE_HEAD.format(title=tn, nav=nav, ads=ads, padding=padding)
+    foot = PAGE_FOOT.format(nav=nav, padding=padding)
+    header = f'<div class="data-header"><h1 class="data-header__headline-wrapper">{tn}</h1></div>'
+    compact = (
+        header + '<div class="responsive-table"><table class="items"><thead><tr><th>#</th><th>Giocatore</th><th>Nato il/Età</th><th>Naz.</th><th>Valore di mercato</th></tr></thead>'
+        f'<tbody>{"".join(compact_rows)}</tbody></table></div>'
+    )
+    detailed = (
+        header + '<div class="responsive-table"><table class="items"><thead><tr><th>#</th><th>Giocatore</th><th>Nato il/Età</th><th>Naz.</th><th>Altezza</th><th>Piede</th>'
+        '<th>In rosa da</th><th>Prima</th><th>Contratto</th><th>Valore di mercato</th></tr></thead>'
+        f'<tbody>{"".join(detailed_rows)}</tbody></table></div>'
+    )
+    pages[f"/{ts}/startseite/verein/{tid}/saison_id/{stagione}"] = head + compact + foot
+    pages[f"/{ts}/kader/verein/{tid}/saison_id/{stagione}/plus/1"] = head + detailed + foot
+    if latest:
+        pages[f"/{ts}/startseite/verein/{tid}"] = head + compact + foot
+        pages[f"/{ts}/kader/verein/{tid}/plus/1"] = head + detailed + foot
+    return pages
+
+
+def _player_page(prng, pid, n, c, pos, naz, tn, tid, ts, nav, ads, padding):
+    birth = _date(prng, 1990, 2005)
+    age = 2024 - int(birth[-4:])
+    height = f"{prng.uniform(1.65, 1.98):.2f}".replace(".", ",")
+    foot = prng.choice(PIEDI)
+    joined = _date(prng, 2018, 2024)
+    contract = _date(prng, 2025, 2029)
+    value = _money(prng, 0.3, 90)
+    max_value = _money(prng, 5, 120)
+    flags = "<br>".join(f'<img src="/flag/{x}.png" title="{x}" alt="{x}" class="flaggenrahmen">&nbsp;&nbsp;{x}' for x in naz)
+    altri = "".join(f'<dd class="detail-position__position">{p[0]}</dd>' for p in POSIZIONI[1:3] if p[0] != pos[0])
+    head = PAGE_HEAD.format(title=f"{n} {c}", nav=nav, ads=ads, padding=padding)
+    body = f"""<header class="data-header"><div class="data-header__headline-container">
+<h1 class="data-header__headline-wrapper"><span class="data-header__shirt-number">#{prng.randint(1, 99)}</span>
+{n} <strong>{c}</strong></h1></div>
+<div class="data-header__box--big"><div class="data-header__club-info"><span class="data-header__club"><a title="{tn}" href="/{ts}/startseite/verein/{tid}">{tn}</a></span></div></div>
+<div class="data-header__box--small"><a class="data-header__market-value-wrapper" href="/mw/{pid}">{value}</a></div></header>
+<div class="row"><div class="large-8 columns"><div class="box"><div class="tm-player-market-value-development">
+<div class="current-and-max"><div class="current-value"><a href="/mw/{pid}">{value}</a></div>
+<div class="max"><div class="max-value">{max_value}</div><div class="max-label">Valore più alto:</div><div>{_date(prng, 2019, 2024)}</div></div></div></div></div>
+<div class="box"><h2 class="content-box-headline">Dati e fatti</h2>
+<div class="info-table info-table--right-space ">
+<span class="info-table__content info-table__content--regular">Nome nel paese d'origine:</span><span class="info-table__content info-table__content--bold">{n} {c}</span>
+<span class="info-table__content info-table__content--regular">Nato il:</span><span class="info-table__content info-table__content--bold"><a href="/geburtstag/{birth}">{birth} ({age})</a></span>
+<span class="info-table__content info-table__content--regular">Luogo di nascita:</span><span class="info-table__content info-table__content--bold"><span title="Città {pid % 50}">Città {pid % 50}</span>&nbsp;<img title="{naz[0]}" alt="{naz[0]}" class="flaggenrahmen"></span>
+<span class="info-table__content info-table__content--regular">Altezza:</span><span class="info-table__content info-table__content--bold">{height}&nbsp;m</span>
+<span class="info-table__content info-table__content--regular">Nazionalità:</span><span class="info-table__content info-table__content--bold">{flags}</span>
+<span class="info-table__content info-table__content--regular">Posizione:</span><span class="info-table__content info-table__content--bold">{pos[0] if pos[0] == pos[1] else f"{pos[1]} - {pos[0]}"}</span>
+<span class="info-table__content info-table__content--regular">Piede:</span><span class="info-table__content info-table__content--bold">{foot}</span>
+<span class="info-table__content info-table__content--regular">Procuratore:</span><span class="info-table__content info-table__content--bold"><a href="/berater/{pid % 20}">Agenzia {pid % 20}</a></span>
+<span class="info-table__content info-table__content--regular">Squadra attuale:</span><span class="info-table__content info-table__content--bold"><a title="{tn}" href="/{ts}/startseite/verein/{tid}"><img src="/logo/{tid}.png"></a><a title="{tn}" href="/{ts}/startseite/verein/{tid}">{tn}</a></span>
+<span class="info-table__content info-table__content--regular">In rosa da:</span><span class="info-table__content info-table__content--bold">{joined}</span>
+<span class="info-table__content info-table__content--regular">Scadenza:</span><span class="info-table__content info-table__content--bold">{contract}</span>
+</div></div></div>
+<div class="large-4 columns"><div class="box"><div class="detail-position"><div class="detail-position__box">
+<div class="detail-position__inner-box"><span class="detail-position__title">Ruolo naturale:</span><span class="info-table__content--bold detail-position__position">{pos[0]}</span></div>
+{f'<dl><dt class="detail-position__title">Altro ruolo:</dt>{altri}</dl>' if pos[1] == "Difesa" else ""}
+</div></div></div></div></div>"""
+    return head + body + PAGE_FOOT.format(nav=nav, padding=padding)
+
+
+def load_corpus_from_cache(cartella="data/cache"):
+    """
+    Returns a dict path -> html with every page stored in the PageCache at `cartella`,
+    so a real run recorded with cache_pagine = True can be served by the stand-in server.
+    """
+    cache = PageCache(cartella, offline=True)
+    try:
+        pages = {}
+        for url in cache.urls():
+            parts = urlsplit(url)
+            path = parts.path + (f"?{parts.query}" if parts.query else "")
+            pages[path] = cache.get(url).html
+        return pages
+    finally:
+        cache.close()
+
+
+def competition_urls(base_url, leagues=None):
+    """
+    Returns the campionati dict (as config.campionati) pointing at the stand-in server.
+    """
+    return {
+        nome: {"nome": nome, "url": f"{base_url}/{nome.replace(' ', '-')}/startseite/wettbewerb/{code}"}
+        for nome, code in (leagues or CAMPIONATI).items()
+    }
@@ -0,0 +1,109 @@
+"""
+Local HTTP stand-in for transfermarkt.it serving a page corpus, with latency and error injection.
+"""
+import gzip
+import hashlib
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StandInServer:
+    """
+    Threaded HTTP server on 127.0.0.1 serving `pages` (path -> html).
+
+    Every response is delayed by `latency` seconds and a fraction `error_rate` of the
+    requests fail with 503 and a Retry-After header. With `compress` pages are sent
+    gzip-compressed to clients that accept it, as transfermarkt does. With `etag` every
+    page is sent with an ETag (the hash of its content) and a matching If-None-Match
+    gets 304 Not Modified. `hits` counts requests per path, `not_modified` the 304
+    responses and `errors` the injected failures. Use it as a context manager.
+    """
+
+    def __init__(self, pages, latency=0.0, error_rate=0.0, seed=0, port=0, compress=True, etag=False):
+        self.pages = pages
+        self.compress = compress
+        self.etag = etag
+        self.not_modified = 0
+        self._compressed = {}
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.hits = {}
+        self.errors = 0
+        self.lock = threading.Lock()
+        handler = self._handler()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with server.lock:
+                    server.hits[self.path] = server.hits.get(self.path, 0) + 1
+                    fail = server.rng.random() < server.error_rate
+                    server.errors += fail
+                if server.latency:
+                    time.sleep(server.latency)
+                if fail:
+                    self.send_response(503)
+                    self.send_header("Retry-After", "0")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                page = server.pages.get(self.path)
+                if page is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = page.encode("utf-8")
+                etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"' if server.etag else None
+                if etag and self.headers.get("If-None-Match") == etag:
+                    with server.lock:
+                        server.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                gzipped = server.compress and "gzip" in self.headers.get("Accept-Encoding", "")
+                if gzipped:
+                    with server.lock:
+                        # Keyed on the page too, so a page replaced during a test is not served stale
+                        cached = server._compressed.get(self.path)
+                        if cached is None or cached[0] is not page:
+                            cached = server._compressed[self.path] = (page, gzip.compress(body, compresslevel=6))
+                        body = cached[1]
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                if etag:
+                    self.send_header("ETag", etag)
+                if gzipped:
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,224 @@
+"""
+Offline benchmark suite: a full run against a local stand-in for transfermarkt.it.
+
+Serves a page corpus (generated, or recorded by a real run in the page cache) from
+a local HTTP server with configurable latency and error injection, runs a complete
+scrape in a temporary directory and reports pages/sec, parse ms per page type,
+peak RSS and end-to-end time. Results are printed and can be written as JSON and
+compared with the results of another commit.
+
+Usage:
+    python -m benchmarks.suite [--modalita pipeline|streaming|async|sequenziale] [--squadre N] [--giocatori N] [--processi N]
+                               [--latenza S] [--errori P] [--corpus-cache DIR]
+                               [--output risultati.json] [--confronta precedenti.json]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import CAMPIONATI, build_corpus, competition_urls, load_corpus_from_cache
+from benchmarks.server import StandInServer
+from src.processing.async_processing import scrape_all_async
+from src.processing.pipeline import ScrapingPipeline
+from src.processing.processing import scrape_and_save_players, scrape_and_save_squad, scrape_and_save_teams, scrape_streaming
+from src.processing.sink import DettagliSink
+from src.scraping.async_scraper import AsyncTransfermarktScraper
+from src.scraping.parser_pool import ParserPool
+from src.scraping.scraper import TransfermarktScraper
+from src.utils.metrics import METRICHE
+from src.utils.rate_limiter import TokenBucket
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Tipo di pagina -> (riconoscimento dal percorso, tipo per make_soup, estrazione)
+PAGINE = {
+    "competizione": (lambda p: "/wettbewerb/" in p, "competizione", lambda s, soup: s.parse_teams(soup)),
+    "squadra": (lambda p: "/startseite/verein/" in p, "squadra", lambda s, soup: s.parse_players(soup)),
+    "rosa_dettagliata": (lambda p: "/kader/verein/" in p, "squadra", lambda s, soup: s.parse_squad(soup)),
+    "giocatore": (lambda p: "/profil/spieler/" in p, "giocatore", lambda s, soup: s.parse_player_details(soup)),
+}
+
+# Metriche confrontate con --confronta: True se un valore più alto è migliore
+CONFRONTATE = {
+    "pagine_al_secondo": True,
+    "tempo_totale_s": False,
+    "picco_rss_mb": False,
+}
+
+
+def picco_rss_mb():
+    """
+    Peak resident set size of this process in MiB (None where `resource` is unavailable).
+    """
+    if resource is None:
+        return None
+    picco = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss è in KiB su Linux e in byte su macOS
+    return round(picco / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def commit_corrente():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def misura_parsing(pages, campioni, ripetizioni):
+    """
+    Parse + extraction ms per page type, on up to `campioni` pages of each type.
+    """
+    scraper = TransfermarktScraper()
+    risultati = {}
+    for tipo, (riconosci, tipo_soup, estrai) in PAGINE.items():
+        html = [pagina for percorso, pagina in sorted(pages.items()) if riconosci(percorso)][:campioni]
+        if not html:
+            continue
+        inizio = time.perf_counter()
+        for _ in range(ripetizioni):
+            for pagina in html:
+                estrai(scraper, scraper.make_soup(pagina, tipo_soup))
+        risultati[tipo] = round((time.perf_counter() - inizio) / (ripetizioni * len(html)) * 1000, 3)
+    return risultati
+
+
+def esegui_run(args, base_url, campionati, parser_pool=None):
+    """
+    Runs a full scrape of `campionati` against the stand-in in the chosen mode and returns the scraper.
+    """
+    stagioni = [args.stagione]
+    rate_limiter = TokenBucket(rate=args.richieste_al_secondo)
+    if args.modalita == "pipeline":
+        scraper = TransfermarktScraper(base_url=base_url, rate_limiter=rate_limiter, parser_pool=parser_pool)
+        ScrapingPipeline(scraper, workers_dettagli=args.workers, rosa_dettagliata=args.rosa_dettagliata).esegui(
+            campionati, stagioni
+        )
+        return scraper
+    elif args.modalita == "streaming":
+        scraper = TransfermarktScraper(base_url=base_url, rate_limiter=rate_limiter, parser_pool=parser_pool)
+        with DettagliSink() as sink:
+            scrape_streaming(scraper, campionati, stagioni, sink, args.rosa_dettagliata, max_in_corso=args.workers)
+        return scraper
+    elif args.modalita == "async":
+        scraper = AsyncTransfermarktScraper(
+            base_url=base_url, rate_limiter=rate_limiter, max_concurrency=args.workers, parser_pool=parser_pool
+        )
+        asyncio.run(scrape_all_async(scraper, campionati, stagioni, args.rosa_dettagliata))
+        return scraper
+    else:
+        scraper = TransfermarktScraper(base_url=base_url, rate_limiter=rate_limiter, parser_pool=parser_pool)
+        for campionato in campionati.values():
+            squadre_df = scrape_and_save_teams(scraper, campionato, args.stagione)
+            for _, team in squadre_df.iterrows():
+                if args.rosa_dettagliata:
+                    scrape_and_save_squad(scraper, team, campionato["nome"], args.stagione, max_workers=args.workers)
+                else:
+                    scrape_and_save_players(scraper, team, campionato["nome"], args.stagione, max_workers=args.workers)
+        return scraper
+
+
+def confronta(risultati, precedenti):
+    print(f"\nConfronto con {precedenti.get('commit') or 'risultati precedenti'}:")
+    for metrica, piu_alto_meglio in CONFRONTATE.items():
+        prima, dopo = precedenti.get(metrica), risultati.get(metrica)
+        if not prima or dopo is None:
+            continue
+        variazione = (dopo - prima) / prima * 100
+        meglio = variazione > 0 if piu_alto_meglio else variazione < 0
+        print(f"  {metrica:20} {prima:>10} -> {dopo:>10} ({variazione:+.1f}%{', meglio' if meglio else ''})")
+    for tipo, dopo in risultati["parse_ms"].items():
+        prima = precedenti.get("parse_ms", {}).get(tipo)
+        if prima:
+            print(f"  parse_ms {tipo:16} {prima:>10} -> {dopo:>10} ({(dopo - prima) / prima * 100:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--modalita", choices=["pipeline", "streaming", "async", "sequenziale"], default="pipeline")
+    parser.add_argument("--campionati", type=int, default=1, help="numero di campionati del corpus generato")
+    parser.add_argument("--squadre", type=int, default=20, help="squadre per campionato")
+    parser.add_argument("--giocatori", type=int, default=26, help="giocatori per squadra")
+    parser.add_argument("--stagione", default="2024")
+    parser.add_argument("--rosa-dettagliata", action="store_true", help="usa la rosa dettagliata (una richiesta per squadra)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--processi", type=int, default=0, help="processi di parsing delle pagine dei giocatori (0 = nei thread)")
+    parser.add_argument("--richieste-al-secondo", type=float, default=1000)
+    parser.add_argument("--latenza", type=float, default=0.0, help="secondi di latenza per risposta")
+    parser.add_argument("--errori", type=float, default=0.0, help="frazione di richieste che rispondono 503")
+    parser.add_argument("--corpus-cache", help="usa le pagine registrate nella PageCache di questa cartella")
+    parser.add_argument("--ripetizioni-parsing", type=int, default=5)
+    parser.add_argument("--output", help="scrive i risultati in JSON in questo file")
+    parser.add_argument("--confronta", help="file JSON di un run precedente da confrontare")
+    args = parser.parse_args()
+
+    leghe = dict(list(CAMPIONATI.items())[: args.campionati])
+    if args.corpus_cache:
+        pages = load_corpus_from_cache(args.corpus_cache)
+    else:
+        pages = build_corpus(args.squadre, args.giocatori, seasons=(args.stagione,), leagues=leghe)
+
+    parse_ms = misura_parsing(pages, campioni=20, ripetizioni=args.ripetizioni_parsing)
+
+    cartella_iniziale = os.getcwd()
+    # Avviato prima del run: il tempo di avvio dei processi non entra nella misura
+    parser_pool = ParserPool(args.processi) if args.processi else None
+    if parser_pool:
+        for futuro in [parser_pool.submit("") for _ in range(parser_pool.processes * 2)]:
+            futuro.result()
+    with tempfile.TemporaryDirectory() as cartella, StandInServer(pages, args.latenza, args.errori) as server:
+        # Il run scrive data/raw nella cartella temporanea, non nel repository
+        os.chdir(cartella)
+        try:
+            METRICHE.azzera()
+            inizio = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                scraper = esegui_run(args, server.base_url, competition_urls(server.base_url, leghe), parser_pool)
+            tempo_totale = time.perf_counter() - inizio
+        finally:
+            os.chdir(cartella_iniziale)
+            if parser_pool:
+                parser_pool.close()
+        richieste = sum(server.hits.values())
+
+    risultati = {
+        "commit": commit_corrente(),
+        "python": platform.python_version(),
+        "parser": TransfermarktScraper().parser,
+        "parametri": {k: v for k, v in vars(args).items() if k not in ("output", "confronta")},
+        "pagine_corpus": len(pages),
+        "richieste": richieste,
+        "errori_iniettati": server.errors,
+        "tempo_totale_s": round(tempo_totale, 3),
+        "pagine_al_secondo": round(richieste / tempo_totale, 1) if tempo_totale else None,
+        "parse_ms": parse_ms,
+        "picco_rss_mb": picco_rss_mb(),
+        # Connessioni aperte per richiesta: il riuso misura le connessioni keep-alive
+        "connessioni": scraper.connection_stats(),
+        # Istogrammi e contatori del run (fetch, parsing, estrazione e scrittura per tipo di pagina)
+        "metriche": METRICHE.rapporto(),
+    }
+    print(json.dumps({k: v for k, v in risultati.items() if k != "metriche"}, indent=2, ensure_ascii=False))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(risultati, f, indent=2, ensure_ascii=False)
+    if args.confronta:
+        with open(args.confronta, encoding="utf-8") as f:
+            confronta(risultati, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
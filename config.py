@@ -24,3 +24,62 @@ campionati = {
 
 # Configurazione delle stagioni
 stagioni = ["2024"]
+backfill_stagioni = 0  # Stagioni precedenti da aggiungere (es. 10 per lo storico): ogni profilo viene scaricato una volta sola
+
+# Configurazione dello scraping
+# "pipeline": stadi con code limitate e un pool globale di worker
+# "async": un unico event loop per tutte le richieste
+# "streaming": generatori di squadre e giocatori, con poche richieste in corso e memoria costante
+# "sequenziale": un campionato e una squadra alla volta
+# "distribuita": competizioni, squadre e giocatori in una coda su file condivisa da più processi worker (anche su più macchine)
+modalita_scraping = "pipeline"
+richieste_al_secondo = 2  # Limite globale di richieste verso transfermarkt
+max_concorrenza = 8  # Numero massimo di richieste contemporanee (worker della pipeline o richieste async)
+intervallo_flush = 60  # Secondi tra due scritture delle squadre non ancora complete (None per disattivare)
+memoria_max_mb = 256  # Memoria stimata massima delle pagine in analisi contemporaneamente; oltre, i worker aspettano (None per nessun limite)
+processi_parsing = 0  # Processi che analizzano le pagine dei giocatori mentre i thread scaricano (0 = parsing nei thread, None = uno per core)
+
+# Configurazione della concorrenza adattiva e dei ritentativi
+concorrenza_adattiva = True  # Le richieste contemporanee salgono fino a max_concorrenza con risposte sane e scendono con 429/5xx o latenza alta
+tentativi_richiesta = 3  # Ritentativi di una richiesta fallita per 429/5xx o errori di rete (backoff esponenziale o Retry-After)
+ritentativi_giocatore = 3  # Volte in cui la pipeline rimette in coda un giocatore non scaricato, invece di salvare una riga vuota
+attesa_ritentativi = 30  # Secondi di base del backoff dei giocatori rimessi in coda
+percorso_ritentativi = "data/ritentativi.sqlite"  # Coda persistente dei giocatori da ritentare (None per tenerla solo in memoria)
+
+# Configurazione della cache delle pagine
+cache_pagine = True  # Salva le pagine scaricate in data/cache e le riusa finché valide
+cache_max_mb = 512  # Dimensione massima della cache su disco
+modalita_offline = False  # Usa solo le pagine in cache, senza richieste di rete
+
+# Configurazione della rosa dettagliata
+# Con la rosa dettagliata luogo di nascita, altri ruoli, squadra attuale, valore più alto e data di aggiornamento restano vuoti
+# (salvo aggiungerli a campi_obbligatori) e nome e cognome sono ricavati dal nome completo
+rosa_dettagliata = False  # Legge i dettagli dei giocatori dalla rosa della squadra (una richiesta per squadra) invece che dalle loro pagine
+campi_obbligatori = None  # Campi da completare con la pagina del giocatore se mancanti (None = campi della rosa)
+
+# Configurazione del dataset consolidato
+dataset_colonnare = True  # Salva anche un dataset Parquet partizionato per campionato e stagione (richiede pyarrow)
+cartella_dataset = "data/dataset/giocatori"
+archivio_sqlite = "data/giocatori.sqlite"  # Database SQLite indicizzato di squadre e giocatori, con API di ricerca (None per disattivarlo)
+
+# Configurazione del feed delle modifiche tra un run e l'altro
+percorso_modifiche = "data/modifiche.sqlite"  # Ultimo record di ogni giocatore, per trovare nuovi, rimossi e modificati (None per disattivare)
+cartella_delta = "data/delta"  # Un file JSON Lines per run con le modifiche, scritto mentre le squadre vengono completate
+
+# Configurazione dei run distribuiti (modalità "distribuita" e comando `python main.py worker`)
+percorso_coda = "data/coda.sqlite"  # Coda condivisa dei lavori: altri processi o macchine si aggiungono al run con `python main.py worker`
+processi_worker = 4  # Processi worker avviati da questa macchina; si dividono richieste_al_secondo
+thread_worker = 4  # Thread di ogni processo worker
+visibilita_lavori = 120  # Secondi di lease, rinnovato finché il worker esegue il lavoro: quello di un worker caduto torna disponibile agli altri dopo questo tempo
+tentativi_lavoro = 3  # Volte in cui un lavoro viene preso prima di essere segnato come fallito
+coda_in_rete = False  # True se il file della coda è su una cartella di rete condivisa da più macchine (niente WAL)
+
+# Configurazione dei run incrementali (solo modalità "pipeline")
+manifest_run = True  # Registra in un manifest cosa è stato scaricato, per riprendere i run interrotti
+percorso_manifest = "data/manifest.sqlite"
+freschezza_ore = 168  # Giocatori e rose scaricati da meno di queste ore non vengono richiesti di nuovo
+
+# Configurazione di log e metriche
+livello_log = "INFO"  # "DEBUG" mostra anche i messaggi per singola richiesta e per singola riga estratta
+rapporto_run = "data/report/run.json"  # Rapporto JSON con contatori e tempi del run (None per disattivare)
+metriche_prometheus = None  # Es. "data/report/metriche.prom" per il textfile collector di Prometheus
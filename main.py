@@ -1,37 +1,653 @@
-from src.scraping.scraper import TransfermarktScraper
-from src.processing.processing import scrape_and_save_teams, scrape_and_save_players
-import config
+"""
+FantaAI: scraping dei giocatori da transfermarkt.it.
+
+Comandi:
+    python main.py [scrape]  [--campionato NOME ...] [--stagione S ...] [--modalita M]
+    python main.py worker    [--coda PERCORSO] [--processi N] [--thread N] [--richieste-al-secondo R]
+    python main.py refresh   --squadra NOME ... | --giocatore URL ...  [--campionato NOME ...] [--stagione S ...]
+    python main.py order     [--campionato NOME ...] [--stagione S ...]
+    python main.py export    [--formato csv|json|parquet|sqlite] [--output PERCORSO] [--campionato NOME ...] [--stagione S ...]
+    python main.py delta     [--run RUN] [--tipo nuovo|modificato|rimosso] [--id]
+    python main.py stats
+
+Senza comando esegue `scrape` su tutti i campionati e le stagioni di config.py.
+Con `scrape --modalita distribuita` il run passa da una coda su file: altri processi, anche su
+altre macchine che condividono la cartella data, si aggiungono con `worker`.
+"""
+import argparse
+import csv
+import json
+import logging
+import multiprocessing
 import os
-import pandas as pd
-from src.processing.post_processing import order_positions
+import sqlite3
+import sys
+
+import config
+
+# pandas, bs4, requests e i moduli di src vengono importati dentro i comandi che li usano:
+# i comandi veloci (stats, order, export, delta) non pagano l'import dello scraper
+
+
+def configura_log():
+    logging.basicConfig(
+        level=getattr(logging, config.livello_log.upper(), logging.INFO),
+        format="%(asctime)s %(levelname)s [%(threadName)s] %(message)s",
+    )
+
+
+def seleziona_campionati(nomi: list) -> dict:
+    """
+    Restituisce i campionati di config.campionati richiesti (tutti se `nomi` è vuoto).
+    """
+    if not nomi:
+        return config.campionati
+    sconosciuti = [nome for nome in nomi if nome.lower() not in config.campionati]
+    if sconosciuti:
+        sys.exit(f"Campionati sconosciuti: {', '.join(sconosciuti)} (disponibili: {', '.join(config.campionati)})")
+    return {nome.lower(): config.campionati[nome.lower()] for nome in nomi}
+
+
+def seleziona_stagioni(stagioni: list, backfill: int = None) -> list:
+    """
+    Restituisce le stagioni richieste (di default config.stagioni) più, con il backfill, quelle precedenti.
+    """
+    from src.utils.seasons import seasons_with_backfill
+
+    backfill = config.backfill_stagioni if backfill is None else backfill
+    return seasons_with_backfill(stagioni or config.stagioni, backfill)
+
+
+def crea_opzioni_scraper(rivalida: bool = False, richieste_al_secondo: float = None) -> dict:
+    """
+    Opzioni comuni degli scraper di un run: limiti di richieste e di concorrenza, cache,
+    pool di parsing e budget di memoria. Con `rivalida` tutte le pagine in cache sono
+    considerate scadute, così vengono richieste di nuovo (con richieste condizionali).
+    `richieste_al_secondo` sostituisce il limite di config (es. la quota di un processo worker).
+    """
+    from src.scraping.parser_pool import ParserPool
+    from src.utils.adaptive_limiter import AdaptiveLimiter
+    from src.utils.memory_budget import MemoryBudget
+    from src.utils.page_cache import TTL_PER_TIPO, PageCache
+    from src.utils.rate_limiter import TokenBucket
+
+    # Limite di richieste condiviso da tutto il run
+    rate_limiter = TokenBucket(rate=richieste_al_secondo or config.richieste_al_secondo)
+    # Richieste contemporanee adattate alle risposte del server, fino a max_concorrenza
+    limiter = AdaptiveLimiter(initial=min(4, config.max_concorrenza), maximum=config.max_concorrenza) if config.concorrenza_adattiva else None
+
+    # Cache su disco delle pagine scaricate
+    cache = None
+    if config.cache_pagine or config.modalita_offline:
+        ttl = {tipo: 0 for tipo in TTL_PER_TIPO} if rivalida else None
+        cache = PageCache(max_bytes=config.cache_max_mb * 1024 * 1024, ttl=ttl, offline=config.modalita_offline)
+    # Processi per il parsing delle pagine dei giocatori, così il parsing non è limitato dal GIL
+    parser_pool = ParserPool(config.processi_parsing) if config.processi_parsing != 0 else None
+    # Memoria massima delle pagine analizzate contemporaneamente
+    memory_budget = MemoryBudget(config.memoria_max_mb) if config.memoria_max_mb else None
+    return {
+        "rate_limiter": rate_limiter, "cache": cache, "limiter": limiter, "max_retries": config.tentativi_richiesta,
+        "parser_pool": parser_pool, "memory_budget": memory_budget,
+    }
+
+
+def chiudi_scraper(scraper, opzioni_scraper: dict):
+    """
+    Registra le statistiche delle connessioni e della cache e chiude le risorse dello scraper.
+    Restituisce le statistiche delle connessioni.
+    """
+    connessioni = scraper.connection_stats()
+    logging.info(
+        f"Connessioni HTTP: {connessioni['connessioni']} aperte per {connessioni['richieste']} richieste "
+        f"(riuso {connessioni['riuso']})"
+    )
+    if opzioni_scraper["parser_pool"]:
+        opzioni_scraper["parser_pool"].close()
+    cache = opzioni_scraper["cache"]
+    if cache:
+        logging.info(f"Cache: {cache.hits} pagine valide, {cache.revalidated} rivalidate, {cache.misses} non presenti")
+        cache.close()
+    return connessioni
+
+
+def apri_archivio():
+    from src.utils.player_store import PlayerStore
+
+    # Database SQLite interrogabile di squadre e giocatori, aggiornato squadra per squadra
+    return PlayerStore(config.archivio_sqlite) if config.archivio_sqlite else None
+
+
+def apri_modifiche():
+    from src.utils.change_feed import ChangeFeed
+
+    # Confronto con l'ultimo run: i giocatori nuovi, rimossi e modificati finiscono nel feed delle modifiche
+    return ChangeFeed(config.percorso_modifiche, config.cartella_delta) if config.percorso_modifiche else None
+
+
+def chiudi_modifiche(modifiche):
+    """
+    Registra i giocatori rimossi e chiude il feed delle modifiche del run.
+    """
+    if not modifiche:
+        return
+    conteggi = modifiche.chiudi_run()
+    logging.info(
+        f"Modifiche rispetto all'ultimo run: {conteggi.get('nuovo', 0)} nuovi, {conteggi.get('modificato', 0)} modificati, "
+        f"{conteggi.get('rimosso', 0)} rimossi" + (f" ({modifiche.percorso_feed})" if conteggi and modifiche.percorso_feed else "")
+    )
+    modifiche.chiudi()
+
+
+def apri_coda(percorso: str = None, visibilita: float = None):
+    from src.utils.work_queue import WorkQueue
+
+    return WorkQueue(
+        percorso or config.percorso_coda, visibilita=visibilita or config.visibilita_lavori,
+        max_tentativi=config.tentativi_lavoro, wal=not config.coda_in_rete,
+    )
+
+
+def esegui_worker(percorso_coda: str, thread: int, richieste_al_secondo: float, visibilita: float = None) -> dict:
+    """
+    Esegue un worker sulla coda di `percorso_coda` in questo processo, finché la coda non è vuota.
+    URL del sito, rosa dettagliata e campi obbligatori sono quelli salvati nella coda da chi ha avviato il run.
+    """
+    from src.processing.distributed import WorkerCoda
+    from src.processing.post_processing import carica_ordine_posizioni
+    from src.scraping.scraper import SQUAD_FIELDS, TransfermarktScraper
+
+    coda = apri_coda(percorso_coda, visibilita)
+    parametri = coda.parametri()
+    opzioni_scraper = crea_opzioni_scraper(richieste_al_secondo=richieste_al_secondo)
+    if parametri.get("base_url"):
+        opzioni_scraper = {**opzioni_scraper, "base_url": parametri["base_url"]}
+    scraper = TransfermarktScraper(**opzioni_scraper)
+    worker = WorkerCoda(
+        coda, scraper,
+        rosa_dettagliata=parametri.get("rosa_dettagliata", config.rosa_dettagliata),
+        campi_obbligatori=parametri.get("campi_obbligatori") or SQUAD_FIELDS,
+        ordine_posizioni=carica_ordine_posizioni(),
+        thread=thread,
+        attesa_ritentativi=config.attesa_ritentativi,
+    )
+    try:
+        return worker.esegui()
+    finally:
+        chiudi_scraper(scraper, opzioni_scraper)
+        coda.chiudi()
+
+
+def processo_worker(percorso_coda: str, thread: int, richieste_al_secondo: float, visibilita: float = None):
+    """
+    Punto di ingresso dei processi worker avviati da questa macchina.
+    """
+    configura_log()
+    esegui_worker(percorso_coda, thread, richieste_al_secondo, visibilita)
+
+
+def avvia_worker(percorso_coda: str, processi: int, thread: int, richieste_al_secondo: float, visibilita: float = None) -> list:
+    """
+    Avvia `processi` processi worker sulla coda, che si dividono `richieste_al_secondo`.
+    Restituisce i processi avviati.
+    """
+    # spawn: i processi non ereditano thread, connessioni e lock del processo che li avvia
+    contesto = multiprocessing.get_context("spawn")
+    avviati = []
+    for indice in range(processi):
+        processo = contesto.Process(
+            target=processo_worker, args=(percorso_coda, thread, richieste_al_secondo / processi, visibilita),
+            name=f"worker-{indice}",
+        )
+        processo.start()
+        avviati.append(processo)
+    if avviati:
+        logging.info(f"Avviati {processi} processi worker sulla coda {percorso_coda}")
+    return avviati
+
+
+def squadre_da_cartelle(cartelle) -> list:
+    """
+    Restituisce le tuple (campionato, stagione, squadra) delle cartelle di data/raw, per consolida_csv.
+    """
+    return [tuple(os.path.normpath(cartella).split(os.sep)[-3:]) for cartella in cartelle]
+
+
+def comando_scrape(args):
+    """
+    Scraping completo dei campionati e delle stagioni richiesti, nella modalità di config.modalita_scraping.
+    """
+    import asyncio
+
+    from src.processing.async_processing import scrape_all_async
+    from src.processing.distributed import WorkerCoda, riempi_coda
+    from src.processing.normalization import normalizza_giocatori
+    from src.processing.pipeline import ScrapingPipeline
+    from src.processing.post_processing import carica_ordine_posizioni, cartelle_squadre, order_positions
+    from src.processing.processing import scrape_and_save_players, scrape_and_save_squad, scrape_and_save_teams, scrape_streaming
+    from src.processing.sink import DettagliSink
+    from src.scraping.async_scraper import AsyncTransfermarktScraper
+    from src.scraping.player_registry import PlayerRegistry
+    from src.scraping.scraper import SQUAD_FIELDS, TransfermarktScraper
+    from src.utils.manifest import RunManifest
+    from src.utils.metrics import METRICHE
+    from src.utils.retry import RetryQueue
+    from src.utils.save_utils import consolida_csv, salva_dataset
+
+    logging.info("Inizio il processo di scraping.")
+    METRICHE.azzera()
 
+    modalita = args.modalita or config.modalita_scraping
+    campionati = seleziona_campionati(args.campionato)
+    # Stagioni richieste più, con il backfill, quelle precedenti
+    stagioni = seleziona_stagioni(args.stagione, args.backfill)
+    opzioni_scraper = crea_opzioni_scraper()
 
+    # Campi che, se non presenti nella rosa dettagliata, richiedono la pagina del giocatore
+    campi_obbligatori = config.campi_obbligatori or SQUAD_FIELDS
 
-def main():
-    print("Inizio il processo di scraping.")
+    # Pipeline e streaming scrivono con un DettagliSink: i file sono già ordinati per posizione
+    # e dataset e archivio vengono aggiornati squadra per squadra
+    con_sink = modalita in ("pipeline", "streaming")
+    # Anche i worker della modalità distribuita scrivono i file già ordinati
+    ordine_posizioni = carica_ordine_posizioni() if con_sink or modalita == "distribuita" else None
 
-    # Inizializza lo scraper
-    scraper = TransfermarktScraper()
+    archivio = apri_archivio()
+    modifiche = apri_modifiche()
 
-    # Scraping delle squadre e dei giocatori sequenzialmente
-    for campionato in config.campionati.values():
-        for stagione in config.stagioni:
-            print(f"Scraping per {campionato['nome']} stagione {stagione}...")
-            # Scraping delle squadre del campionato
-            squadre_df = scrape_and_save_teams(scraper, campionato, stagione)
+    if modalita == "pipeline":
+        # Pipeline a stadi con un pool globale di worker per i dettagli dei giocatori
+        scraper = TransfermarktScraper(**opzioni_scraper)
+        # Manifest del run: i giocatori e le rose già scaricati e ancora freschi vengono saltati
+        manifest = RunManifest(config.percorso_manifest) if config.manifest_run else None
+        # Giocatori non scaricati, salvati su disco con il loro backoff
+        coda_ritentativi = RetryQueue(config.percorso_ritentativi) if config.percorso_ritentativi else None
+        pipeline = ScrapingPipeline(
+            scraper,
+            workers_dettagli=config.max_concorrenza,
+            # Con più stagioni le rose da leggere si moltiplicano, mentre i profili no
+            workers_squadre=config.max_concorrenza if len(stagioni) > 1 else 2,
+            rosa_dettagliata=config.rosa_dettagliata,
+            campi_obbligatori=campi_obbligatori,
+            intervallo_flush=config.intervallo_flush,
+            cartella_dataset=config.cartella_dataset if config.dataset_colonnare else None,
+            manifest=manifest,
+            freschezza=config.freschezza_ore * 3600,
+            ordine_posizioni=ordine_posizioni,
+            ritentativi=config.ritentativi_giocatore,
+            attesa_ritentativi=config.attesa_ritentativi,
+            coda_ritentativi=coda_ritentativi,
+            archivio=archivio,
+            modifiche=modifiche,
+        )
+        pipeline.esegui(campionati, stagioni)
+        if manifest:
+            manifest.chiudi()
+        if coda_ritentativi:
+            coda_ritentativi.chiudi()
+    elif modalita == "streaming":
+        # Generatori di squadre e giocatori: al più max_concorrenza giocatori in corso e memoria costante
+        scraper = TransfermarktScraper(**opzioni_scraper)
+        sink = DettagliSink(
+            intervallo_flush=config.intervallo_flush,
+            cartella_dataset=config.cartella_dataset if config.dataset_colonnare else None,
+            ordine_posizioni=ordine_posizioni,
+            archivio=archivio,
+            modifiche=modifiche,
+        )
+        with sink:
+            scrape_streaming(
+                scraper, campionati, stagioni, sink, config.rosa_dettagliata, campi_obbligatori,
+                max_in_corso=config.max_concorrenza, registro=PlayerRegistry(scraper),
+            )
+    elif modalita == "distribuita":
+        # Coda su file condivisa: questa macchina avvia i suoi processi worker, altre possono aggiungersi
+        scraper = TransfermarktScraper(**opzioni_scraper)
+        coda = apri_coda()
+        if coda.vuota():
+            coda.svuota()
+            coda.imposta_parametri({
+                "base_url": scraper.base_url, "rosa_dettagliata": config.rosa_dettagliata, "campi_obbligatori": campi_obbligatori,
+            })
+            riempi_coda(coda, campionati, stagioni)
+        else:
+            logging.info(f"La coda {config.percorso_coda} ha ancora lavori in sospeso: riprendo il run interrotto.")
+        processi = config.processi_worker if args.processi is None else args.processi
+        for processo in avvia_worker(config.percorso_coda, processi, config.thread_worker, config.richieste_al_secondo):
+            processo.join()
+        # Lavori rimasti (lease di worker caduti) o in corso su altre macchine: si finiscono o si attendono qui
+        WorkerCoda(
+            coda, scraper, config.rosa_dettagliata, campi_obbligatori, ordine_posizioni, thread=1,
+            nome=f"coordinatore:{os.getpid()}", attesa_ritentativi=config.attesa_ritentativi,
+        ).esegui()
+        logging.info(f"Coda completata: {coda.conteggi()}")
+        coda.chiudi()
+    elif modalita == "async":
+        # Tutti i campionati e le stagioni in un unico event loop
+        scraper = AsyncTransfermarktScraper(**opzioni_scraper, max_concurrency=config.max_concorrenza)
+        asyncio.run(scrape_all_async(scraper, campionati, stagioni, config.rosa_dettagliata, campi_obbligatori))
+    else:
+        # Inizializza lo scraper e il registro dei profili, condiviso da tutte le squadre e stagioni
+        scraper = TransfermarktScraper(**opzioni_scraper)
+        registro = PlayerRegistry(scraper)
 
-            if squadre_df.empty:
-                print(f"Nessuna squadra trovata per {campionato['nome']} stagione {stagione}.")
+        # Scraping delle squadre e dei giocatori sequenzialmente
+        for campionato in campionati.values():
+            for stagione in stagioni:
+                logging.info(f"Scraping per {campionato['nome']} stagione {stagione}...")
+                # Scraping delle squadre del campionato
+                squadre_df = scrape_and_save_teams(scraper, campionato, stagione)
+
+                if squadre_df.empty:
+                    logging.warning(f"Nessuna squadra trovata per {campionato['nome']} stagione {stagione}.")
+                    continue
+
+                # Scraping dei giocatori e dei loro dettagli per tutte le squadre
+                for _, team in squadre_df.iterrows():
+                    if config.rosa_dettagliata:
+                        scrape_and_save_squad(scraper, team, campionato["nome"], stagione, campi_obbligatori, registro=registro)
+                    else:
+                        scrape_and_save_players(scraper, team, campionato["nome"], stagione, registro=registro)
+
+    logging.info("Scraping completato per tutti i campionati e tutte le squadre.")
+    connessioni = chiudi_scraper(scraper, opzioni_scraper)
+
+    if ordine_posizioni is None:
+        logging.info("Ordinamento dei giocatori per posizione")
+        order_positions(campionati, stagioni)
+
+    if not con_sink and (config.dataset_colonnare or archivio):
+        # Pipeline e streaming scrivono dataset e archivio dal sink; negli altri modi li si costruisce dai CSV
+        giocatori_df = normalizza_giocatori(consolida_csv())
+        if config.dataset_colonnare:
+            # Ricostruzione da tutti i CSV di data/raw: i file di squadre non più presenti vengono rimossi
+            salva_dataset(giocatori_df, config.cartella_dataset, sostituisci_partizioni=True)
+        if archivio:
+            archivio.salva_giocatori(giocatori_df)
+    if archivio:
+        logging.info(f"Archivio SQLite aggiornato in {config.archivio_sqlite}")
+        archivio.chiudi()
+    if modifiche and not con_sink:
+        # Senza sink il confronto con l'ultimo run si fa sui CSV delle squadre del run
+        modifiche.registra_frame(consolida_csv(squadre=squadre_da_cartelle(c for c, _ in cartelle_squadre(campionati, stagioni))))
+    chiudi_modifiche(modifiche)
+
+    # Rapporto del run: contatori, code e istogrammi dei tempi per fetch, parsing, estrazione e scrittura
+    if config.rapporto_run:
+        METRICHE.salva_rapporto(config.rapporto_run, modalita=modalita, connessioni=connessioni)
+        logging.info(f"Rapporto del run salvato in {config.rapporto_run}")
+    if config.metriche_prometheus:
+        METRICHE.salva_prometheus(config.metriche_prometheus)
+
+
+def comando_worker(args):
+    """
+    Si aggiunge a un run distribuito già avviato (scrape --modalita distribuita), anche da un'altra macchina:
+    prende lavori dalla coda finché non ne restano. La cartella di lavoro deve essere quella condivisa del run.
+    """
+    percorso = args.coda or config.percorso_coda
+    if not os.path.isfile(percorso):
+        sys.exit(f"Coda {percorso} non trovata: avvia il run con `scrape --modalita distribuita`.")
+    richieste = args.richieste_al_secondo or config.richieste_al_secondo
+    thread = args.thread or config.thread_worker
+    if args.processi > 1:
+        for processo in avvia_worker(percorso, args.processi, thread, richieste, args.visibilita):
+            processo.join()
+    else:
+        esegui_worker(percorso, thread, richieste, args.visibilita)
+
+
+def trova_squadre(nomi: list, campionati: dict, stagioni: list) -> list:
+    """
+    Cerca le squadre per nome (senza distinzione di maiuscole) nei file squadre.csv già salvati.
+    Restituisce le squadre trovate, con 'campionato', 'stagione', 'name' e 'link'.
+    """
+    cercati = {nome.lower() for nome in nomi}
+    trovate = []
+    for campionato in campionati.values():
+        for stagione in stagioni:
+            percorso = os.path.join("data", "raw", campionato["nome"].lower(), stagione, "squadre.csv")
+            if not os.path.isfile(percorso):
+                continue
+            with open(percorso, encoding="utf-8", newline="") as f:
+                trovate.extend(team for team in csv.DictReader(f) if team["name"].lower() in cercati)
+    return trovate
+
+
+def comando_refresh(args):
+    """
+    Aggiorna solo alcune squadre (rosa e dettagli) o alcuni giocatori, senza un run completo.
+    Le pagine in cache vengono rivalidate, così le modifiche (es. un trasferimento) sono lette subito.
+    """
+    from src.processing.normalization import normalizza_giocatori
+    from src.processing.post_processing import carica_ordine_posizioni, cartelle_squadre
+    from src.processing.processing import aggiorna_giocatori, invia_al_sink, iter_giocatori, scrape_and_save_teams
+    from src.processing.sink import DettagliSink
+    from src.scraping.player_registry import PlayerRegistry
+    from src.scraping.scraper import SQUAD_FIELDS, TransfermarktScraper
+    from src.utils.save_utils import consolida_csv
+
+    campionati = seleziona_campionati(args.campionato)
+    stagioni = args.stagione or config.stagioni
+    opzioni_scraper = crea_opzioni_scraper(rivalida=True)
+    scraper = TransfermarktScraper(**opzioni_scraper)
+    archivio = apri_archivio()
+    modifiche = apri_modifiche()
+
+    if args.squadra:
+        squadre = trova_squadre(args.squadra, campionati, stagioni)
+        if len({team["name"].lower() for team in squadre}) < len({nome.lower() for nome in args.squadra}):
+            # Squadre non ancora salvate: si leggono le pagine dei campionati
+            for campionato in campionati.values():
+                for stagione in stagioni:
+                    scrape_and_save_teams(scraper, campionato, stagione)
+            squadre = trova_squadre(args.squadra, campionati, stagioni)
+        mancanti = {nome.lower() for nome in args.squadra} - {team["name"].lower() for team in squadre}
+        if mancanti:
+            logging.warning(f"Squadre non trovate: {', '.join(sorted(mancanti))}")
+        # Il sink scrive ogni squadra già ordinata per posizione e la aggiorna nell'archivio e nel feed delle modifiche
+        with DettagliSink(ordine_posizioni=carica_ordine_posizioni(), archivio=archivio, modifiche=modifiche) as sink:
+            righe = iter_giocatori(
+                scraper, squadre, config.rosa_dettagliata, config.campi_obbligatori or SQUAD_FIELDS,
+                max_in_corso=config.max_concorrenza, registro=PlayerRegistry(scraper),
+            )
+            inviate = invia_al_sink(righe, sink)
+        logging.info(f"Aggiornate {len(squadre)} squadre ({inviate} giocatori).")
+
+    if args.giocatore:
+        cartelle = [cartella for cartella, _ in cartelle_squadre(campionati, stagioni)]
+        aggiornate = aggiorna_giocatori(scraper, args.giocatore, cartelle, max_in_corso=config.max_concorrenza)
+        if (archivio or modifiche) and aggiornate:
+            giocatori_df = consolida_csv(squadre=squadre_da_cartelle(aggiornate))
+            if archivio:
+                archivio.salva_giocatori(normalizza_giocatori(giocatori_df))
+            if modifiche:
+                modifiche.registra_frame(giocatori_df)
+        logging.info(f"Aggiornati {len(args.giocatore)} giocatori in {len(aggiornate)} squadre.")
+
+    chiudi_scraper(scraper, opzioni_scraper)
+    if archivio:
+        archivio.chiudi()
+    chiudi_modifiche(modifiche)
+
+
+def comando_order(args):
+    from src.processing.post_processing import order_positions
+
+    order_positions(seleziona_campionati(args.campionato), seleziona_stagioni(args.stagione, 0 if args.stagione else None))
+
+
+def comando_export(args):
+    """
+    Esporta i giocatori salvati in data/raw, con i tipi di normalizza_giocatori, in un unico file,
+    nel dataset Parquet partizionato o nell'archivio SQLite.
+    """
+    from src.processing.normalization import normalizza_giocatori
+    from src.utils.save_utils import consolida_csv, salva_dataset
+
+    campionati = [campionato["nome"].lower() for campionato in seleziona_campionati(args.campionato).values()]
+    df = consolida_csv()
+    if df.empty:
+        sys.exit("Nessun giocatore salvato in data/raw.")
+    df = df[df["campionato"].isin(campionati)]
+    if args.stagione:
+        df = df[df["stagione"].isin(args.stagione)]
+    df = normalizza_giocatori(df.reset_index(drop=True))
+
+    if args.formato == "parquet":
+        output = args.output or config.cartella_dataset
+        salva_dataset(df, output, sostituisci_partizioni=True)
+    elif args.formato == "sqlite":
+        from src.utils.player_store import PlayerStore
+
+        output = args.output or config.archivio_sqlite or "data/giocatori.sqlite"
+        archivio = PlayerStore(output)
+        archivio.salva_giocatori(df)
+        archivio.chiudi()
+    else:
+        output = args.output or os.path.join("data", "export", f"giocatori.{args.formato}")
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        if args.formato == "json":
+            df.to_json(output, orient="records", force_ascii=False, indent=2, date_format="iso")
+        else:
+            df.to_csv(output, index=False, encoding="utf-8")
+    logging.info(f"Esportati {len(df)} giocatori in {output}")
+
+
+def comando_delta(args):
+    """
+    Stampa le modifiche di un run (di default l'ultimo) come JSON Lines, o solo gli id dei giocatori da ricalcolare.
+    """
+    from src.utils.change_feed import ChangeFeed
+
+    if not config.percorso_modifiche or not os.path.isfile(config.percorso_modifiche):
+        sys.exit("Nessun feed delle modifiche: esegui prima uno scraping con config.percorso_modifiche.")
+    modifiche = ChangeFeed(config.percorso_modifiche, cartella_feed=None)
+    try:
+        eventi = modifiche.modifiche(args.run, args.tipo)
+    finally:
+        modifiche.chiudi()
+    if args.id:
+        for id_giocatore in sorted({evento["id_giocatore"] for evento in eventi}):
+            print(id_giocatore)
+    else:
+        for evento in eventi:
+            print(json.dumps(evento, ensure_ascii=False))
+
+
+def comando_stats(args):
+    """
+    Riepilogo dei dati salvati e dell'ultimo run. Usa solo la libreria standard, così risponde subito.
+    """
+    cartella_raw = os.path.join("data", "raw")
+    totale_squadre = totale_giocatori = 0
+    print("Dati salvati in data/raw:")
+    for campionato in sorted(os.listdir(cartella_raw)) if os.path.isdir(cartella_raw) else []:
+        for stagione in sorted(os.listdir(os.path.join(cartella_raw, campionato))):
+            cartella_stagione = os.path.join(cartella_raw, campionato, stagione)
+            if not os.path.isdir(cartella_stagione):
                 continue
+            squadre = giocatori = 0
+            for squadra in os.listdir(cartella_stagione):
+                percorso = os.path.join(cartella_stagione, squadra, "informazioni_giocatori.csv")
+                if os.path.isfile(percorso):
+                    with open(percorso, encoding="utf-8", newline="") as f:
+                        giocatori += max(0, sum(1 for _ in csv.reader(f)) - 1)
+                    squadre += 1
+            print(f"  {campionato:16} {stagione}  {squadre:4} squadre  {giocatori:6} giocatori")
+            totale_squadre += squadre
+            totale_giocatori += giocatori
+    print(f"  {'totale':22}  {totale_squadre:4} squadre  {totale_giocatori:6} giocatori")
+
+    if config.rapporto_run and os.path.isfile(config.rapporto_run):
+        with open(config.rapporto_run, encoding="utf-8") as f:
+            rapporto = json.load(f)
+        esiti = {
+            c["etichette"].get("esito"): c["valore"] for c in rapporto.get("contatori", []) if c["nome"] == "giocatori_totale"
+        }
+        print(f"Ultimo run ({rapporto.get('modalita')}): {rapporto.get('durata_s')} s, giocatori {esiti}")
+
+    for nome, percorso, query in [
+        ("Ritentativi", config.percorso_ritentativi, "SELECT stato, COUNT(*) FROM ritentativi GROUP BY stato"),
+        ("Archivio", config.archivio_sqlite, "SELECT stagione, COUNT(*) FROM giocatori GROUP BY stagione"),
+        ("Coda distribuita", config.percorso_coda, "SELECT tipo || ' ' || stato, COUNT(*) FROM lavori GROUP BY tipo, stato"),
+        ("Modifiche dell'ultimo run", config.percorso_modifiche,
+         "SELECT 'nuovi', nuovi FROM run WHERE run = (SELECT run FROM run ORDER BY chiuso_il DESC LIMIT 1) UNION ALL "
+         "SELECT 'modificati', modificati FROM run WHERE run = (SELECT run FROM run ORDER BY chiuso_il DESC LIMIT 1) UNION ALL "
+         "SELECT 'rimossi', rimossi FROM run WHERE run = (SELECT run FROM run ORDER BY chiuso_il DESC LIMIT 1)"),
+    ]:
+        if percorso and os.path.isfile(percorso):
+            db = sqlite3.connect(f"file:{percorso}?mode=ro", uri=True)
+            try:
+                print(f"{nome}: {dict(db.execute(query).fetchall())}")
+            except sqlite3.Error as e:
+                print(f"{nome}: non leggibile ({e})")
+            finally:
+                db.close()
+
+
+def crea_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    comandi = parser.add_subparsers(dest="comando")
+
+    def filtri(sotto):
+        sotto.add_argument("--campionato", nargs="+", default=[], help="campionati di config.campionati (default: tutti)")
+        sotto.add_argument("--stagione", nargs="+", default=[], help="stagioni, es. 2024 (default: config.stagioni)")
+
+    scrape = comandi.add_parser("scrape", help="scraping completo di campionati e stagioni")
+    filtri(scrape)
+    scrape.add_argument("--modalita", choices=["pipeline", "streaming", "async", "sequenziale", "distribuita"],
+                        help="default: config.modalita_scraping")
+    scrape.add_argument("--processi", type=int, help="processi worker della modalità distribuita (default: config.processi_worker)")
+    scrape.add_argument("--backfill", type=int, help="stagioni precedenti da aggiungere (default: config.backfill_stagioni)")
+    scrape.set_defaults(funzione=comando_scrape)
+
+    worker = comandi.add_parser("worker", help="si aggiunge a un run distribuito, anche da un'altra macchina")
+    worker.add_argument("--coda", help="file della coda condivisa (default: config.percorso_coda)")
+    worker.add_argument("--processi", type=int, default=1, help="processi worker da avviare")
+    worker.add_argument("--thread", type=int, help="thread per processo (default: config.thread_worker)")
+    worker.add_argument("--richieste-al-secondo", type=float,
+                        help="limite di questa macchina, diviso tra i processi (default: config.richieste_al_secondo)")
+    worker.add_argument("--visibilita", type=float, help="secondi di lease dei lavori presi (default: config.visibilita_lavori)")
+    worker.set_defaults(funzione=comando_worker)
+
+    refresh = comandi.add_parser("refresh", help="aggiorna solo alcune squadre o alcuni giocatori")
+    filtri(refresh)
+    refresh.add_argument("--squadra", nargs="+", default=[], help="nomi delle squadre, come in squadre.csv")
+    refresh.add_argument("--giocatore", nargs="+", default=[], help="URL dei profili dei giocatori")
+    refresh.set_defaults(funzione=comando_refresh)
+
+    order = comandi.add_parser("order", help="ordina per posizione i giocatori salvati")
+    filtri(order)
+    order.set_defaults(funzione=comando_order)
+
+    export = comandi.add_parser("export", help="esporta i giocatori salvati in un unico file")
+    filtri(export)
+    export.add_argument("--formato", choices=["csv", "json", "parquet", "sqlite"], default="csv")
+    export.add_argument("--output", help="file (o cartella per parquet) di destinazione")
+    export.set_defaults(funzione=comando_export)
+
+    delta = comandi.add_parser("delta", help="modifiche rispetto al run precedente")
+    delta.add_argument("--run", help="identificativo del run, es. 20241017T210500123456 (default: l'ultimo)")
+    delta.add_argument("--tipo", choices=["nuovo", "modificato", "rimosso"])
+    delta.add_argument("--id", action="store_true", help="solo gli id dei giocatori da ricalcolare")
+    delta.set_defaults(funzione=comando_delta)
+
+    stats = comandi.add_parser("stats", help="riepilogo dei dati salvati e dell'ultimo run")
+    stats.set_defaults(funzione=comando_stats)
+    return parser
 
-            # Scraping dei giocatori e dei loro dettagli per tutte le squadre
-            for _, team in squadre_df.iterrows():
-                scrape_and_save_players(scraper, team, campionato["nome"], stagione)
 
-    print("Scraping completato per tutti i campionati e tutte le squadre.")
+def main(argv: list = None):
+    parser = crea_parser()
+    args = parser.parse_args(argv)
+    if args.comando is None:
+        # Compatibilità: `python main.py` senza argomenti esegue lo scraping completo
+        args = parser.parse_args(["scrape"])
+    if args.comando == "refresh" and not (args.squadra or args.giocatore):
+        parser.error("refresh richiede --squadra o --giocatore")
+    configura_log()
+    args.funzione(args)
 
-    print("Ordinamento dei giocatori per posizione")
-    order_positions()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
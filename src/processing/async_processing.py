@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import pandas as pd
+
+from src.processing.processing import salva_squadre, salva_giocatori
+from src.scraping.async_scraper import AsyncTransfermarktScraper
+from src.scraping.player_record import PlayerRecord, records_to_frame
+from src.scraping.player_registry import AsyncPlayerRegistry
+from src.scraping.scraper import SQUAD_FIELDS
+from src.utils.metrics import METRICHE
+from src.utils.save_utils import salva_df
+from src.utils.scraper_utils import competition_season_url
+
+async def scrape_and_save_teams_async(scraper: AsyncTransfermarktScraper, campionato: dict, stagione: str) -> pd.DataFrame:
+    """
+    Versione async di scrape_and_save_teams.
+
+    Args:
+        scraper (AsyncTransfermarktScraper): L'istanza dello scraper async.
+        campionato (dict): Dizionario contenente le informazioni del campionato.
+        stagione (str): La stagione da scrapare.
+
+    Returns:
+        pd.DataFrame: DataFrame contenente le squadre scrappate.
+    """
+    logging.info(f"Inizio scraping per {campionato['nome']} stagione {stagione}...")
+    teams = await scraper.scrape_teams(competition_season_url(campionato["url"], stagione))
+    return salva_squadre(teams, campionato["nome"], stagione)
+
+async def scrape_and_save_players_async(scraper: AsyncTransfermarktScraper, team: pd.Series, campionato_nome: str, stagione: str,
+                                        registro: AsyncPlayerRegistry = None):
+    """
+    Versione async di scrape_and_save_players: i dettagli di tutti i giocatori vengono richiesti
+    insieme e il limite di concorrenza è quello globale dello scraper.
+
+    Args:
+        scraper (AsyncTransfermarktScraper): L'istanza dello scraper async.
+        team (pd.Series): Serie contenente i dettagli della squadra.
+        campionato_nome (str): Nome del campionato.
+        stagione (str): La stagione.
+        registro (AsyncPlayerRegistry, optional): Registro del run, per scaricare ogni profilo una volta sola.
+    """
+    team_name = team["name"]
+
+    logging.info(f"Inizio scraping per {team_name}...")
+    players = await scraper.scrape_players(team["link"])
+    players_df, cartella_giocatori = salva_giocatori(players, team_name, campionato_nome, stagione)
+
+    if players_df.empty:
+        return
+
+    async def dettagli_giocatore(giocatore):
+        try:
+            logging.debug(f"Inizio scraping dei dettagli per il giocatore {giocatore['name']}...")
+            if registro:
+                dettagli = await registro.get(giocatore["link"])
+            else:
+                dettagli = await scraper.scrape_player_details(giocatore["link"])
+            METRICHE.incrementa("giocatori_totale", esito="scaricato")
+            return dettagli
+        except Exception as e:
+            METRICHE.incrementa("giocatori_totale", esito="errore")
+            logging.error(f"Errore nello scraping del giocatore {giocatore['name']} ({giocatore['link']}): {e}")
+            return None
+
+    dettagli = await asyncio.gather(*(dettagli_giocatore(giocatore) for giocatore in players_df.to_dict("records")))
+    righe = [riga for riga in dettagli if riga is not None]
+
+    # Un'unica scrittura per squadra, nell'ordine della rosa
+    salva_df(records_to_frame(righe), cartella_giocatori, "informazioni_giocatori")
+    logging.info(f"Dettagli di {len(righe)} giocatori salvati in {cartella_giocatori}/informazioni_giocatori.csv")
+
+async def scrape_and_save_squad_async(scraper: AsyncTransfermarktScraper, team: pd.Series, campionato_nome: str, stagione: str,
+                                     campi_obbligatori: list = SQUAD_FIELDS, registro: AsyncPlayerRegistry = None):
+    """
+    Versione async di scrape_and_save_squad: una richiesta per la rosa dettagliata e una per
+    ciascun giocatore a cui manca uno dei campi obbligatori.
+
+    Args:
+        scraper (AsyncTransfermarktScraper): L'istanza dello scraper async.
+        team (pd.Series): Serie contenente i dettagli della squadra.
+        campionato_nome (str): Nome del campionato.
+        stagione (str): La stagione.
+        campi_obbligatori (list): Campi di COLUMN_ORDER che devono essere valorizzati per ogni giocatore.
+        registro (AsyncPlayerRegistry, optional): Registro del run, per scaricare ogni profilo una volta sola.
+    """
+    team_name = team["name"]
+
+    logging.info(f"Inizio scraping della rosa di {team_name}...")
+    squad = await scraper.scrape_squad(team["link"])
+    players_df, cartella_giocatori = salva_giocatori(
+        [{"name": player["name"], "link": player["link"]} for player in squad], team_name, campionato_nome, stagione
+    )
+
+    if players_df.empty:
+        return
+
+    async def completa(player):
+        try:
+            if registro:
+                dettagli = await registro.complete(player, campi_obbligatori)
+            else:
+                dettagli = await scraper.complete_player_details(player, campi_obbligatori)
+            METRICHE.incrementa("giocatori_totale", esito="scaricato")
+            return dettagli
+        except Exception as e:
+            METRICHE.incrementa("giocatori_totale", esito="errore")
+            logging.error(f"Errore nello scraping del giocatore {player['name']} ({player['link']}): {e}")
+            return PlayerRecord.from_mapping(player)
+
+    dettagli = await asyncio.gather(*(completa(player) for player in squad))
+
+    salva_df(records_to_frame(dettagli), cartella_giocatori, "informazioni_giocatori")
+    logging.info(f"Dettagli di {len(dettagli)} giocatori salvati in {cartella_giocatori}/informazioni_giocatori.csv")
+
+async def scrape_campionato_async(scraper: AsyncTransfermarktScraper, campionato: dict, stagione: str,
+                                  rosa_dettagliata: bool = False, campi_obbligatori: list = SQUAD_FIELDS,
+                                  registro: AsyncPlayerRegistry = None):
+    """
+    Scrape squadre, giocatori e dettagli di un campionato per una stagione.
+
+    Args:
+        scraper (AsyncTransfermarktScraper): L'istanza dello scraper async.
+        campionato (dict): Dizionario contenente le informazioni del campionato.
+        stagione (str): La stagione da scrapare.
+        rosa_dettagliata (bool): Se True usa la rosa dettagliata invece di una pagina per giocatore.
+        campi_obbligatori (list): Campi che, se assenti dalla rosa, richiedono la pagina del giocatore.
+        registro (AsyncPlayerRegistry, optional): Registro del run, per scaricare ogni profilo una volta sola.
+    """
+    squadre_df = await scrape_and_save_teams_async(scraper, campionato, stagione)
+
+    if squadre_df.empty:
+        logging.warning(f"Nessuna squadra trovata per {campionato['nome']} stagione {stagione}.")
+        return
+
+    if rosa_dettagliata:
+        await asyncio.gather(*(
+            scrape_and_save_squad_async(scraper, team, campionato["nome"], stagione, campi_obbligatori, registro)
+            for _, team in squadre_df.iterrows()
+        ))
+    else:
+        await asyncio.gather(*(
+            scrape_and_save_players_async(scraper, team, campionato["nome"], stagione, registro)
+            for _, team in squadre_df.iterrows()
+        ))
+
+async def scrape_all_async(scraper: AsyncTransfermarktScraper, campionati: dict, stagioni: list,
+                           rosa_dettagliata: bool = False, campi_obbligatori: list = SQUAD_FIELDS):
+    """
+    Scrape tutti i campionati e tutte le stagioni in un unico event loop.
+    Un unico AsyncPlayerRegistry fa sì che ogni profilo venga scaricato una volta sola,
+    anche se il giocatore compare in più squadre o stagioni.
+
+    Args:
+        scraper (AsyncTransfermarktScraper): L'istanza dello scraper async.
+        campionati (dict): Campionati da scrapare (come config.campionati).
+        stagioni (list): Stagioni da scrapare (come config.stagioni).
+        rosa_dettagliata (bool): Se True usa la rosa dettagliata invece di una pagina per giocatore.
+        campi_obbligatori (list): Campi che, se assenti dalla rosa, richiedono la pagina del giocatore.
+    """
+    registro = AsyncPlayerRegistry(scraper)
+    await asyncio.gather(*(
+        scrape_campionato_async(scraper, campionato, stagione, rosa_dettagliata, campi_obbligatori, registro)
+        for campionato in campionati.values()
+        for stagione in stagioni
+    ))
@@ -0,0 +1,261 @@
+import collections
+import logging
+import os
+import socket
+import threading
+import time
+
+from src.processing.post_processing import chiave_posizione
+from src.processing.processing import salva_giocatori, salva_squadre
+from src.scraping.player_record import COLUMN_ORDER, PlayerRecord, records_to_frame
+from src.scraping.player_registry import PlayerRegistry
+from src.scraping.scraper import SQUAD_FIELDS, TransfermarktScraper
+from src.utils.metrics import METRICHE
+from src.utils.retry import backoff_delay
+from src.utils.save_utils import salva_df
+from src.utils.scraper_utils import competition_season_url
+from src.utils.work_queue import STATO_FATTO, Lavoro, WorkQueue
+
+# Tipi di lavoro nella coda distribuita
+TIPO_COMPETIZIONE = "competizione"
+TIPO_SQUADRA = "squadra"
+TIPO_GIOCATORE = "giocatore"
+TIPO_SALVA_SQUADRA = "salva_squadra"
+
+# Prima si finiscono le squadre già iniziate (giocatori), poi se ne aprono di nuove:
+# i file vengono scritti presto e i risultati in attesa nella coda restano pochi
+PRIORITA = {TIPO_GIOCATORE: 1, TIPO_SQUADRA: 2, TIPO_COMPETIZIONE: 3}
+
+
+def riempi_coda(coda: WorkQueue, campionati: dict, stagioni: list) -> int:
+    """
+    Mette in coda una competizione per ogni campionato e stagione; squadre e giocatori
+    vengono aggiunti dai worker man mano che le pagine sono lette.
+    Restituisce il numero di competizioni aggiunte (quelle già presenti non vengono duplicate).
+
+    Args:
+        coda (WorkQueue): La coda condivisa del run.
+        campionati (dict): Campionati da scrapare (come config.campionati).
+        stagioni (list): Stagioni da scrapare (come config.stagioni).
+    """
+    aggiunte = 0
+    for campionato in campionati.values():
+        for stagione in stagioni:
+            aggiunte += coda.aggiungi(
+                TIPO_COMPETIZIONE, competition_season_url(campionato["url"], stagione),
+                {"campionato": campionato, "stagione": stagione}, PRIORITA[TIPO_COMPETIZIONE],
+            )
+    return aggiunte
+
+
+class WorkerCoda:
+    """
+    Worker di un run distribuito: prende i lavori dalla coda condivisa, li esegue e ne dà conferma.
+
+    Ogni thread prende un lavoro alla volta (competizione, squadra, giocatore o
+    scrittura di una squadra completa). La competizione aggiunge in coda le sue
+    squadre, la squadra i suoi giocatori; i dettagli di ogni giocatore restano
+    nella coda come risultato del lavoro e, quando tutti i giocatori di una squadra
+    sono finiti, la coda aggiunge la scrittura della squadra, che produce
+    informazioni_giocatori.csv in un'unica scrittura, come il DettagliSink.
+    Un lavoro fallito torna in coda con backoff; quello di un worker caduto torna
+    disponibile alla scadenza del lease, per qualsiasi altro worker. Finché un
+    lavoro è in esecuzione un thread ne rinnova il lease ogni terzo di
+    `visibilita`, così un giocatore che aspetta Retry-After o il backoff dei
+    ritentativi oltre la visibilità non viene ripreso da un altro worker.
+
+    Più processi, anche su macchine diverse che condividono il file della coda
+    e la cartella data, possono eseguire un WorkerCoda sulla stessa coda. I
+    profili dei giocatori scaricati restano nella coda (WorkQueue.condividi),
+    così un giocatore presente in più squadre o stagioni viene scaricato una
+    volta per run e non una per processo. Il
+    worker termina quando nella coda non resta nulla da fare né in corso.
+    """
+
+    def __init__(self, coda: WorkQueue, scraper: TransfermarktScraper, rosa_dettagliata: bool = False,
+                 campi_obbligatori: list = SQUAD_FIELDS, ordine_posizioni: dict = None, thread: int = 4,
+                 nome: str = None, attesa: float = 1.0, attesa_ritentativi: float = 30,
+                 nome_file: str = "informazioni_giocatori", colonne: list = COLUMN_ORDER):
+        """
+        Args:
+            coda (WorkQueue): La coda condivisa del run.
+            scraper (TransfermarktScraper): L'istanza dello scraper, condivisa dai thread del worker.
+            rosa_dettagliata (bool): Se True usa la rosa dettagliata e completa solo i campi mancanti.
+            campi_obbligatori (list): Campi che, se assenti dalla rosa, richiedono la pagina del giocatore.
+            ordine_posizioni (dict, optional): Posizione -> ordine; se presente i file sono scritti già ordinati.
+            thread (int): Thread che prendono lavori dalla coda.
+            nome (str, optional): Nome del worker nella coda. Defaults to host:pid.
+            attesa (float): Secondi tra due tentativi di prendere un lavoro quando non ce ne sono di disponibili.
+            attesa_ritentativi (float): Secondi di base del backoff dei lavori falliti.
+            nome_file (str): Nome del file (senza estensione) scritto in ogni cartella di squadra.
+            colonne (list): Colonne del file, nell'ordine di scrittura.
+        """
+        self.coda = coda
+        self.scraper = scraper
+        self.rosa_dettagliata = rosa_dettagliata
+        self.campi_obbligatori = campi_obbligatori
+        self.thread = thread
+        self.nome = nome or f"{socket.gethostname()}:{os.getpid()}"
+        self.attesa = attesa
+        self.attesa_ritentativi = attesa_ritentativi
+        self.nome_file = nome_file
+        self.colonne = colonne
+        self._chiave = chiave_posizione(ordine_posizioni) if ordine_posizioni else None
+        # Profili condivisi tra le squadre e le stagioni, anche con gli altri processi attraverso la coda
+        self.registro = PlayerRegistry(scraper, condivisi=coda)
+        self.elaborati = collections.Counter()
+        self.lease_persi = 0
+        self._lock = threading.Lock()
+        # thread -> lavoro in esecuzione, di cui il thread di rinnovo prolunga il lease
+        self._in_corso = {}
+        self._fine = threading.Event()
+        self._gestori = {
+            TIPO_COMPETIZIONE: self._competizione,
+            TIPO_SQUADRA: self._squadra,
+            TIPO_GIOCATORE: self._giocatore,
+            TIPO_SALVA_SQUADRA: self._salva_squadra,
+        }
+
+    def esegui(self) -> dict:
+        """
+        Esegue i lavori della coda con `thread` thread finché la coda non è vuota.
+        Restituisce il numero di lavori completati per tipo.
+        """
+        threads = [
+            threading.Thread(target=self._ciclo, args=(f"{self.nome}/{indice}",), name=f"worker-{indice}")
+            for indice in range(self.thread)
+        ]
+        rinnovo = threading.Thread(target=self._rinnova_lease, name="rinnovo-lease", daemon=True)
+        self._fine.clear()
+        rinnovo.start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self._fine.set()
+        rinnovo.join()
+        logging.info(
+            f"Worker {self.nome} terminato: {dict(self.elaborati)} lavori completati, "
+            f"{self.registro.shared} profili condivisi, {self.lease_persi} lease persi."
+        )
+        return dict(self.elaborati)
+
+    def _ciclo(self, worker: str):
+        while True:
+            lavoro = self.coda.prendi(worker)
+            if lavoro is None:
+                # Nulla di disponibile: si esce solo se nessun altro worker ha lavori in corso,
+                # che potrebbero aggiungerne di nuovi o tornare in coda alla scadenza del lease
+                if self.coda.vuota():
+                    return
+                time.sleep(self.attesa)
+                continue
+            with self._lock:
+                self._in_corso[worker] = lavoro
+            try:
+                with METRICHE.cronometra("lavoro_secondi", tipo=lavoro.tipo):
+                    risultato, figli = self._gestori[lavoro.tipo](lavoro)
+            except Exception as e:
+                attesa = backoff_delay(lavoro.tentativi - 1, self.attesa_ritentativi, self.attesa_ritentativi * 2 ** self.coda.max_tentativi)
+                logging.warning(
+                    f"Lavoro {lavoro.tipo} {lavoro.chiave} fallito (tentativo {lavoro.tentativi} di {self.coda.max_tentativi}), "
+                    f"di nuovo disponibile tra {attesa:.1f}s: {e}"
+                )
+                METRICHE.incrementa("lavori_totale", tipo=lavoro.tipo, esito="errore")
+                self.coda.fallisci(lavoro, worker, str(e), attesa)
+                continue
+            finally:
+                with self._lock:
+                    self._in_corso.pop(worker, None)
+            if self.coda.completa(lavoro, worker, risultato, figli):
+                METRICHE.incrementa("lavori_totale", tipo=lavoro.tipo, esito="completato")
+                with self._lock:
+                    self.elaborati[lavoro.tipo] += 1
+            else:
+                # Lease scaduto e lavoro ripreso da un altro worker: il risultato di questo viene scartato
+                logging.warning(f"Lease del lavoro {lavoro.tipo} {lavoro.chiave} perso: il risultato viene scartato")
+                METRICHE.incrementa("lavori_totale", tipo=lavoro.tipo, esito="lease_perso")
+                with self._lock:
+                    self.lease_persi += 1
+
+    def _rinnova_lease(self):
+        """
+        Prolunga ogni terzo di visibilità il lease dei lavori in esecuzione, finché il worker non termina.
+        """
+        while not self._fine.wait(self.coda.visibilita / 3):
+            with self._lock:
+                in_corso = list(self._in_corso.items())
+            for worker, lavoro in in_corso:
+                try:
+                    if not self.coda.rinnova(lavoro, worker):
+                        logging.debug(f"Lease del lavoro {lavoro.tipo} {lavoro.chiave} non rinnovato: già perso")
+                except Exception as e:
+                    logging.warning(f"Errore nel rinnovo del lease di {lavoro.tipo} {lavoro.chiave}: {e}")
+
+    def _competizione(self, lavoro: Lavoro):
+        campionato, stagione = lavoro.dati["campionato"], lavoro.dati["stagione"]
+        logging.info(f"Inizio scraping per {campionato['nome']} stagione {stagione}...")
+        teams = self.scraper.scrape_teams(lavoro.chiave)
+        if not teams:
+            # Pagina non scaricata o senza squadre: il lavoro torna in coda invece di chiudere il campionato
+            raise RuntimeError(f"nessuna squadra trovata per {campionato['nome']} stagione {stagione}")
+        squadre_df = salva_squadre(teams, campionato["nome"], stagione)
+        figli = [
+            {"tipo": TIPO_SQUADRA, "chiave": team["link"], "dati": team, "priorita": PRIORITA[TIPO_SQUADRA],
+             "al_completamento": TIPO_SALVA_SQUADRA}
+            for team in squadre_df.to_dict("records")
+        ]
+        return None, figli
+
+    def _squadra(self, lavoro: Lavoro):
+        team = lavoro.dati
+        logging.info(f"Inizio scraping per {team['name']}...")
+        if self.rosa_dettagliata:
+            players = self.scraper.scrape_squad(team["link"])
+        else:
+            players = self.scraper.scrape_players(team["link"])
+        players_df, _ = salva_giocatori(
+            [{"name": player["name"], "link": player["link"]} for player in players],
+            team["name"], team["campionato"], team["stagione"],
+        )
+        if players_df.empty:
+            raise RuntimeError(f"nessun giocatore trovato per la squadra {team['name']}")
+        # La rosa dettagliata non ha duplicati; l'elenco semplice sì, come in scrape_and_save_players
+        players = players if self.rosa_dettagliata else players_df.to_dict("records")
+        figli = [
+            {"tipo": TIPO_GIOCATORE, "chiave": f"{team['link']}#{indice}", "dati": player, "priorita": PRIORITA[TIPO_GIOCATORE]}
+            for indice, player in enumerate(players)
+        ]
+        return {"giocatori": len(players)}, figli
+
+    def _giocatore(self, lavoro: Lavoro):
+        player = lavoro.dati
+        logging.debug(f"Inizio scraping dei dettagli per il giocatore {player['name']}...")
+        if self.rosa_dettagliata:
+            dettagli = self.registro.complete(player, self.campi_obbligatori, raise_errors=True)
+        else:
+            dettagli = self.registro.get(player["link"], raise_errors=True)
+        METRICHE.incrementa("giocatori_totale", esito="scaricato")
+        return dettagli.to_dict(), ()
+
+    def _salva_squadra(self, lavoro: Lavoro):
+        """
+        Scrive il file della squadra con i dettagli di tutti i suoi giocatori, nell'ordine della rosa
+        (o per posizione); i giocatori falliti restano fuori, come le righe scartate dal sink.
+        """
+        team = lavoro.dati
+        risultati = self.coda.risultati(team["link"])
+        righe = [PlayerRecord.from_mapping(dettagli) for _, dettagli, stato in risultati if stato == STATO_FATTO and dettagli]
+        scartate = len(risultati) - len(righe)
+        if self._chiave:
+            # Ordinamento stabile: a parità di posizione resta l'ordine della rosa
+            righe.sort(key=self._chiave)
+        cartella = os.path.join("data", "raw", team["campionato"].lower(), team["stagione"], team["name"])
+        if righe:
+            if not salva_df(records_to_frame(righe, self.colonne), cartella, self.nome_file):
+                # Il lavoro torna in coda invece di risultare completato
+                raise OSError(f"Scrittura di {cartella}/{self.nome_file}.csv non riuscita")
+            logging.info(f"Dettagli di {len(righe)} giocatori salvati in {cartella}/{self.nome_file}.csv")
+        if scartate:
+            logging.warning(f"{scartate} giocatori di {team['name']} non scaricati")
+        return {"righe": len(righe), "scartate": scartate}, ()
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+# Moltiplicatori dei suffissi dei valori di mercato ("€ 45,00 mln", "€ 800 mila", "€45.00m", "€800k")
+MOLTIPLICATORI_VALORE = {"mld": 1e9, "bn": 1e9, "mln": 1e6, "m": 1e6, "mila": 1e3, "k": 1e3}
+
+COLONNE_VALORE = ["valore_attuale", "valore_piu_alto"]
+COLONNE_DATA = ["data_nascita", "in_rosa_da", "scadenza", "data_aggiornamento"]
+COLONNE_INTERE = ["età", "numero_maglia"]
+COLONNE_ID = ["id_giocatore"]
+COLONNE_CATEGORIA = [
+    "campionato",
+    "stagione",
+    "squadra",
+    "posizione",
+    "piede",
+    "ruolo_naturale",
+    "squadra_attuale",
+    "nazionalità_principale",
+]
+
+_NUMERO = r"(\d+(?:[.,]\d+)*)"
+_REGEX_VALORE = rf"{_NUMERO}\s*(mld|bn|mln|mila|m|k)?"
+_REGEX_DATA = r"(\d{1,2}/\d{1,2}/\d{4})"
+
+
+def _numero(testo: pd.Series) -> pd.Series:
+    """
+    Converte numeri in formato italiano ("1.200,50") o inglese ("1200.50") in float.
+    """
+    testo = testo.astype("string")
+    # Con la virgola decimale i punti sono separatori delle migliaia
+    con_virgola = testo.str.contains(",", regex=False, na=False)
+    testo = testo.where(~con_virgola, testo.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    return pd.to_numeric(testo, errors="coerce")
+
+
+def valore_in_euro(valori: pd.Series) -> pd.Series:
+    """
+    Converte i valori di mercato testuali in euro (float64); "-" e valori mancanti diventano NaN.
+    """
+    parti = valori.astype("string").str.lower().str.extract(_REGEX_VALORE)
+    moltiplicatore = parti[1].map(MOLTIPLICATORI_VALORE).astype("float64").fillna(1.0)
+    return (_numero(parti[0]) * moltiplicatore).astype("float64")
+
+
+def altezza_in_metri(altezze: pd.Series) -> pd.Series:
+    """
+    Converte le altezze testuali ("1,85", "1,85 m") in metri (float32).
+    """
+    return _numero(altezze.astype("string").str.extract(_NUMERO)[0]).astype("float32")
+
+
+def data(date: pd.Series) -> pd.Series:
+    """
+    Converte le date gg/mm/aaaa contenute nel testo (es. "Ultimo aggiornamento: 12/03/2024") in datetime64.
+    """
+    return pd.to_datetime(date.astype("string").str.extract(_REGEX_DATA)[0], format="%d/%m/%Y", errors="coerce")
+
+
+def intero_piccolo(valori: pd.Series) -> pd.Series:
+    """
+    Converte età e numeri di maglia in interi a 8 bit con valori mancanti (Int8).
+    """
+    numeri = pd.to_numeric(valori.astype("string").str.extract(r"(\d+)")[0], errors="coerce")
+    return numeri.where(numeri.between(0, np.iinfo(np.int8).max)).astype("Int8")
+
+
+def nazionalità_principale(valore):
+    """
+    Restituisce la prima nazionalità di una lista (anche letta da Parquet come array);
+    una stringa resta com'è e i valori mancanti, anche se l'intera colonna è vuota, diventano None.
+    """
+    if isinstance(valore, (list, tuple, np.ndarray)):
+        return valore[0] if len(valore) else None
+    return valore if isinstance(valore, str) else None
+
+
+def normalizza_giocatori(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converte i dettagli testuali dei giocatori in colonne tipizzate e compatte.
+
+    - valori di mercato in euro (float64);
+    - altezza in metri (float32);
+    - date in datetime64;
+    - età e numero di maglia in Int8;
+    - id del giocatore in Int64, per i join tra stagioni, squadre e run;
+    - posizione, piede, ruoli, squadre, campionato e stagione in categorie;
+    - nazionalità resta una lista e la prima diventa `nazionalità_principale` (categoria).
+
+    Le colonne assenti vengono ignorate, quelle non elencate restano invariate.
+
+    Args:
+        df (pd.DataFrame): I dettagli dei giocatori (es. da consolida_csv o dal sink).
+
+    Returns:
+        pd.DataFrame: Un nuovo DataFrame con le colonne tipizzate.
+    """
+    df = df.copy()
+    for colonna in COLONNE_VALORE:
+        if colonna in df.columns:
+            df[colonna] = valore_in_euro(df[colonna])
+    if "altezza" in df.columns:
+        df["altezza"] = altezza_in_metri(df["altezza"])
+    for colonna in COLONNE_DATA:
+        if colonna in df.columns:
+            df[colonna] = data(df[colonna])
+    for colonna in COLONNE_INTERE:
+        if colonna in df.columns:
+            df[colonna] = intero_piccolo(df[colonna])
+    for colonna in COLONNE_ID:
+        if colonna in df.columns:
+            df[colonna] = pd.to_numeric(df[colonna], errors="coerce").astype("Int64")
+    if "nazionalità" in df.columns:
+        df["nazionalità_principale"] = df["nazionalità"].map(nazionalità_principale)
+    for colonna in COLONNE_CATEGORIA:
+        if colonna in df.columns:
+            df[colonna] = df[colonna].astype("string").astype("category")
+    return df
@@ -0,0 +1,396 @@
+import heapq
+import itertools
+import logging
+import queue
+import threading
+import time
+
+from src.processing.processing import salva_squadre, salva_giocatori
+from src.processing.sink import DettagliSink
+from src.scraping.player_record import COLUMN_ORDER, PlayerRecord
+from src.scraping.player_registry import PlayerRegistry
+from src.scraping.scraper import SQUAD_FIELDS, TransfermarktScraper, merge_player_details
+from src.utils.change_feed import ChangeFeed
+from src.utils.metrics import METRICHE
+from src.utils.player_store import PlayerStore
+from src.utils.manifest import STATO_ERRORE, STATO_IN_CORSO, STATO_OK, RunManifest, hash_contenuto
+from src.utils.retry import RetryQueue, backoff_delay
+from src.utils.scraper_utils import competition_season_url, player_id
+
+# Segnale di fine stream passato da uno stadio al successivo
+_FINE = object()
+
+
+class _Stadio:
+    """
+    Uno stadio della pipeline: `workers` thread che consumano una coda limitata
+    e inoltrano i risultati alla coda dello stadio successivo.
+    """
+
+    def __init__(self, nome: str, funzione, workers: int, dimensione_coda: int):
+        self.nome = nome
+        self.funzione = funzione
+        self.workers = workers
+        self.coda = queue.Queue(maxsize=dimensione_coda)
+        self.elaborati = 0
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def avvia(self, emetti):
+        """
+        Avvia i worker; `emetti` inoltra un elemento allo stadio successivo.
+        """
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._lavora, args=(emetti,), name=f"{self.nome}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _lavora(self, emetti):
+        while True:
+            elemento = self.coda.get()
+            if elemento is _FINE:
+                self.coda.task_done()
+                break
+            METRICHE.imposta("coda_profondita", self.coda.qsize(), stadio=self.nome)
+            inizio = time.perf_counter()
+            try:
+                self.funzione(elemento, emetti)
+            except Exception as e:
+                METRICHE.incrementa("errori_stadio_totale", stadio=self.nome)
+                logging.error(f"Errore nello stadio {self.nome}: {e}")
+            METRICHE.osserva("stadio_secondi", time.perf_counter() - inizio, stadio=self.nome)
+            with self._lock:
+                self.elaborati += 1
+            self.coda.task_done()
+
+    def chiudi(self):
+        """
+        Attende che tutti gli elementi in coda siano elaborati e ferma i worker.
+        """
+        for _ in self._threads:
+            self.coda.put(_FINE)
+        for thread in self._threads:
+            thread.join()
+
+
+class _Ritentativi:
+    """
+    Elementi in attesa di tornare nella coda di uno stadio dopo un errore.
+
+    Un thread rimette ogni elemento nella coda all'istante previsto dal backoff;
+    `in_attesa` conta gli elementi non ancora rimessi in coda, così chi chiude
+    lo stadio sa se deve aspettare ancora.
+    """
+
+    def __init__(self, coda: queue.Queue):
+        self.coda = coda
+        self.in_attesa = 0
+        self._heap = []
+        self._sequenza = itertools.count()
+        self._condizione = threading.Condition()
+        self._fermo = False
+        self._thread = threading.Thread(target=self._lavora, name="ritentativi", daemon=True)
+
+    def avvia(self):
+        self._thread.start()
+
+    def programma(self, elemento, attesa: float):
+        with self._condizione:
+            heapq.heappush(self._heap, (time.monotonic() + attesa, next(self._sequenza), elemento))
+            self.in_attesa += 1
+            self._condizione.notify_all()
+
+    def attendi(self):
+        """
+        Attende che tutti gli elementi programmati siano tornati in coda.
+        """
+        with self._condizione:
+            while self.in_attesa:
+                self._condizione.wait()
+
+    def chiudi(self):
+        with self._condizione:
+            self._fermo = True
+            self._condizione.notify_all()
+        self._thread.join()
+
+    def _lavora(self):
+        while True:
+            with self._condizione:
+                while not self._fermo and (not self._heap or self._heap[0][0] > time.monotonic()):
+                    self._condizione.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                if self._fermo:
+                    return
+                _, _, elemento = heapq.heappop(self._heap)
+            # Fuori dal lock: la coda è limitata e put può bloccare
+            self.coda.put(elemento)
+            with self._condizione:
+                self.in_attesa -= 1
+                self._condizione.notify_all()
+
+
+class ScrapingPipeline:
+    """
+    Pipeline a stadi competizioni -> squadre -> giocatori -> dettagli -> sink (DettagliSink).
+
+    Ogni stadio ha la sua coda limitata e i suoi worker; lo stadio dei dettagli è
+    un unico pool condiviso da tutti i campionati e le stagioni, quindi mentre
+    gli ultimi giocatori di una squadra sono in corso le rose delle squadre
+    successive sono già state richieste e il pool resta sempre pieno. Le code
+    limitate fanno da contropressione: se i dettagli rallentano, gli stadi a
+    monte si fermano invece di accumulare lavoro in memoria.
+
+    Con un `manifest` (RunManifest) la pipeline è incrementale e riprendibile:
+    i giocatori scaricati con successo entro `freschezza` secondi vengono
+    ripresi dal manifest senza richiedere la loro pagina, e le squadre la cui
+    rosa non è cambiata dall'ultimo run completato non generano alcuna
+    richiesta per i giocatori.
+
+    Un giocatore la cui pagina non si riesce a scaricare (dopo i ritentativi
+    immediati dello scraper) non produce una riga vuota: viene rimesso nella
+    coda dei dettagli con backoff esponenziale fino a `ritentativi` volte e la
+    squadra viene scritta quando tutti i suoi giocatori sono arrivati. Con una
+    `coda_ritentativi` (RetryQueue) i giocatori in attesa sono salvati su disco
+    e un run successivo ne rispetta il backoff.
+
+    Il profilo di un giocatore non dipende dalla stagione: un PlayerRegistry
+    condiviso fa sì che ogni profilo venga scaricato una sola volta per run,
+    anche se il giocatore compare in più stagioni (ad esempio in un backfill
+    dello storico) o in più squadre, e sia copiato in tutte le sue righe. Con la rosa dettagliata i
+    campi della stagione (numero, posizione, valore...) vengono sempre dalla
+    rosa di quella stagione.
+    """
+
+    def __init__(self, scraper: TransfermarktScraper, workers_dettagli: int = 8, workers_squadre: int = 2,
+                 dimensione_code: int = 200, rosa_dettagliata: bool = False, campi_obbligatori: list = SQUAD_FIELDS,
+                 intervallo_flush: float = None, cartella_dataset: str = None, manifest: RunManifest = None,
+                 freschezza: float = None, ordine_posizioni: dict = None, ritentativi: int = 3,
+                 attesa_ritentativi: float = 30, coda_ritentativi: RetryQueue = None, archivio: PlayerStore = None,
+                 modifiche: ChangeFeed = None):
+        """
+        Args:
+            scraper (TransfermarktScraper): L'istanza dello scraper, condivisa da tutti i worker.
+            workers_dettagli (int): Worker del pool globale per le pagine dei giocatori.
+            workers_squadre (int): Worker per le pagine delle squadre.
+            dimensione_code (int): Numero massimo di elementi in attesa in ciascuna coda.
+            rosa_dettagliata (bool): Se True usa la rosa dettagliata e completa solo i campi mancanti.
+            campi_obbligatori (list): Campi che, se assenti dalla rosa, richiedono la pagina del giocatore.
+            intervallo_flush (float, optional): Secondi tra due scritture delle squadre ancora incomplete.
+            cartella_dataset (str, optional): Cartella del dataset Parquet consolidato, se richiesto.
+            manifest (RunManifest, optional): Manifest per riprendere i run e saltare il lavoro già fatto.
+            freschezza (float, optional): Secondi entro cui un giocatore o una squadra non vengono riscaricati.
+            ordine_posizioni (dict, optional): Posizione -> ordine; se presente i file sono scritti già ordinati.
+            ritentativi (int): Volte in cui un giocatore non scaricato viene rimesso in coda.
+            attesa_ritentativi (float): Secondi di base del backoff esponenziale tra due ritentativi.
+            coda_ritentativi (RetryQueue, optional): Coda persistente dei giocatori da ritentare.
+            archivio (PlayerStore, optional): Database SQLite aggiornato dal sink con ogni squadra completa.
+            modifiche (ChangeFeed, optional): Feed delle modifiche rispetto all'ultimo run, alimentato dal sink.
+        """
+        self.scraper = scraper
+        self.rosa_dettagliata = rosa_dettagliata
+        self.campi_obbligatori = campi_obbligatori
+        self.competizioni = _Stadio("competizioni", self._scrape_competizione, 1, dimensione_code)
+        self.squadre = _Stadio("squadre", self._scrape_squadra, workers_squadre, dimensione_code)
+        self.dettagli = _Stadio("dettagli", self._scrape_dettagli, workers_dettagli, dimensione_code)
+        self.manifest = manifest
+        self.freschezza = freschezza
+        self.ritentativi = ritentativi
+        self.attesa_ritentativi = attesa_ritentativi
+        self.coda_ritentativi = coda_ritentativi
+        self._ritentativi = _Ritentativi(self.dettagli.coda)
+        # Giocatori falliti in un run precedente, con il loro backoff
+        self._rinviati = {voce["url"]: voce for voce in coda_ritentativi.in_attesa("giocatore")} if coda_ritentativi else {}
+        self.giocatori_riusati = 0
+        self.giocatori_ritentati = 0
+        self.registro = PlayerRegistry(scraper)
+        self.squadre_invariate = 0
+        self._squadre_in_corso = {}
+        self._lock = threading.Lock()
+        self.sink = DettagliSink(
+            intervallo_flush=intervallo_flush, cartella_dataset=cartella_dataset,
+            al_completamento=self._squadra_completata, ordine_posizioni=ordine_posizioni, archivio=archivio,
+            modifiche=modifiche,
+        )
+
+    def _scrape_competizione(self, elemento, emetti):
+        campionato, stagione = elemento
+        logging.info(f"Inizio scraping per {campionato['nome']} stagione {stagione}...")
+        url = competition_season_url(campionato["url"], stagione)
+        teams = self.scraper.scrape_teams(url)
+        if self.manifest:
+            self.manifest.registra(url, "competizione", STATO_OK if teams else STATO_ERRORE, dati=teams)
+        squadre_df = salva_squadre(teams, campionato["nome"], stagione)
+        for team in squadre_df.to_dict("records"):
+            emetti(team)
+
+    def _scrape_squadra(self, team, emetti):
+        logging.info(f"Inizio scraping per {team['name']}...")
+        if self.rosa_dettagliata:
+            players = self.scraper.scrape_squad(team["link"])
+        else:
+            players = self.scraper.scrape_players(team["link"])
+        players_df, cartella_giocatori = salva_giocatori(
+            [{"name": player["name"], "link": player["link"]} for player in players],
+            team["name"], team["campionato"], team["stagione"],
+        )
+        if players_df.empty:
+            return
+        # La rosa dettagliata non ha duplicati; l'elenco semplice sì, come in scrape_and_save_players
+        players = players if self.rosa_dettagliata else players_df.to_dict("records")
+
+        # Rosa invariata rispetto all'ultimo run completato: i dettagli vengono tutti dal manifest
+        rosa_invariata = False
+        if self.manifest:
+            hash_rosa = hash_contenuto(players)
+            voce = self.manifest.fresca(team["link"], self.freschezza)
+            rosa_invariata = voce is not None and voce["content_hash"] == hash_rosa
+            if rosa_invariata:
+                logging.info(f"Rosa di {team['name']} invariata: nessuna richiesta per i giocatori.")
+                with self._lock:
+                    self.squadre_invariate += 1
+            else:
+                # La squadra torna 'ok' solo quando il sink ne ha scritto il file completo
+                self.manifest.registra(team["link"], "squadra", STATO_IN_CORSO, content_hash=hash_rosa)
+                with self._lock:
+                    self._squadre_in_corso[cartella_giocatori] = (team["link"], hash_rosa)
+
+        contesto = {"campionato": team["campionato"], "stagione": team["stagione"], "squadra": team["name"]}
+        self.sink.attendi_squadra(cartella_giocatori, len(players), contesto)
+        for indice, player in enumerate(players):
+            emetti((cartella_giocatori, indice, player, rosa_invariata, 0))
+
+    def _dettagli_dal_manifest(self, player, rosa_invariata):
+        """
+        Restituisce i dettagli salvati nel manifest se il giocatore non va riscaricato, altrimenti None.
+        """
+        if not self.manifest:
+            return None
+        if rosa_invariata:
+            voce = self.manifest.voce(player["link"])
+            voce = voce if voce and voce["stato"] == STATO_OK else None
+        else:
+            voce = self.manifest.fresca(player["link"], self.freschezza)
+        return voce["dati"] if voce else None
+
+    def _scrape_dettagli(self, elemento, emetti):
+        cartella_giocatori, indice, player, rosa_invariata, tentativo = elemento
+        salvati = self._dettagli_dal_manifest(player, rosa_invariata)
+        voce = self._rinviati.pop(player["link"], None) if salvati is None and tentativo == 0 else None
+        if voce:
+            # Fallito in un run precedente: riprende il suo backoff invece di richiedere subito la pagina
+            tentativo = voce["tentativi"]
+            attesa = voce["prossimo"] - time.time()
+            if attesa > 0:
+                self._ritentativi.programma((cartella_giocatori, indice, player, rosa_invariata, tentativo), attesa)
+                return
+        try:
+            if salvati is not None:
+                METRICHE.incrementa("giocatori_totale", esito="manifest")
+                with self._lock:
+                    self.giocatori_riusati += 1
+                # I campi della rosa sono appena stati letti: il manifest completa solo quelli mancanti
+                base = PlayerRecord.from_mapping(player) if self.rosa_dettagliata else PlayerRecord()
+                # Le voci salvate prima della colonna id_giocatore non ce l'hanno
+                base["id_giocatore"] = player_id(player["link"])
+                dettagli = merge_player_details(base, salvati)
+            else:
+                logging.debug(f"Inizio scraping dei dettagli per il giocatore {player['name']}...")
+                if self.rosa_dettagliata:
+                    dettagli = self.registro.complete(player, self.campi_obbligatori, raise_errors=True)
+                else:
+                    dettagli = self.registro.get(player["link"], raise_errors=True)
+                METRICHE.incrementa("giocatori_totale", esito="scaricato")
+                if self.coda_ritentativi and tentativo:
+                    self.coda_ritentativi.completa(player["link"])
+                if self.manifest:
+                    # Una pagina non scaricata produce solo campi vuoti: va ritentata al prossimo run
+                    riuscito = any(dettagli.get(col) is not None for col in COLUMN_ORDER if col != "id_giocatore")
+                    self.manifest.registra(
+                        player["link"], "giocatore", STATO_OK if riuscito else STATO_ERRORE, dati=dict(dettagli)
+                    )
+        except Exception as e:
+            if self._ritenta((cartella_giocatori, indice, player, rosa_invariata, tentativo), e):
+                return
+            logging.error(f"Errore nello scraping del giocatore {player['name']} ({player['link']}): {e}")
+            METRICHE.incrementa("giocatori_totale", esito="errore")
+            if self.manifest:
+                self.manifest.registra(player["link"], "giocatore", STATO_ERRORE)
+            self.sink.scarta(cartella_giocatori, indice)
+            return
+        # Unico thread di scrittura: il sink raccoglie le righe e scrive ogni squadra una volta sola
+        self.sink.scrivi(cartella_giocatori, indice, dettagli)
+
+    def _ritenta(self, elemento, errore) -> bool:
+        """
+        Rimette in coda un giocatore non scaricato con backoff esponenziale.
+        Restituisce False se i ritentativi sono esauriti.
+        """
+        cartella_giocatori, indice, player, rosa_invariata, tentativo = elemento
+        if tentativo >= self.ritentativi:
+            if self.coda_ritentativi:
+                self.coda_ritentativi.esaurito(player["link"], str(errore))
+            return False
+        attesa = backoff_delay(tentativo, self.attesa_ritentativi, self.attesa_ritentativi * 2 ** self.ritentativi)
+        logging.warning(
+            f"Giocatore {player['name']} rimesso in coda tra {attesa:.1f}s "
+            f"(ritentativo {tentativo + 1} di {self.ritentativi}): {errore}"
+        )
+        METRICHE.incrementa("giocatori_ritentati_totale")
+        with self._lock:
+            self.giocatori_ritentati += 1
+        if self.coda_ritentativi:
+            self.coda_ritentativi.programma(
+                player["link"], "giocatore", tentativo + 1, time.time() + attesa, str(errore), dati=player
+            )
+        self._ritentativi.programma((cartella_giocatori, indice, player, rosa_invariata, tentativo + 1), attesa)
+        return True
+
+    def _squadra_completata(self, cartella_giocatori, scartate):
+        """
+        Chiamata dal sink quando il file di una squadra è stato scritto: la squadra è completa solo senza errori.
+        """
+        if not self.manifest:
+            return
+        with self._lock:
+            team_url, hash_rosa = self._squadre_in_corso.pop(cartella_giocatori, (None, None))
+        if team_url:
+            self.manifest.registra(team_url, "squadra", STATO_OK if scartate == 0 else STATO_ERRORE, content_hash=hash_rosa)
+
+    def esegui(self, campionati: dict, stagioni: list):
+        """
+        Esegue la pipeline su tutti i campionati e le stagioni e attende il completamento.
+
+        Args:
+            campionati (dict): Campionati da scrapare (come config.campionati).
+            stagioni (list): Stagioni da scrapare (come config.stagioni).
+        """
+        stadi = [self.competizioni, self.squadre, self.dettagli]
+        self.sink.avvia()
+        self._ritentativi.avvia()
+        for stadio, successivo in zip(stadi, stadi[1:] + [None]):
+            stadio.avvia(successivo.coda.put if successivo else lambda elemento: None)
+
+        for campionato in campionati.values():
+            for stagione in stagioni:
+                self.competizioni.coda.put((campionato, stagione))
+
+        # Chiusura in ordine: uno stadio termina solo quando quello a monte non produce più nulla
+        self.competizioni.chiudi()
+        self.squadre.chiudi()
+        # I giocatori da ritentare tornano nella coda dei dettagli: lo stadio si chiude quando non ne restano
+        while True:
+            self.dettagli.coda.join()
+            if not self._ritentativi.in_attesa:
+                break
+            self._ritentativi.attendi()
+        self._ritentativi.chiudi()
+        self.dettagli.chiudi()
+        self.sink.chiudi()
+
+        logging.info(
+            f"Pipeline completata: {self.competizioni.elaborati} competizioni, {self.squadre.elaborati} squadre, "
+            f"{self.dettagli.elaborati} giocatori ({self.giocatori_riusati} ripresi dal manifest, "
+            f"{self.registro.shared} profili condivisi, {self.giocatori_ritentati} ritentativi, "
+            f"{self.squadre_invariate} squadre invariate), "
+            f"{self.sink.righe_scritte} righe scritte."
+        )
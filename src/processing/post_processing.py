@@ -1,9 +1,17 @@
-import pandas as pd 
+import pandas as pd
 import os
+import logging
+import time
 import config
 
+from src.utils.metrics import METRICHE
 from src.utils.save_utils import salva_df
-    
+from src.utils.seasons import seasons_with_backfill
+
+POSITIONS_PATH = "data/posizioni.csv"
+DATA_PATH = "data/raw"
+FILE_NAME = "informazioni_giocatori"
+
 
 def order_players_by_position(positions: pd.DataFrame, players: pd.DataFrame):
     players_with_order = pd.merge(players, positions[["posizione", "ordine"]], on="posizione", how="left")
@@ -14,18 +22,76 @@ def order_players_by_position(positions: pd.DataFrame, players: pd.DataFrame):
 
     return players
 
-def order_positions():
-    POSITIONS_PATH = "data/posizioni.csv"
-    DATA_PATH = "data/raw"
-    FILE_NAME = "informazioni_giocatori"
-
-    positions = pd.read_csv(POSITIONS_PATH)
-
-    for campionato in config.campionati.values():
-        for stagione in config.stagioni:
-            for squadra in os.listdir(f"{DATA_PATH}/{campionato['nome']}/{stagione}"):
-                if not os.path.isdir(f"{DATA_PATH}/{campionato['nome']}/{stagione}/{squadra}"):
-                    continue
-                info_players = pd.read_csv(f"{DATA_PATH}/{campionato['nome']}/{stagione}/{squadra}/{FILE_NAME}.csv")
-                info_players = order_players_by_position(positions, info_players)
-                salva_df(info_players, f"{DATA_PATH}/{campionato['nome']}/{stagione}/{squadra}/", FILE_NAME, "csv")
\ No newline at end of file
+def carica_ordine_posizioni(percorso: str = POSITIONS_PATH) -> dict:
+    """
+    Legge il file delle posizioni e restituisce il dizionario posizione -> ordine.
+    Restituisce None se il file non esiste.
+    """
+    if not os.path.isfile(percorso):
+        return None
+    positions = pd.read_csv(percorso)
+    return dict(zip(positions["posizione"], positions["ordine"]))
+
+def chiave_posizione(ordine_posizioni: dict):
+    """
+    Chiave di ordinamento per le righe di un giocatore: prima per ordine della posizione,
+    le posizioni sconosciute in fondo (come i NaN di sort_values).
+    """
+    def chiave(riga):
+        ordine = ordine_posizioni.get(riga.get("posizione"))
+        return (ordine is None, ordine if ordine is not None else 0)
+    return chiave
+
+def cartelle_squadre(campionati: dict = None, stagioni: list = None):
+    """
+    Genera (cartella, percorso del file dei dettagli) di ogni squadra già salvata in data/raw per
+    `campionati` e `stagioni` (di default config.campionati e config.stagioni, più il backfill).
+    """
+    campionati = campionati or config.campionati
+    stagioni = stagioni or seasons_with_backfill(config.stagioni, config.backfill_stagioni)
+    for campionato in campionati.values():
+        for stagione in stagioni:
+            cartella_stagione = f"{DATA_PATH}/{campionato['nome']}/{stagione}"
+            if not os.path.isdir(cartella_stagione):
+                continue
+            for squadra in sorted(os.listdir(cartella_stagione)):
+                percorso = f"{cartella_stagione}/{squadra}/{FILE_NAME}.csv"
+                if os.path.isfile(percorso):
+                    yield f"{cartella_stagione}/{squadra}/", percorso
+
+def order_positions(campionati: dict = None, stagioni: list = None):
+    """
+    Ordina per posizione i giocatori di tutte le squadre di `campionati` e `stagioni`
+    (di default config.campionati e config.stagioni, più le stagioni del backfill).
+
+    Tutti i file vengono letti una volta e concatenati; l'ordinamento è un unico sort stabile
+    del frame completo per (file, ordine della posizione) e solo i file il cui ordine è
+    cambiato vengono riscritti, con le sole colonne che avevano.
+    """
+    ordine_posizioni = carica_ordine_posizioni()
+    if ordine_posizioni is None:
+        logging.warning(f"File delle posizioni {POSITIONS_PATH} non trovato: ordinamento saltato.")
+        return
+
+    inizio = time.perf_counter()
+    cartelle, frames = [], []
+    for cartella, percorso in cartelle_squadre(campionati, stagioni):
+        # Letti come testo, così i file riscritti cambiano solo nell'ordine delle righe
+        frames.append(pd.read_csv(percorso, dtype=str, keep_default_na=False))
+        cartelle.append(cartella)
+    if not frames:
+        return
+
+    players = pd.concat(frames, keys=range(len(frames)), names=["file", "riga"]).reset_index()
+    ordine = players["posizione"].map(ordine_posizioni)
+    players = players.assign(ordine=ordine).sort_values(["file", "ordine"], kind="stable", na_position="last")
+
+    riscritti = 0
+    for file, righe in players.groupby("file", sort=False):
+        if righe["riga"].is_monotonic_increasing:
+            continue
+        # Solo le colonne del file originale: il concat aggiunge quelle degli altri file
+        salva_df(righe[list(frames[file].columns)], cartelle[file], FILE_NAME, "csv")
+        riscritti += 1
+    METRICHE.osserva("post_processing_secondi", time.perf_counter() - inizio, fase="ordine_posizioni")
+    logging.info(f"Giocatori ordinati per posizione: {len(frames)} squadre, {riscritti} file riscritti.")
@@ -1,9 +1,20 @@
+import logging
 import os
+from collections import namedtuple
+
 import pandas as pd
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from src.utils.metrics import METRICHE
 from src.utils.save_utils import salva_df
-from src.scraping.scraper import TransfermarktScraper
+from src.scraping.player_record import PlayerRecord, records_to_frame
+from src.scraping.player_registry import PlayerRegistry
+from src.scraping.scraper import SQUAD_FIELDS, TransfermarktScraper
+from src.utils.scraper_utils import competition_season_url, team_season_url
+from src.utils.streaming import mappa_limitata
+
+# Riga prodotta da iter_giocatori: dettagli del giocatore in posizione `indice` della rosa
+# (None se non disponibili) di una squadra di `giocatori_squadra` giocatori salvata in `cartella`
+RigaGiocatore = namedtuple("RigaGiocatore", ["cartella", "contesto", "indice", "giocatori_squadra", "dettagli"])
 
 def scrape_and_save_teams(scraper: TransfermarktScraper, campionato: dict, stagione: str) -> pd.DataFrame:
     """
@@ -20,16 +31,33 @@ def scrape_and_save_teams(scraper: TransfermarktScraper, campionato: dict, stagi
     campionato_url = campionato["url"]
     campionato_nome = campionato["nome"]
 
-    print(f"Inizio scraping per {campionato_nome} stagione {stagione}...")
-    teams = scraper.scrape_teams(campionato_url)
-    print(f"Squadre scaricate: {len(teams)}")
+    logging.info(f"Inizio scraping per {campionato_nome} stagione {stagione}...")
+    teams = scraper.scrape_teams(competition_season_url(campionato_url, stagione))
+    return salva_squadre(teams, campionato_nome, stagione)
+
+def salva_squadre(teams: list, campionato_nome: str, stagione: str) -> pd.DataFrame:
+    """
+    Converte le squadre scrappate in DataFrame e le salva in squadre.csv.
+    I link delle squadre vengono riportati alla stagione richiesta.
+
+    Args:
+        teams (list): Lista di dizionari con 'name' e 'link' delle squadre.
+        campionato_nome (str): Nome del campionato.
+        stagione (str): La stagione.
+
+    Returns:
+        pd.DataFrame: DataFrame contenente le squadre scrappate.
+    """
+    logging.debug(f"Squadre scaricate: {len(teams)}")
 
     if not teams:
-        print(f"Nessuna squadra trovata per {campionato_nome} stagione {stagione}.")
+        logging.warning(f"Nessuna squadra trovata per {campionato_nome} stagione {stagione}.")
         return pd.DataFrame()
 
-    # Converti le squadre in DataFrame
-    teams_df = pd.DataFrame(teams).drop_duplicates()
+    # Converti le squadre in DataFrame, con i link della stagione
+    teams_df = pd.DataFrame(teams)
+    teams_df["link"] = [team_season_url(link, stagione) for link in teams_df["link"]]
+    teams_df = teams_df.drop_duplicates()
 
     # Aggiungi colonne per campionato e stagione
     teams_df["campionato"] = campionato_nome
@@ -41,10 +69,11 @@ def scrape_and_save_teams(scraper: TransfermarktScraper, campionato: dict, stagi
     cartella_squadre = os.path.join("data", "raw", campionato_nome.lower(), stagione)
     salva_df(teams_df, cartella_squadre, "squadre")
 
-    print(f"Squadre salvate in {cartella_squadre}/squadre.csv")
+    logging.info(f"Squadre salvate in {cartella_squadre}/squadre.csv")
     return teams_df
 
-def scrape_and_save_players(scraper: TransfermarktScraper, team: pd.Series, campionato_nome: str, stagione: str, max_workers: int = 5):
+def scrape_and_save_players(scraper: TransfermarktScraper, team: pd.Series, campionato_nome: str, stagione: str, max_workers: int = 5,
+                            registro: PlayerRegistry = None):
     """
     Scrape i giocatori di una squadra e salva i dati, inclusi i dettagli dei giocatori in parallelo.
 
@@ -54,18 +83,106 @@ def scrape_and_save_players(scraper: TransfermarktScraper, team: pd.Series, camp
         campionato_nome (str): Nome del campionato.
         stagione (str): La stagione.
         max_workers (int): Numero massimo di thread da utilizzare per la parallelizzazione.
+        registro (PlayerRegistry, optional): Registro del run, per scaricare ogni profilo una volta sola.
     """
     team_url = team["link"]
     team_name = team["name"]
 
-    print(f"Inizio scraping per {team_name}...")
+    logging.info(f"Inizio scraping per {team_name}...")
     players = scraper.scrape_players(team_url)
-    print(f"Giocatori scaricati: {len(players)}")
+    players_df, cartella_giocatori = salva_giocatori(players, team_name, campionato_nome, stagione)
 
-    if not players:
-        print(f"Nessun giocatore trovato per la squadra {team_name}.")
+    if players_df.empty:
         return
 
+    # Scrape i dettagli dei giocatori in parallelo, con al più max_workers richieste in corso;
+    # la scrittura avviene una sola volta da questo thread
+    dettagli_giocatore = registro.get if registro else scraper.scrape_player_details
+
+    def dettagli_o_errore(giocatore):
+        try:
+            return dettagli_giocatore(giocatore["link"]), None
+        except Exception as e:
+            return None, e
+
+    dettagli = {}
+    giocatori = enumerate(players_df.to_dict("records"))
+    for (indice, giocatore), (risultato, errore) in mappa_limitata(lambda voce: dettagli_o_errore(voce[1]), giocatori, max_workers):
+        if errore is None:
+            dettagli[indice] = risultato
+            METRICHE.incrementa("giocatori_totale", esito="scaricato")
+        else:
+            METRICHE.incrementa("giocatori_totale", esito="errore")
+            logging.error(f"Errore nello scraping del giocatore {giocatore['name']}: {errore}")
+
+    righe = [dettagli[indice] for indice in sorted(dettagli)]
+    salva_df(records_to_frame(righe), cartella_giocatori, "informazioni_giocatori")
+    logging.info(f"Dettagli di {len(righe)} giocatori salvati in {cartella_giocatori}/informazioni_giocatori.csv")
+
+def scrape_and_save_squad(scraper: TransfermarktScraper, team: pd.Series, campionato_nome: str, stagione: str,
+                          campi_obbligatori: list = SQUAD_FIELDS, max_workers: int = 5, registro: PlayerRegistry = None):
+    """
+    Scrape la rosa dettagliata di una squadra con un'unica richiesta e salva giocatori e dettagli.
+    La pagina del singolo giocatore viene richiesta solo se manca uno dei campi obbligatori.
+
+    Args:
+        scraper (TransfermarktScraper): L'istanza dello scraper.
+        team (pd.Series): Serie contenente i dettagli della squadra.
+        campionato_nome (str): Nome del campionato.
+        stagione (str): La stagione.
+        campi_obbligatori (list): Campi di COLUMN_ORDER che devono essere valorizzati per ogni giocatore.
+        max_workers (int): Numero massimo di thread per le pagine dei giocatori da completare.
+        registro (PlayerRegistry, optional): Registro del run, per scaricare ogni profilo una volta sola.
+    """
+    team_name = team["name"]
+
+    logging.info(f"Inizio scraping della rosa di {team_name}...")
+    squad = scraper.scrape_squad(team["link"])
+    players_df, cartella_giocatori = salva_giocatori(
+        [{"name": player["name"], "link": player["link"]} for player in squad], team_name, campionato_nome, stagione
+    )
+
+    if players_df.empty:
+        return
+
+    completa_giocatore = registro.complete if registro else scraper.complete_player_details
+
+    def completa(player):
+        try:
+            dettagli = completa_giocatore(player, campi_obbligatori)
+            METRICHE.incrementa("giocatori_totale", esito="scaricato")
+            return dettagli
+        except Exception as e:
+            METRICHE.incrementa("giocatori_totale", esito="errore")
+            logging.error(f"Errore nello scraping del giocatore {player['name']} ({player['link']}): {e}")
+            return PlayerRecord.from_mapping(player)
+
+    # Completa in parallelo solo i giocatori con campi mancanti, mantenendo l'ordine della rosa
+    dettagli = [risultato for _, risultato in mappa_limitata(completa, squad, max_workers)]
+
+    salva_df(records_to_frame(dettagli), cartella_giocatori, "informazioni_giocatori")
+    logging.info(f"Dettagli di {len(dettagli)} giocatori salvati in {cartella_giocatori}/informazioni_giocatori.csv")
+
+def salva_giocatori(players: list, team_name: str, campionato_nome: str, stagione: str) -> tuple:
+    """
+    Converte i giocatori scrappati di una squadra in DataFrame e li salva in giocatori.csv.
+
+    Args:
+        players (list): Lista di dizionari con 'name' e 'link' dei giocatori.
+        team_name (str): Nome della squadra.
+        campionato_nome (str): Nome del campionato.
+        stagione (str): La stagione.
+
+    Returns:
+        tuple: Il DataFrame dei giocatori e il percorso della cartella della squadra.
+    """
+    logging.debug(f"Giocatori scaricati: {len(players)}")
+    cartella_giocatori = os.path.join("data", "raw", campionato_nome.lower(), stagione, team_name)
+
+    if not players:
+        logging.warning(f"Nessun giocatore trovato per la squadra {team_name}.")
+        return pd.DataFrame(), cartella_giocatori
+
     # Converti i giocatori in DataFrame
     players_df = pd.DataFrame(players).drop_duplicates()
 
@@ -77,56 +194,181 @@ def scrape_and_save_players(scraper: TransfermarktScraper, team: pd.Series, camp
     players_df = players_df[["campionato", "stagione", "squadra", "name", "link"]]
 
     # Salva i dati dei giocatori
-    cartella_giocatori = os.path.join("data", "raw", campionato_nome.lower(), stagione, team_name)
+    METRICHE.incrementa("squadre_totale")
     salva_df(players_df, cartella_giocatori, "giocatori")
 
-    print(f"Giocatori salvati in {cartella_giocatori}/giocatori.csv")
+    logging.info(f"Giocatori salvati in {cartella_giocatori}/giocatori.csv")
+    return players_df, cartella_giocatori
 
-    # Scrape e salva i dettagli dei giocatori in parallelo
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_giocatore = {
-            executor.submit(scrape_and_save_player_details, scraper, giocatore["link"], cartella_giocatori, giocatore["name"]): giocatore["name"]
-            for _, giocatore in players_df.iterrows()
-        }
+def iter_squadre(scraper: TransfermarktScraper, campionati: dict, stagioni: list):
+    """
+    Generatore delle squadre di tutti i campionati e le stagioni: ogni pagina di competizione
+    viene richiesta (e squadre.csv salvato) solo quando il consumatore arriva alle sue squadre.
 
-        for future in as_completed(future_to_giocatore):
-            giocatore_nome = future_to_giocatore[future]
-            try:
-                future.result()
-            except Exception as e:
-                print(f"Errore nello scraping del giocatore {giocatore_nome}: {e}")
+    Args:
+        scraper (TransfermarktScraper): L'istanza dello scraper.
+        campionati (dict): Campionati da scrapare (come config.campionati).
+        stagioni (list): Stagioni da scrapare.
 
-def scrape_and_save_player_details(scraper: TransfermarktScraper, giocatore_url: str, squadra_path: str, giocatore_nome: str):
+    Yields:
+        dict: Squadra con 'campionato', 'stagione', 'name' e 'link'.
     """
-    Scrape i dettagli di un giocatore e salva i dati.
+    for campionato in campionati.values():
+        for stagione in stagioni:
+            teams_df = scrape_and_save_teams(scraper, campionato, stagione)
+            yield from teams_df.to_dict("records")
+
+def _giocatori_da_scaricare(scraper: TransfermarktScraper, squadre, rosa_dettagliata: bool):
+    """
+    Generatore dei giocatori delle squadre, con la cartella e il contesto della loro squadra.
+    La rosa di una squadra viene richiesta solo quando servono i suoi giocatori.
+    """
+    for team in squadre:
+        logging.info(f"Inizio scraping per {team['name']}...")
+        if rosa_dettagliata:
+            players = scraper.scrape_squad(team["link"])
+        else:
+            players = scraper.scrape_players(team["link"])
+        players_df, cartella_giocatori = salva_giocatori(
+            [{"name": player["name"], "link": player["link"]} for player in players],
+            team["name"], team["campionato"], team["stagione"],
+        )
+        if players_df.empty:
+            continue
+        # La rosa dettagliata non ha duplicati; l'elenco semplice sì, come in scrape_and_save_players
+        players = players if rosa_dettagliata else players_df.to_dict("records")
+        contesto = {"campionato": team["campionato"], "stagione": team["stagione"], "squadra": team["name"]}
+        for indice, player in enumerate(players):
+            yield cartella_giocatori, contesto, indice, len(players), player
+
+def iter_giocatori(scraper: TransfermarktScraper, squadre, rosa_dettagliata: bool = False,
+                   campi_obbligatori: list = SQUAD_FIELDS, max_in_corso: int = 8, registro: PlayerRegistry = None):
+    """
+    Generatore dei dettagli dei giocatori di una sequenza (anche lazy) di squadre.
+
+    Le righe vengono prodotte appena pronte, nell'ordine delle rose, con al più
+    `max_in_corso` pagine di giocatori in corso: le squadre successive vengono
+    lette solo man mano che il consumatore avanza, quindi la memoria resta
+    costante qualunque sia il numero di campionati e stagioni.
 
     Args:
         scraper (TransfermarktScraper): L'istanza dello scraper.
-        giocatore_url (str): URL del giocatore da scrapare.
-        squadra_path (str): Percorso della cartella della squadra.
-        giocatore_nome (str): Nome del giocatore.
+        squadre (iterable): Squadre con 'campionato', 'stagione', 'name' e 'link' (es. iter_squadre).
+        rosa_dettagliata (bool): Se True usa la rosa dettagliata e completa solo i campi mancanti.
+        campi_obbligatori (list): Campi che, se assenti dalla rosa, richiedono la pagina del giocatore.
+        max_in_corso (int): Numero massimo di giocatori in lavorazione contemporaneamente.
+        registro (PlayerRegistry, optional): Registro del run, per scaricare ogni profilo una volta sola.
+
+    Yields:
+        RigaGiocatore: Una riga per giocatore; `dettagli` è None se il profilo non è disponibile.
     """
-    try:
-        print(f"Inizio scraping dei dettagli per il giocatore {giocatore_nome}...")
-        dettagli = scraper.scrape_player_details(giocatore_url)
+    def dettagli_giocatore(lavoro):
+        player = lavoro[-1]
+        try:
+            if rosa_dettagliata:
+                completa_giocatore = registro.complete if registro else scraper.complete_player_details
+                dettagli = completa_giocatore(player, campi_obbligatori)
+            else:
+                dettagli = registro.get(player["link"]) if registro else scraper.scrape_player_details(player["link"])
+            METRICHE.incrementa("giocatori_totale", esito="scaricato")
+            return dettagli
+        except Exception as e:
+            METRICHE.incrementa("giocatori_totale", esito="errore")
+            logging.error(f"Errore nello scraping del giocatore {player['name']} ({player['link']}): {e}")
+            # Con la rosa dettagliata restano almeno i campi della rosa
+            return PlayerRecord.from_mapping(player) if rosa_dettagliata else None
 
-        if dettagli:
-            # Converti i dettagli in DataFrame
-            df_dettagli = pd.DataFrame([dettagli])
+    lavori = _giocatori_da_scaricare(scraper, squadre, rosa_dettagliata)
+    for (cartella, contesto, indice, giocatori_squadra, _), dettagli in mappa_limitata(dettagli_giocatore, lavori, max_in_corso):
+        yield RigaGiocatore(cartella, contesto, indice, giocatori_squadra, dettagli)
 
-            # Definisci il percorso del file 'informazioni_giocatori.csv'
-            informazioni_path_csv = os.path.join(squadra_path, "informazioni_giocatori.csv")
+def scrape_streaming(scraper: TransfermarktScraper, campionati: dict, stagioni: list, sink, rosa_dettagliata: bool = False,
+                     campi_obbligatori: list = SQUAD_FIELDS, max_in_corso: int = 8, registro: PlayerRegistry = None) -> int:
+    """
+    Scrape tutti i campionati e le stagioni con iter_squadre + iter_giocatori e invia ogni riga
+    al sink (DettagliSink) appena pronta; il sink scrive ogni squadra appena è completa.
 
-            # Salva in CSV (in modalità append)
-            if os.path.exists(informazioni_path_csv):
-                df_dettagli.to_csv(informazioni_path_csv, mode='a', header=False, index=False, encoding="utf-8")
-            else:
-                df_dettagli.to_csv(informazioni_path_csv, index=False, encoding="utf-8")
+    Args:
+        scraper (TransfermarktScraper): L'istanza dello scraper.
+        campionati (dict): Campionati da scrapare (come config.campionati).
+        stagioni (list): Stagioni da scrapare.
+        sink (DettagliSink): Il sink, già avviato.
+        rosa_dettagliata (bool): Se True usa la rosa dettagliata e completa solo i campi mancanti.
+        campi_obbligatori (list): Campi che, se assenti dalla rosa, richiedono la pagina del giocatore.
+        max_in_corso (int): Numero massimo di giocatori in lavorazione contemporaneamente.
+        registro (PlayerRegistry, optional): Registro del run, per scaricare ogni profilo una volta sola.
+
+    Returns:
+        int: Numero di righe inviate al sink.
+    """
+    squadre = iter_squadre(scraper, campionati, stagioni)
+    return invia_al_sink(iter_giocatori(scraper, squadre, rosa_dettagliata, campi_obbligatori, max_in_corso, registro), sink)
 
-            print(f"Dettagli del giocatore {giocatore_nome} salvati in {informazioni_path_csv}")
+def invia_al_sink(righe, sink) -> int:
+    """
+    Invia al sink (DettagliSink) le righe prodotte da iter_giocatori, annunciando ogni squadra alla sua prima riga.
+
+    Args:
+        righe (iterable): Le RigaGiocatore, nell'ordine delle rose.
+        sink (DettagliSink): Il sink, già avviato.
+
+    Returns:
+        int: Numero di righe inviate al sink.
+    """
+    inviate = 0
+    for riga in righe:
+        if riga.indice == 0:
+            sink.attendi_squadra(riga.cartella, riga.giocatori_squadra, riga.contesto)
+        if riga.dettagli is None:
+            sink.scarta(riga.cartella, riga.indice)
         else:
-            print(f"Dettagli del giocatore {giocatore_nome} non disponibili.")
-    except Exception as e:
-        print(f"Errore nello scraping del giocatore {giocatore_nome} ({giocatore_url}): {e}")
+            sink.scrivi(riga.cartella, riga.indice, riga.dettagli)
+            inviate += 1
+    return inviate
+
+def aggiorna_giocatori(scraper: TransfermarktScraper, player_urls: list, cartelle: list, max_in_corso: int = 8,
+                       nome_file: str = "informazioni_giocatori") -> list:
+    """
+    Riscarica i profili di alcuni giocatori e aggiorna le loro righe nei file delle squadre in cui compaiono.
+
+    Le righe sono riconosciute dall'id del giocatore; i campi del profilo sostituiscono
+    quelli salvati, mentre i campi che il profilo non riporta restano invariati.
+
+    Args:
+        scraper (TransfermarktScraper): L'istanza dello scraper.
+        player_urls (list): URL dei profili da riscaricare.
+        cartelle (list): Cartelle delle squadre in cui cercare i giocatori.
+        max_in_corso (int): Numero massimo di profili scaricati contemporaneamente.
+        nome_file (str): Nome del file (senza estensione) dei dettagli in ogni cartella.
 
+    Returns:
+        list: Le cartelle i cui file sono stati riscritti.
+    """
+    profili = {}
+    for player_url, dettagli in scraper.iter_player_details(player_urls, max_in_corso):
+        if any(dettagli.get(col) is not None for col in dettagli if col != "id_giocatore"):
+            profili[str(dettagli["id_giocatore"])] = dettagli
+        else:
+            logging.error(f"Profilo di {player_url} non disponibile: righe non aggiornate.")
 
+    aggiornate = []
+    for cartella in cartelle:
+        percorso = os.path.join(cartella, f"{nome_file}.csv")
+        if not profili or not os.path.isfile(percorso):
+            continue
+        # Letti come testo, così le righe non toccate restano identiche
+        df = pd.read_csv(percorso, dtype=str, keep_default_na=False)
+        if "id_giocatore" not in df.columns:
+            continue
+        righe = df.index[df["id_giocatore"].isin(profili)]
+        if righe.empty:
+            continue
+        for riga in righe:
+            for col, valore in profili[df.at[riga, "id_giocatore"]].items():
+                if valore is not None and col in df.columns:
+                    df.at[riga, col] = valore if isinstance(valore, str) else str(valore)
+        if not salva_df(df, cartella, nome_file):
+            continue
+        aggiornate.append(cartella)
+        logging.info(f"Aggiornati {len(righe)} giocatori in {percorso}")
+    return aggiornate
@@ -0,0 +1,231 @@
+import logging
+import queue
+import threading
+import time
+
+import pandas as pd
+
+from src.processing.normalization import normalizza_giocatori
+from src.processing.post_processing import chiave_posizione
+from src.scraping.player_record import COLUMN_ORDER, records_to_frame
+from src.utils.metrics import METRICHE
+from src.utils.save_utils import salva_df, salva_frammento_dataset
+
+# Tipi di messaggio ricevuti dal thread di scrittura
+_ATTESI = "attesi"
+_RIGA = "riga"
+_SCARTATA = "scartata"
+_FINE = "fine"
+
+
+class _Squadra:
+    """
+    Righe in memoria di una squadra in attesa di essere scritte.
+    """
+
+    def __init__(self):
+        self.righe = {}
+        self.contesto = {}
+        self.attese = None
+        self.scartate = 0
+        self.modificata = False
+
+    def completa(self) -> bool:
+        return self.attese is not None and len(self.righe) + self.scartate >= self.attese
+
+
+class DettagliSink:
+    """
+    Unico scrittore di informazioni_giocatori.csv per tutto il run.
+
+    I worker inviano i dettagli dei giocatori su una coda; un solo thread li
+    raccoglie per squadra e, quando sono arrivate tutte le righe annunciate con
+    `attendi_squadra`, scrive il file della squadra in un'unica operazione
+    atomica (file temporaneo + rename), con le righe nell'ordine della rosa.
+    Con `intervallo_flush` i file delle squadre ancora incomplete vengono
+    riscritti periodicamente con le righe ricevute fino a quel momento, così un
+    run lungo interrotto non perde tutto il lavoro.
+
+    Con `cartella_dataset` ogni squadra completa, con il suo contesto
+    (campionato, stagione, squadra), viene salvata appena scritta anche nel suo
+    file del dataset Parquet partizionato, con le colonne già tipizzate
+    (normalizza_giocatori): solo il file della squadra viene sostituito e il sink
+    non tiene in memoria le squadre già scritte.
+
+    Con `archivio` (PlayerStore) ogni squadra completa viene anche sostituita
+    nel database SQLite dei giocatori appena scritta, dallo stesso thread, così
+    l'archivio resta aggiornato run dopo run senza ricaricare tutti i CSV.
+
+    Con `modifiche` (ChangeFeed) ogni squadra completa viene confrontata con
+    l'ultimo run appena scritta, così i giocatori nuovi e modificati finiscono
+    nel feed delle modifiche mentre il run procede.
+
+    Con `ordine_posizioni` (posizione -> ordine, come data/posizioni.csv) le
+    righe di ogni squadra vengono scritte già ordinate per posizione, senza
+    bisogno del passaggio successivo di order_positions.
+    """
+
+    def __init__(self, nome_file: str = "informazioni_giocatori", intervallo_flush: float = None, colonne: list = COLUMN_ORDER,
+                 cartella_dataset: str = None, al_completamento=None, ordine_posizioni: dict = None, archivio=None,
+                 modifiche=None):
+        """
+        Args:
+            nome_file (str): Nome del file (senza estensione) scritto in ogni cartella di squadra.
+            intervallo_flush (float, optional): Secondi tra due flush delle squadre incomplete. Defaults to None.
+            colonne (list): Colonne del file, nell'ordine di scrittura.
+            cartella_dataset (str, optional): Cartella del dataset Parquet consolidato. Defaults to None.
+            al_completamento (callable, optional): Chiamata come al_completamento(cartella, scartate) dopo
+                la scrittura di una squadra completa. Defaults to None.
+            ordine_posizioni (dict, optional): Ordine di scrittura delle posizioni. Defaults to None.
+            archivio (PlayerStore, optional): Database SQLite aggiornato con le squadre complete. Defaults to None.
+            modifiche (ChangeFeed, optional): Feed delle modifiche alimentato con le squadre complete. Defaults to None.
+        """
+        self.al_completamento = al_completamento
+        self.nome_file = nome_file
+        self.intervallo_flush = intervallo_flush
+        self.colonne = colonne
+        self.cartella_dataset = cartella_dataset
+        self.archivio = archivio
+        self.modifiche = modifiche
+        self._chiave = chiave_posizione(ordine_posizioni) if ordine_posizioni else None
+        self.righe_scritte = 0
+        self.righe_dataset = 0
+        self.file_scritti = 0
+        self._coda = queue.Queue()
+        self._squadre = {}
+        self._thread = threading.Thread(target=self._lavora, name="sink", daemon=True)
+
+    def avvia(self):
+        self._thread.start()
+        return self
+
+    def attendi_squadra(self, cartella: str, numero_giocatori: int, contesto: dict = None):
+        """
+        Annuncia quante righe arriveranno per la squadra salvata in `cartella`;
+        `contesto` (campionato, stagione, squadra) viene aggiunto alle righe del dataset consolidato.
+        """
+        self._coda.put((_ATTESI, cartella, numero_giocatori, contesto))
+
+    def scrivi(self, cartella: str, indice: int, dettagli: dict):
+        """
+        Invia i dettagli del giocatore in posizione `indice` della rosa.
+        """
+        self._coda.put((_RIGA, cartella, indice, dettagli))
+
+    def scarta(self, cartella: str, indice: int):
+        """
+        Segnala che il giocatore in posizione `indice` non produrrà una riga.
+        """
+        self._coda.put((_SCARTATA, cartella, indice, None))
+
+    def chiudi(self):
+        """
+        Scrive le squadre ancora in memoria e ferma il thread di scrittura.
+        """
+        self._coda.put((_FINE, None, None, None))
+        self._thread.join()
+
+    def __enter__(self):
+        return self.avvia()
+
+    def __exit__(self, *exc):
+        self.chiudi()
+
+    def _lavora(self):
+        prossimo_flush = time.monotonic() + self.intervallo_flush if self.intervallo_flush else None
+        while True:
+            timeout = max(0.0, prossimo_flush - time.monotonic()) if prossimo_flush else None
+            try:
+                tipo, cartella, valore, dettagli = self._coda.get(timeout=timeout)
+                METRICHE.imposta("coda_profondita", self._coda.qsize(), stadio="sink")
+            except queue.Empty:
+                tipo = None
+
+            if tipo == _FINE:
+                for cartella in list(self._squadre):
+                    self._flush(cartella)
+                if self.righe_dataset:
+                    logging.info(f"Dataset consolidato aggiornato in {self.cartella_dataset} ({self.righe_dataset} righe)")
+                return
+
+            if tipo is not None:
+                squadra = self._squadre.setdefault(cartella, _Squadra())
+                if tipo == _ATTESI:
+                    squadra.attese = valore
+                    squadra.contesto = dettagli or {}
+                elif tipo == _RIGA:
+                    squadra.righe[valore] = dettagli
+                    squadra.modificata = True
+                elif tipo == _SCARTATA:
+                    squadra.scartate += 1
+                if squadra.completa():
+                    if self._flush(cartella) and self.al_completamento:
+                        self.al_completamento(cartella, squadra.scartate)
+
+            if prossimo_flush and time.monotonic() >= prossimo_flush:
+                for cartella, squadra in list(self._squadre.items()):
+                    if squadra.modificata:
+                        self._flush(cartella, parziale=True)
+                prossimo_flush = time.monotonic() + self.intervallo_flush
+
+    def _flush(self, cartella: str, parziale: bool = False) -> bool:
+        """
+        Scrive il file della squadra con tutte le righe ricevute; se non è parziale la squadra esce dalla memoria.
+        Restituisce True se il file è stato scritto.
+        """
+        squadra = self._squadre[cartella] if parziale else self._squadre.pop(cartella)
+        squadra.modificata = False
+        if not squadra.righe:
+            return False
+        righe = [squadra.righe[indice] for indice in sorted(squadra.righe)]
+        if self._chiave:
+            # Ordinamento stabile: a parità di posizione resta l'ordine della rosa
+            righe.sort(key=self._chiave)
+        try:
+            scritto = salva_df(records_to_frame(righe, self.colonne), cartella, self.nome_file)
+        except Exception as e:
+            logging.error(f"Errore nella scrittura di {cartella}/{self.nome_file}.csv: {e}")
+            return False
+        if not scritto:
+            # L'errore è già nel log di salva_df; la squadra non è completa finché il file non c'è
+            return False
+        self.file_scritti += 1
+        if not parziale:
+            self.righe_scritte += len(righe)
+            if (self.cartella_dataset or self.archivio) and squadra.contesto:
+                self._salva_tipizzate(squadra.contesto, righe)
+            if self.modifiche and squadra.contesto:
+                self._confronta(squadra.contesto, righe)
+            logging.info(f"Dettagli di {len(righe)} giocatori salvati in {cartella}/{self.nome_file}.csv")
+        return True
+
+    def _salva_tipizzate(self, contesto: dict, righe: list):
+        """
+        Salva le righe della squadra appena scritta, tipizzate una volta sola, nel suo file del dataset
+        consolidato e nell'archivio SQLite, sostituendo solo i giocatori della squadra.
+        """
+        try:
+            df = normalizza_giocatori(pd.DataFrame([{**contesto, **riga} for riga in righe]))
+        except Exception as e:
+            logging.error(f"Errore nella tipizzazione dei giocatori di {contesto.get('squadra')}: {e}")
+            return
+        if self.cartella_dataset:
+            try:
+                salva_frammento_dataset(df, self.cartella_dataset, contesto["squadra"])
+                self.righe_dataset += len(df)
+            except Exception as e:
+                logging.error(f"Errore nel salvataggio del dataset per {contesto.get('squadra')}: {e}")
+        if self.archivio:
+            try:
+                self.archivio.salva_giocatori(df)
+            except Exception as e:
+                logging.error(f"Errore nell'aggiornamento dell'archivio per {contesto.get('squadra')}: {e}")
+
+    def _confronta(self, contesto: dict, righe: list):
+        """
+        Registra nel feed delle modifiche i giocatori nuovi e modificati della squadra.
+        """
+        try:
+            self.modifiche.registra_squadra(contesto, righe)
+        except Exception as e:
+            logging.error(f"Errore nel confronto con l'ultimo run per {contesto.get('squadra')}: {e}")
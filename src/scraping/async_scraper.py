@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from src.scraping.player_record import PlayerRecord
+from src.scraping.scraper import SQUAD_FIELDS, TransfermarktScraper, merge_player_details
+from src.utils.scraper_utils import detailed_squad_url
+
+
+class AsyncTransfermarktScraper(TransfermarktScraper):
+    """
+    Asyncio variant of TransfermarktScraper.
+
+    All requests of a run go through one event loop: a semaphore caps the number
+    of requests in flight and the shared TokenBucket fixes the request rate, so
+    the effective rate is the configured one regardless of how many teams and
+    players are being processed at the same time. An optional AdaptiveLimiter
+    (`limiter`) keeps the requests in flight below the semaphore when the server
+    slows down or answers 429/5xx. Parsing is inherited from
+    TransfermarktScraper, so both modes produce identical records.
+    """
+
+    def __init__(self, *args, max_concurrency=8, **kwargs):
+        """
+        Inizializza lo scraper async; `max_concurrency` limita le richieste contemporanee.
+        Gli altri argomenti sono quelli di TransfermarktScraper.
+        """
+        # Una connessione keep-alive per ogni richiesta che può essere in corso
+        kwargs.setdefault("pool_size", max_concurrency)
+        super().__init__(*args, **kwargs)
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # Thread dedicati alle richieste bloccanti, dimensionati sulla concorrenza massima
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="fetch")
+
+    async def get_page(self, url, raise_errors=False):
+        """
+        Sends an HTTP GET request without blocking the event loop and returns the page text.
+        Temporary failures are retried with backoff as in TransfermarktScraper.fetch; other errors
+        are logged and return None, unless `raise_errors` is True.
+        """
+        logging.debug(f"Sending HTTP request to {url}")
+        try:
+            html, cached = self._from_cache(url)
+            attempt = 0
+            while html is None:
+                async with self._semaphore:
+                    loop = asyncio.get_running_loop()
+                    # L'attesa del limiter blocca un thread del pool, dimensionato sulla concorrenza massima
+                    await loop.run_in_executor(self._executor, self._acquire_slot)
+                    error, start = None, time.perf_counter()
+                    try:
+                        self.metriche.osserva("attesa_rate_limit_secondi", await self.rate_limiter.acquire_async())
+                        start = time.perf_counter()
+                        html = await loop.run_in_executor(self._executor, self._request, url, cached)
+                    except requests.RequestException as e:
+                        error = e
+                        delay = self._retry_delay(url, e, attempt)
+                        if delay is None:
+                            raise
+                    finally:
+                        self._release_slot(error, time.perf_counter() - start)
+                if html is None:
+                    await asyncio.sleep(delay)
+                    attempt += 1
+            logging.debug(f"Successfully fetched content from {url}")
+            return html
+        except requests.HTTPError as http_err:
+            logging.error(f"HTTP error occurred while fetching {url}: {http_err}")
+            if raise_errors:
+                raise
+        except Exception as err:
+            logging.error(f"An error occurred while fetching {url}: {err}")
+            if raise_errors:
+                raise
+        return None
+
+    async def get_soup(self, url, page_type=None, raise_errors=False):
+        """
+        Sends an HTTP GET request without blocking the event loop and returns a BeautifulSoup object.
+        Errors are logged and return None, unless `raise_errors` is True.
+        """
+        html = await self.get_page(url, raise_errors)
+        if html is None:
+            return None
+        return await asyncio.to_thread(self.make_soup, html, page_type)
+
+    async def _scrape_page(self, url, page_type, tipo, estrazione, *args, raise_errors=False):
+        """
+        Async version of TransfermarktScraper._scrape_page: the page is parsed in a thread and
+        the tree is torn down right after the extraction.
+        """
+        html = await self.get_page(url, raise_errors)
+        if html is None:
+            return None
+        caratteri = len(html)
+        if self.memory_budget:
+            # Attende solo questa coroutine: i thread delle richieste restano liberi
+            self.metriche.osserva("attesa_memoria_secondi", await self.memory_budget.acquire_async(caratteri))
+        try:
+            soup = await asyncio.to_thread(self.make_soup, html, page_type)
+            del html
+            return self._estrai(tipo, estrazione, soup, *args)
+        finally:
+            if self.memory_budget:
+                self.memory_budget.release(caratteri)
+
+    async def scrape_teams(self, competition_url):
+        """
+        Extracts team names and links from the competition page.
+        Returns a list of dictionaries with team details.
+        """
+        logging.debug(f"Starting to scrape teams from {competition_url}")
+        teams = await self._scrape_page(competition_url, "competizione", "competizione", self.parse_teams)
+
+        if teams is None:
+            logging.error(f"Failed to retrieve soup for {competition_url}")
+            return []
+
+        return teams
+
+    async def scrape_players(self, team_url):
+        """
+        Extracts players from a team's page.
+        Returns a list of dictionaries with player details.
+        """
+        logging.debug(f"Starting to scrape players from {team_url}")
+        players = await self._scrape_page(team_url, "squadra", "squadra", self.parse_players, team_url)
+
+        if players is None:
+            logging.error(f"Failed to retrieve soup for {team_url}")
+            return []
+
+        return players
+
+    async def scrape_player_details(self, player_url, raise_errors=False):
+        """
+        Extracts detailed information about a player from their Transfermarkt page.
+        Returns a PlayerRecord with the player details (all None if the page cannot be fetched,
+        unless `raise_errors` is True).
+        """
+        if self.parser_pool:
+            html = await self.get_page(player_url, raise_errors)
+            if html is None:
+                return self.parse_player_details(None, player_url)
+            with self.metriche.cronometra("estrazione_secondi", tipo="giocatore_processo"):
+                return await asyncio.wrap_future(self.parser_pool.submit(html, player_url, self.metriche))
+        player_details = await self._scrape_page(
+            player_url, "giocatore", "giocatore", self.parse_player_details, player_url, raise_errors=raise_errors
+        )
+        return player_details if player_details is not None else self.parse_player_details(None, player_url)
+
+    async def scrape_squad(self, team_url):
+        """
+        Extracts the whole squad, with most player details, from the team's detailed roster view.
+        Returns a list of dictionaries with 'name', 'link' and all COLUMN_ORDER keys.
+        """
+        squad_url = detailed_squad_url(team_url)
+        logging.debug(f"Starting to scrape squad from {squad_url}")
+        squad = await self._scrape_page(squad_url, "squadra", "rosa", self.parse_squad, squad_url)
+
+        if squad is None:
+            logging.error(f"Failed to retrieve soup for {squad_url}")
+            return []
+
+        return squad
+
+    async def complete_player_details(self, player, required_fields=SQUAD_FIELDS, raise_errors=False):
+        """
+        Fills the fields of a squad record that are missing among `required_fields`
+        from the player's own page. Returns the player's PlayerRecord.
+        With `raise_errors` a profile that cannot be fetched raises instead of leaving the fields empty.
+        """
+        player_details = PlayerRecord.from_mapping(player)
+        missing = [col for col in required_fields if player_details.get(col) is None]
+        if not missing:
+            return player_details
+
+        logging.debug(f"Fetching profile of {player['name']} for missing fields: {', '.join(missing)}")
+        return merge_player_details(player_details, await self.scrape_player_details(player["link"], raise_errors))
@@ -0,0 +1,97 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from src.scraping.scraper import TransfermarktScraper
+from src.utils.metrics import METRICHE
+
+# Scraper usato per il parsing in ciascun processo del pool, creato una volta per processo
+_scraper = None
+
+
+def _init_worker(parser, restricted_parsing):
+    global _scraper
+    _scraper = TransfermarktScraper(parser=parser, restricted_parsing=restricted_parsing)
+
+
+def _parse_player_page(html, player_url):
+    # Le metriche del processo non arrivano al run: le durate tornano insieme al record
+    inizio = time.perf_counter()
+    soup = _scraper.make_soup(html, "giocatore")
+    analizzata = time.perf_counter()
+    record = _scraper._estrai("giocatore", _scraper.parse_player_details, soup, player_url)
+    return record, {"parse_secondi": analizzata - inizio, "estrazione_secondi": time.perf_counter() - analizzata}
+
+
+class ParserPool:
+    """
+    Process pool that parses player profile pages outside the fetching threads.
+
+    BeautifulSoup and the extraction in scraper_utils are pure Python and hold
+    the GIL, so threads that both download and parse end up parsing one page at
+    a time. With a ParserPool the threads only fetch the page text and hand it
+    to one of `processes` worker processes, which runs the same make_soup +
+    parse_player_details as TransfermarktScraper and sends back a PlayerRecord
+    (a compact, picklable list of values). While a thread waits for its record
+    it does not hold the GIL, so fetching and parsing overlap and parsing scales
+    with the number of cores.
+
+    The parse and extraction times measured in the workers are sent back with
+    each record and recorded in the caller's Metriche, so the run report has
+    the same parse_secondi and estrazione_secondi as without the pool.
+
+    Workers are started with the "spawn" method: the pool is used next to running
+    threads, where forking could copy locks held by other threads.
+    """
+
+    def __init__(self, processes: int = None, parser: str = None, restricted_parsing: bool = True):
+        """
+        Args:
+            processes (int, optional): Number of worker processes. Defaults to the number of cores.
+            parser (str, optional): BeautifulSoup backend of the workers (as in TransfermarktScraper).
+            restricted_parsing (bool, optional): Build only the subtrees used by the extraction. Defaults to True.
+        """
+        self.processes = processes or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(parser, restricted_parsing),
+        )
+
+    def submit(self, html: str, player_url: str = None, metriche=None):
+        """
+        Schedules the parsing of a player page and returns a concurrent.futures.Future of its PlayerRecord.
+        The worker's timings are recorded in `metriche` (default METRICHE) before the future completes.
+        """
+        metriche = metriche or METRICHE
+        risultato = Future()
+
+        def completa(futuro):
+            try:
+                record, durate = futuro.result()
+            except BaseException as e:
+                risultato.set_exception(e)
+                return
+            for nome, secondi in durate.items():
+                metriche.osserva(nome, secondi, tipo="giocatore")
+            risultato.set_result(record)
+
+        self._executor.submit(_parse_player_page, html, player_url).add_done_callback(completa)
+        return risultato
+
+    def parse_player_page(self, html: str, player_url: str = None, metriche=None):
+        """
+        Parses a player page in a worker process and returns its PlayerRecord.
+        """
+        return self.submit(html, player_url, metriche).result()
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,118 @@
+import pandas as pd
+
+# Fixed columns of the player details, in output order
+COLUMN_ORDER = [
+    "id_giocatore",
+    "numero_maglia",
+    "nome",
+    "cognome",
+    "data_nascita",
+    "età",
+    "luogo_nascita",
+    "altezza",
+    "nazionalità",
+    "posizione",
+    "piede",
+    "ruolo_naturale",
+    "altri_ruoli",
+    "in_rosa_da",
+    "scadenza",
+    "squadra_attuale",
+    "valore_attuale",
+    "valore_piu_alto",
+    "data_aggiornamento",
+]
+
+_FIELDS = frozenset(COLUMN_ORDER)
+
+
+class PlayerRecord:
+    """
+    The details of one player, one slot per COLUMN_ORDER field.
+
+    Records are filled in place by the scraper and support the small part of
+    the dict interface the rest of the code uses (get, [], update, keys/items,
+    `**record`), so they can be passed wherever a details dict was expected.
+    Assigning a field outside COLUMN_ORDER raises KeyError.
+    """
+
+    __slots__ = tuple(COLUMN_ORDER)
+
+    def __init__(self, **fields):
+        for col in COLUMN_ORDER:
+            setattr(self, col, None)
+        if fields:
+            self.update(fields)
+
+    @classmethod
+    def from_mapping(cls, mapping):
+        """
+        Builds a record from the COLUMN_ORDER keys of `mapping`, ignoring any other key.
+        """
+        record = cls()
+        for col in COLUMN_ORDER:
+            setattr(record, col, mapping.get(col))
+        return record
+
+    def get(self, field, default=None):
+        return getattr(self, field, default) if field in _FIELDS else default
+
+    def __getitem__(self, field):
+        if field not in _FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __setitem__(self, field, value):
+        if field not in _FIELDS:
+            raise KeyError(field)
+        setattr(self, field, value)
+
+    def update(self, fields):
+        for field, value in fields.items():
+            self[field] = value
+
+    def keys(self):
+        return COLUMN_ORDER
+
+    def values(self):
+        return [getattr(self, col) for col in COLUMN_ORDER]
+
+    def items(self):
+        return [(col, getattr(self, col)) for col in COLUMN_ORDER]
+
+    def __iter__(self):
+        return iter(COLUMN_ORDER)
+
+    def __len__(self):
+        return len(COLUMN_ORDER)
+
+    def __contains__(self, field):
+        return field in _FIELDS
+
+    def to_dict(self):
+        return {col: getattr(self, col) for col in COLUMN_ORDER}
+
+    def __eq__(self, other):
+        if isinstance(other, PlayerRecord):
+            return self.values() == other.values()
+        return NotImplemented
+
+    def __repr__(self):
+        campi = ", ".join(f"{col}={value!r}" for col, value in self.items() if value is not None)
+        return f"PlayerRecord({campi})"
+
+    # Slotted objects have no __dict__: pickle the values explicitly (e.g. for process pools)
+    def __getstate__(self):
+        return self.values()
+
+    def __setstate__(self, values):
+        for col, value in zip(COLUMN_ORDER, values):
+            setattr(self, col, value)
+
+
+def records_to_frame(records, columns=COLUMN_ORDER) -> pd.DataFrame:
+    """
+    Converts a batch of PlayerRecord (or details dicts) to a DataFrame in one step,
+    building each column directly instead of going through one dict per row.
+    """
+    return pd.DataFrame({col: [record.get(col) for record in records] for col in columns}, columns=columns)
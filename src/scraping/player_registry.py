@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+
+from src.scraping.player_record import PlayerRecord
+from src.scraping.scraper import SQUAD_FIELDS, merge_player_details
+from src.utils.scraper_utils import player_id
+
+
+class PlayerRegistry:
+    """
+    Run-wide, thread-safe registry of player profiles keyed on the player id.
+
+    A player can appear in several teams (loans and transfers within a window)
+    and seasons, under URLs that differ only in the slug or the season. The
+    registry fetches and parses each profile at most once per run: the first
+    thread asking for a player fetches it, threads asking while the fetch is in
+    progress wait for it, and later ones get the stored record. Every caller
+    receives its own copy, so each team row can be completed independently.
+
+    A profile that fails is not stored, so a later request (e.g. a retry)
+    fetches it again.
+
+    With `condivisi` (an object with `condiviso(chiave)` and `condividi(chiave,
+    valore)`, such as the WorkQueue of a distributed run) the profiles are also
+    shared between processes: a profile stored by another worker is not fetched
+    again, and every fetched profile is stored for the others. Two processes
+    asking for the same player at the same moment may still both fetch it.
+    """
+
+    def __init__(self, scraper, condivisi=None):
+        """
+        Args:
+            scraper (TransfermarktScraper): The scraper used to fetch the profiles.
+            condivisi (optional): Store shared with the other processes of the run. Defaults to None.
+        """
+        self.scraper = scraper
+        self.condivisi = condivisi
+        self.fetched = 0
+        self.shared = 0
+        self._profiles = {}
+        self._lock = threading.Lock()
+
+    def get(self, player_url: str, raise_errors: bool = False) -> PlayerRecord:
+        """
+        Returns a copy of the player's PlayerRecord, fetching the profile only if no other
+        request of the run did. On failure raises if `raise_errors`, otherwise returns an
+        empty record with only the player id.
+        """
+        key = player_id(player_url) or player_url
+        with self._lock:
+            future = self._profiles.get(key)
+            first = future is None
+            if first:
+                future = self._profiles[key] = Future()
+                self.fetched += 1
+            else:
+                self.shared += 1
+        try:
+            if first:
+                self._fetch(key, player_url, future)
+            return PlayerRecord.from_mapping(future.result())
+        except Exception as e:
+            if raise_errors:
+                raise
+            logging.error(f"Profile of {player_url} not available: {e}")
+            return PlayerRecord(id_giocatore=player_id(player_url))
+
+    def complete(self, player: dict, required_fields: list = SQUAD_FIELDS, raise_errors: bool = False) -> PlayerRecord:
+        """
+        Like TransfermarktScraper.complete_player_details, with the profile taken from the registry.
+        """
+        player_details = PlayerRecord.from_mapping(player)
+        if any(player_details.get(col) is None for col in required_fields):
+            merge_player_details(player_details, self.get(player["link"], raise_errors))
+        return player_details
+
+    def _fetch(self, key, player_url, future):
+        try:
+            if self.condivisi is not None:
+                stored = self.condivisi.condiviso(f"profilo:{key}")
+                if stored is not None:
+                    with self._lock:
+                        self.fetched -= 1
+                        self.shared += 1
+                    future.set_result(PlayerRecord.from_mapping(stored))
+                    return
+            record = self.scraper.scrape_player_details(player_url, raise_errors=True)
+            if self.condivisi is not None:
+                self.condivisi.condividi(f"profilo:{key}", record.to_dict())
+            future.set_result(record)
+        except Exception as e:
+            with self._lock:
+                del self._profiles[key]
+            future.set_exception(e)
+
+
+class AsyncPlayerRegistry(PlayerRegistry):
+    """
+    PlayerRegistry for AsyncTransfermarktScraper: the same once-per-run guarantee
+    within one event loop, with `get` and `complete` as coroutines.
+    """
+
+    async def get(self, player_url: str, raise_errors: bool = False) -> PlayerRecord:
+        key = player_id(player_url) or player_url
+        task = self._profiles.get(key)
+        if task is None:
+            task = self._profiles[key] = asyncio.ensure_future(self._fetch_async(key, player_url))
+            self.fetched += 1
+        else:
+            self.shared += 1
+        try:
+            # shield: a cancelled caller does not cancel the fetch shared with the others
+            return PlayerRecord.from_mapping(await asyncio.shield(task))
+        except Exception as e:
+            if raise_errors:
+                raise
+            logging.error(f"Profile of {player_url} not available: {e}")
+            return PlayerRecord(id_giocatore=player_id(player_url))
+
+    async def complete(self, player: dict, required_fields: list = SQUAD_FIELDS, raise_errors: bool = False) -> PlayerRecord:
+        player_details = PlayerRecord.from_mapping(player)
+        if any(player_details.get(col) is None for col in required_fields):
+            merge_player_details(player_details, await self.get(player["link"], raise_errors))
+        return player_details
+
+    async def _fetch_async(self, key, player_url):
+        try:
+            return await self.scraper.scrape_player_details(player_url, raise_errors=True)
+        except Exception:
+            self._profiles.pop(key, None)
+            raise
@@ -1,69 +1,373 @@
-import re
+import contextlib
+import logging
+import threading
 import time
 
 import requests
-from bs4 import BeautifulSoup, NavigableString
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
 
+from src.utils.streaming import mappa_limitata
 from src.utils.scraper_utils import (
+    CURRENT_AND_MAX_CLASS,
+    CURRENT_VALUE_CLASS,
+    DETAIL_POSITION_LABELS,
+    INFO_TABLE_LABELS,
+    MAX_CLASS,
+    MAX_VALUE_CLASS,
+    PARSE_ONLY,
+    available_parser,
+    build_label_index,
     extract_altri_ruoli,
     extract_links_from_table,
     extract_nationalities,
     extract_player_details_from_header,
     extract_value_from_div,
-    find_label_content,
+    label_text,
     find_table,
+    detailed_squad_url,
+    extract_squad_from_table,
     make_absolute_url,
-    parse_player_name,
+    player_id,
+    release_soup,
 )
+from src.scraping.player_record import COLUMN_ORDER, PlayerRecord
+from src.utils.metrics import METRICHE
+from src.utils.page_cache import CacheMissError, tipo_pagina
+from src.utils.rate_limiter import TokenBucket
+from src.utils.retry import RETRY_STATUS, backoff_delay, is_retryable, retry_after_seconds
+
+
+# Fields of COLUMN_ORDER that the detailed roster view provides for every player
+SQUAD_FIELDS = [
+    "numero_maglia",
+    "nome",
+    "cognome",
+    "data_nascita",
+    "età",
+    "altezza",
+    "nazionalità",
+    "posizione",
+    "piede",
+    "ruolo_naturale",
+    "in_rosa_da",
+    "scadenza",
+    "valore_attuale",
+]
+
+
+def merge_player_details(player_details, profile_details):
+    """
+    Fills the empty fields of `player_details` with the values scraped from the player's profile.
+    """
+    for col in COLUMN_ORDER:
+        if player_details.get(col) is None:
+            player_details[col] = profile_details.get(col)
+    return player_details
 
 
 class TransfermarktScraper:
 
-    def __init__(self, base_url="https://www.transfermarkt.it", headers=None, delay=1):
+    def __init__(self, base_url="https://www.transfermarkt.it", headers=None, delay=1, rate_limiter=None, cache=None,
+                 parser=None, restricted_parsing=True, metriche=None, limiter=None, max_retries=3, backoff_base=1.0,
+                 backoff_max=60.0, timeout=30, pool_size=None, parser_pool=None, memory_budget=None):
         """
         Inizializza lo scraper con l'URL di base, gli header HTTP e un ritardo tra le richieste.
+        Un `rate_limiter` (TokenBucket) esterno permette di condividere lo stesso limite tra più scraper.
+        Una `cache` (PageCache) evita di riscaricare le pagine ancora valide.
+        `parser` sceglie il backend di BeautifulSoup (di default il più veloce installato) e
+        `restricted_parsing` costruisce solo le parti di pagina usate da ciascun metodo di scraping.
+        `metriche` (Metriche) raccoglie tempi e contatori del run; di default il registro condiviso METRICHE.
+        `limiter` (AdaptiveLimiter) adatta il numero di richieste contemporanee alle risposte del server.
+        Una richiesta fallita per 429/5xx o errori di rete viene ritentata fino a `max_retries` volte,
+        con backoff esponenziale tra `backoff_base` e `backoff_max` secondi (o il Retry-After del server).
+        `pool_size` è il numero di connessioni keep-alive tenute aperte per host: va dimensionato sulla
+        concorrenza del run (di default il massimo del `limiter`, altrimenti 10).
+        Con un `parser_pool` (ParserPool) le pagine dei giocatori vengono analizzate in processi separati.
+        Un `memory_budget` (MemoryBudget) limita la memoria delle pagine in analisi contemporaneamente:
+        oltre il budget i worker aspettano che gli alberi delle altre pagine siano liberati.
         """
         self.base_url = base_url
         self.headers = headers or {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
+        # gzip/deflate sempre, br e zstd se i rispettivi moduli sono installati (urllib3 decomprime da sé)
+        self.headers = {"Accept-Encoding": ACCEPT_ENCODING, "Connection": "keep-alive", **self.headers}
         self.delay = delay  # Ritardo tra le richieste in secondi
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
+        # Limite globale condiviso da tutti i worker: di default una richiesta ogni `delay` secondi
+        self.rate_limiter = rate_limiter or TokenBucket(rate=1 / delay if delay > 0 else float("inf"))
+        self.cache = cache
+        self.parser = available_parser(parser)
+        self.restricted_parsing = restricted_parsing
+        self.metriche = metriche or METRICHE
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.parser_pool = parser_pool
+        self.memory_budget = memory_budget
+        self.pool_size = pool_size or (int(limiter.maximum) if limiter else 10)
+        # Un solo pool di connessioni (thread-safe) condiviso dalle sessioni di tutti i thread:
+        # le connessioni restano aperte tra squadre e campionati anche se i worker cambiano.
+        # Con pool_block i thread in eccesso aspettano una connessione libera invece di aprirne
+        # di nuove da chiudere subito dopo.
+        self._adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size, pool_block=True)
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        """
+        The requests.Session of the calling thread (sessions are not thread-safe);
+        every session is mounted on the shared connection pool.
+        """
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.headers)
+            session.mount("https://", self._adapter)
+            session.mount("http://", self._adapter)
+            self._local.session = session
+        return session
+
+    def connection_stats(self):
+        """
+        Connections opened and requests sent through the shared pool.
+        A `riuso` close to 1 means almost every request went over an already open
+        connection, i.e. without paying a new TCP/TLS handshake.
+        """
+        pools = self._adapter.poolmanager.pools
+        connessioni = richieste = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                connessioni += pool.num_connections
+                richieste += pool.num_requests
+        return {
+            "connessioni": connessioni,
+            "richieste": richieste,
+            "riuso": round(1 - connessioni / richieste, 3) if richieste else None,
+        }
 
-    def get_soup(self, url):
+    def fetch(self, url):
         """
-        Sends an HTTP GET request and returns a BeautifulSoup object.
+        Returns the page text, from the cache when possible, otherwise with an HTTP GET request
+        honouring the concurrency limiter and the shared rate limiter. Temporary failures are
+        retried with backoff; raises on other errors or once the retries are used up.
+        """
+        html, cached = self._from_cache(url)
+        if html is not None:
+            return html
+        attempt = 0
+        while True:
+            self._acquire_slot()
+            error, start = None, time.perf_counter()
+            try:
+                self.metriche.osserva("attesa_rate_limit_secondi", self.rate_limiter.acquire())
+                start = time.perf_counter()
+                return self._request(url, cached)
+            except requests.RequestException as e:
+                error = e
+                delay = self._retry_delay(url, e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                self._release_slot(error, time.perf_counter() - start)
+            time.sleep(delay)
+            attempt += 1
+
+    def _acquire_slot(self):
+        """
+        Waits for a free request slot of the concurrency limiter, if any.
+        """
+        if self.limiter:
+            self.metriche.osserva("attesa_concorrenza_secondi", self.limiter.acquire())
+
+    def _release_slot(self, error, latency):
+        """
+        Returns the slot to the limiter: 429/5xx and network errors count as congestion.
+        """
+        if not self.limiter:
+            return
+        congested = error is not None and (
+            not isinstance(error, requests.HTTPError) or error.response is None
+            or error.response.status_code in RETRY_STATUS
+        )
+        self.limiter.release(not congested, latency if error is None else None)
+        self.metriche.imposta("concorrenza_limite", round(self.limiter.limit, 2))
+
+    def _retry_delay(self, url, error, attempt):
+        """
+        Seconds to wait before retrying `url` after `error`, or None if the error is final.
+        A Retry-After header is honoured and, with a limiter, pauses every other request too.
+        """
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+        delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+        response = getattr(error, "response", None)
+        retry_after = retry_after_seconds(response.headers.get("Retry-After")) if response is not None else None
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+            if self.limiter:
+                self.limiter.pause(retry_after)
+        tipo = tipo_pagina(url)
+        self.metriche.incrementa("tentativi_ripetuti_totale", tipo=tipo)
+        logging.warning(f"Retrying {url} in {delay:.1f}s (attempt {attempt + 1} of {self.max_retries}): {error}")
+        return delay
+
+    def _from_cache(self, url):
+        """
+        Looks up `url` in the page cache.
+        Returns (html, cached): html is set when the page can be served without a request,
+        cached is the stale entry to revalidate (or None).
+        """
+        if not self.cache:
+            return None, None
+        cached = self.cache.get(url)
+        esito = "assente" if cached is None else "valida" if cached.fresh else "scaduta"
+        self.metriche.incrementa("cache_totale", tipo=tipo_pagina(url), esito=esito)
+        if cached and (cached.fresh or self.cache.offline):
+            logging.debug(f"Serving {url} from cache")
+            return cached.html, None
+        if self.cache.offline:
+            raise CacheMissError(f"{url} not in cache (offline mode)")
+        return None, cached
+
+    def _request(self, url, cached=None):
+        """
+        Performs the blocking GET without any rate limiting and returns the page text.
+        A stale cached entry is revalidated with If-None-Match/If-Modified-Since.
+        """
+        headers = {}
+        if cached:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+        tipo = tipo_pagina(url)
+        inizio = time.perf_counter()
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            self.metriche.incrementa("http_errori_totale", tipo=tipo, errore=type(e).__name__)
+            raise
+        finally:
+            self.metriche.osserva("fetch_secondi", time.perf_counter() - inizio, tipo=tipo)
+        self.metriche.incrementa("http_risposte_totale", tipo=tipo, stato=response.status_code)
+        self.metriche.incrementa("byte_scaricati_totale", len(response.content), tipo=tipo)
+        # Byte ricevuti dalla rete, prima della decompressione
+        self.metriche.incrementa("byte_trasferiti_totale", response.raw.tell(), tipo=tipo)
+        if cached and response.status_code == 304:
+            self.cache.refresh(url)
+            return cached.html
+        response.raise_for_status()
+        # Un'unica decodifica: response.text la ripete (con il rilevamento dell'encoding) a ogni accesso
+        html = response.text
+        if self.cache:
+            self.cache.put(url, html, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return html
+
+    def make_soup(self, html, page_type=None):
+        """
+        Parses raw HTML into a BeautifulSoup object.
+        With a `page_type` ('competizione', 'squadra', 'giocatore') and restricted parsing enabled,
+        only the subtrees needed for that page type are built.
+        """
+        parse_only = PARSE_ONLY.get(page_type) if self.restricted_parsing else None
+        with self.metriche.cronometra("parse_secondi", tipo=page_type or "altro"):
+            return BeautifulSoup(html, self.parser, parse_only=parse_only)
+
+    def _estrai(self, tipo, estrazione, soup, *args):
+        """
+        Runs one of the parse_* methods on `soup`, recording its duration as the extraction time of `tipo`.
+        The tree is torn down right after: only the extracted records outlive the call.
         """
-        print(f"Sending HTTP request to {url}")
         try:
-            response = self.session.get(url)
-            response.raise_for_status()
-            print(f"Successfully fetched content from {url}")
-            time.sleep(self.delay)
-            return BeautifulSoup(response.text, "html.parser")
+            with self.metriche.cronometra("estrazione_secondi", tipo=tipo):
+                return estrazione(soup, *args)
+        finally:
+            release_soup(soup)
+
+    def _riserva_memoria(self, html):
+        """
+        Reserves the page `html` in the memory budget until the end of the with block,
+        waiting while the pages in flight already use it up.
+        """
+        if not self.memory_budget:
+            return contextlib.nullcontext()
+        return self._attesa_memoria(len(html))
+
+    @contextlib.contextmanager
+    def _attesa_memoria(self, caratteri):
+        with self.memory_budget.riserva(caratteri) as attesa:
+            self.metriche.osserva("attesa_memoria_secondi", attesa)
+            yield
+
+    def _scrape_page(self, url, page_type, tipo, estrazione, *args, raise_errors=False):
+        """
+        Fetches `url` and returns `estrazione(soup, *args)` on its parse tree, within the memory budget.
+        The page text and tree are released as soon as the extraction returns.
+        Returns None if the page cannot be fetched (or raises, with `raise_errors`).
+        """
+        html = self.get_page(url, raise_errors)
+        if html is None:
+            return None
+        with self._riserva_memoria(html):
+            soup = self.make_soup(html, page_type)
+            del html
+            return self._estrai(tipo, estrazione, soup, *args)
+
+    def get_page(self, url, raise_errors=False):
+        """
+        Sends an HTTP GET request and returns the page text.
+        Errors are logged and return None, unless `raise_errors` is True.
+        """
+        logging.debug(f"Sending HTTP request to {url}")
+        try:
+            html = self.fetch(url)
+            logging.debug(f"Successfully fetched content from {url}")
+            return html
         except requests.HTTPError as http_err:
-            print(f"HTTP error occurred while fetching {url}: {http_err}")
+            logging.error(f"HTTP error occurred while fetching {url}: {http_err}")
+            if raise_errors:
+                raise
         except Exception as err:
-            print(f"An error occurred while fetching {url}: {err}")
+            logging.error(f"An error occurred while fetching {url}: {err}")
+            if raise_errors:
+                raise
         return None
 
+    def get_soup(self, url, page_type=None, raise_errors=False):
+        """
+        Sends an HTTP GET request and returns a BeautifulSoup object.
+        Errors are logged and return None, unless `raise_errors` is True.
+        """
+        html = self.get_page(url, raise_errors)
+        return self.make_soup(html, page_type) if html is not None else None
+
     def scrape_teams(self, competition_url):
         """
         Extracts team names and links from the competition page.
         Returns a list of dictionaries with team details.
         """
-        print(f"Starting to scrape teams from {competition_url}")
-        soup = self.get_soup(competition_url)
-        teams = []
+        logging.debug(f"Starting to scrape teams from {competition_url}")
+        teams = self._scrape_page(competition_url, "competizione", "competizione", self.parse_teams)
 
-        if not soup:
-            print(f"Failed to retrieve soup for {competition_url}")
-            return teams
+        if teams is None:
+            logging.error(f"Failed to retrieve soup for {competition_url}")
+            return []
+
+        return teams
 
+    def parse_teams(self, soup):
+        """
+        Extracts team names and links from an already parsed competition page.
+        """
+        teams = []
         table = find_table(soup, table_class="items")
         if not table:
-            print("Teams table not found.")
+            logging.warning("Teams table not found.")
             return teams
 
         # Extract links from the table
@@ -75,9 +379,9 @@ class TransfermarktScraper:
         for team in extracted_teams:
             team["link"] = make_absolute_url(self.base_url, team["link"])
             teams.append(team)
-            print(f"Found team: {team['name']}, Link: {team['link']}")
+            logging.debug(f"Found team: {team['name']}, Link: {team['link']}")
 
-        print(f"Completed scraping teams. Total teams found: {len(teams)}")
+        logging.debug(f"Completed scraping teams. Total teams found: {len(teams)}")
         return teams
 
     def scrape_players(self, team_url):
@@ -85,17 +389,23 @@ class TransfermarktScraper:
         Extracts players from a team's page.
         Returns a list of dictionaries with player details.
         """
-        print(f"Starting to scrape players from {team_url}")
-        soup = self.get_soup(team_url)
-        players = []
+        logging.debug(f"Starting to scrape players from {team_url}")
+        players = self._scrape_page(team_url, "squadra", "squadra", self.parse_players, team_url)
 
-        if not soup:
-            print(f"Failed to retrieve soup for {team_url}")
-            return players
+        if players is None:
+            logging.error(f"Failed to retrieve soup for {team_url}")
+            return []
 
+        return players
+
+    def parse_players(self, soup, team_url=None):
+        """
+        Extracts players from an already parsed team page.
+        """
+        players = []
         table = find_table(soup, table_class="items")
         if not table:
-            print(f"Players table not found for team: {team_url}")
+            logging.warning(f"Players table not found for team: {team_url}")
             return players
 
         # Extract links from the table
@@ -107,53 +417,127 @@ class TransfermarktScraper:
         for player in extracted_players:
             player["link"] = make_absolute_url(self.base_url, player["link"])
             players.append(player)
-            print(f"Found player: {player['name']}, Link: {player['link']}")
+            logging.debug(f"Found player: {player['name']}, Link: {player['link']}")
 
-        print(f"Completed scraping players. Total players found: {len(players)}")
+        logging.debug(f"Completed scraping players. Total players found: {len(players)}")
         return players
 
-    def scrape_player_details(self, player_url):
+    def scrape_squad(self, team_url):
+        """
+        Extracts the whole squad, with most player details, from the team's detailed roster view.
+        Returns a list of dictionaries with 'name', 'link' and all COLUMN_ORDER keys.
+        """
+        squad_url = detailed_squad_url(team_url)
+        logging.debug(f"Starting to scrape squad from {squad_url}")
+        squad = self._scrape_page(squad_url, "squadra", "rosa", self.parse_squad, squad_url)
+
+        if squad is None:
+            logging.error(f"Failed to retrieve soup for {squad_url}")
+            return []
+
+        return squad
+
+    def parse_squad(self, soup, squad_url=None):
+        """
+        Extracts the squad from an already parsed detailed roster page.
+        """
+        squad = []
+        table = find_table(soup, table_class="items")
+        if not table:
+            logging.warning(f"Squad table not found for team: {squad_url}")
+            return squad
+
+        for record in extract_squad_from_table(table):
+            player = {"name": record.pop("name"), "link": make_absolute_url(self.base_url, record.pop("link"))}
+            player.update({col: record.get(col) for col in COLUMN_ORDER})
+            player["id_giocatore"] = player_id(player["link"])
+            squad.append(player)
+
+        logging.debug(f"Completed scraping squad. Total players found: {len(squad)}")
+        return squad
+
+    def iter_teams(self, competition_urls):
+        """
+        Generator version of scrape_teams over several competition pages: yields each
+        team as soon as its page is parsed, requesting the next page only when the
+        consumer gets there.
+        """
+        for competition_url in ([competition_urls] if isinstance(competition_urls, str) else competition_urls):
+            yield from self.scrape_teams(competition_url)
+
+    def iter_players(self, team_urls):
+        """
+        Generator version of scrape_players over several team pages, one page at a time.
+        """
+        for team_url in ([team_urls] if isinstance(team_urls, str) else team_urls):
+            yield from self.scrape_players(team_url)
+
+    def iter_squad(self, team_urls):
+        """
+        Generator version of scrape_squad over several team pages, one page at a time.
+        """
+        for team_url in ([team_urls] if isinstance(team_urls, str) else team_urls):
+            yield from self.scrape_squad(team_url)
+
+    def iter_player_details(self, player_urls, max_in_flight=8, ordered=False):
+        """
+        Yields (player_url, PlayerRecord) pairs, fetching at most `max_in_flight` profiles at a time.
+        `player_urls` is consumed lazily, so it can be a generator such as iter_players.
+        Pages that cannot be fetched yield a record with all fields None.
+        """
+        yield from mappa_limitata(self.scrape_player_details, player_urls, max_in_flight, ordinato=ordered)
+
+    def complete_player_details(self, player, required_fields=SQUAD_FIELDS, raise_errors=False):
+        """
+        Fills the fields of a squad record that are missing among `required_fields`
+        from the player's own page. Returns the player's PlayerRecord.
+        With `raise_errors` a profile that cannot be fetched raises instead of leaving the fields empty.
+        """
+        player_details = PlayerRecord.from_mapping(player)
+        missing = [col for col in required_fields if player_details.get(col) is None]
+        if not missing:
+            return player_details
+
+        logging.debug(f"Fetching profile of {player['name']} for missing fields: {', '.join(missing)}")
+        return merge_player_details(player_details, self.scrape_player_details(player["link"], raise_errors))
+
+    def scrape_player_details(self, player_url, raise_errors=False):
         """
         Extracts detailed information about a player from their Transfermarkt page.
-        Returns a dictionary with player details.
-        """
-        # Define fixed columns
-        COLUMN_ORDER = [
-            "numero_maglia",
-            "nome",
-            "cognome",
-            "data_nascita",
-            "età",
-            "luogo_nascita",
-            "altezza",
-            "nazionalità",
-            "posizione",
-            "piede",
-            "ruolo_naturale",
-            "altri_ruoli",
-            "in_rosa_da",
-            "scadenza",
-            "squadra_attuale",
-            "valore_attuale",
-            "valore_piu_alto",
-            "data_aggiornamento",
-        ]
-
-        # Initialize the details dictionary with None
-        player_details = {col: None for col in COLUMN_ORDER}
+        Returns a PlayerRecord with the player details (all None if the page cannot be fetched,
+        unless `raise_errors` is True).
+        """
+        if self.parser_pool:
+            html = self.get_page(player_url, raise_errors)
+            if html is None:
+                return self.parse_player_details(None, player_url)
+            # Parsing ed estrazione in un processo del pool: il thread attende senza tenere il GIL
+            with self.metriche.cronometra("estrazione_secondi", tipo="giocatore_processo"):
+                return self.parser_pool.parse_player_page(html, player_url, self.metriche)
+        player_details = self._scrape_page(
+            player_url, "giocatore", "giocatore", self.parse_player_details, player_url, raise_errors=raise_errors
+        )
+        return player_details if player_details is not None else self.parse_player_details(None, player_url)
 
-        try:
-            soup = self.get_soup(player_url)
-            if not soup:
-                return player_details
+    def parse_player_details(self, soup, player_url=None):
+        """
+        Extracts detailed information about a player from an already parsed profile page.
+        Returns a PlayerRecord with the player details (all None but the id if `soup` is None).
+        """
+        # Every field starts as None, except the id taken from the URL
+        player_details = PlayerRecord(id_giocatore=player_id(player_url))
+
+        if not soup:
+            return player_details
 
+        try:
             # 1. Extract details from the header
             header = soup.find("h1", class_="data-header__headline-wrapper")
             if header:
                 header_details = extract_player_details_from_header(header)
                 player_details.update(header_details)
             else:
-                print("Player header not found.")
+                logging.warning("Player header not found.")
 
             # 2. Extract from the first info-table div
             info_table = soup.select_one("div.info-table.info-table--right-space")
@@ -164,8 +548,10 @@ class TransfermarktScraper:
                 )
 
             if info_table:
+                labels = build_label_index(info_table, INFO_TABLE_LABELS)
+
                 # Data di nascita and Età
-                nato_il = find_label_content(info_table, r"Nato il:")
+                nato_il = label_text(labels, "nato_il")
                 if nato_il:
                     # Split data_nascita and età
                     if "(" in nato_il and ")" in nato_il:
@@ -173,94 +559,63 @@ class TransfermarktScraper:
                         player_details["data_nascita"] = data_nascita.strip()
                         player_details["età"] = età.strip(")")
                     else:
-                        print("Unexpected format for 'Nato il:'")
+                        logging.warning("Unexpected format for 'Nato il:'")
 
                 # Luogo di nascita
-                luogo_nascita = find_label_content(info_table, r"Luogo di nascita:")
-                if luogo_nascita:
-                    player_details["luogo_nascita"] = luogo_nascita
+                player_details["luogo_nascita"] = label_text(labels, "luogo_nascita")
 
                 # Altezza
-                altezza = find_label_content(info_table, r"Altezza:")
+                altezza = label_text(labels, "altezza")
                 if altezza:
                     player_details["altezza"] = (
                         altezza.replace("&nbsp;", " ").replace("m", "").strip()
                     )
 
                 # Nazionalità
-                nazionalita_span = info_table.find(
-                    "span", text=re.compile(r"Nazionalità:", re.I)
-                )
-                if nazionalita_span:
-                    nazionalita_content = nazionalita_span.find_next_sibling(
-                        "span", class_="info-table__content--bold"
-                    )
-                    if nazionalita_content:
-                        player_details["nazionalità"] = extract_nationalities(
-                            nazionalita_content
-                        )
-
-                # Posizione
-                posizione = find_label_content(info_table, r"Posizione:")
-                if posizione:
-                    player_details["posizione"] = posizione
+                if "nazionalita" in labels:
+                    player_details["nazionalità"] = extract_nationalities(labels["nazionalita"])
 
-                # Piede
-                piede = find_label_content(info_table, r"Piede:")
-                if piede:
-                    player_details["piede"] = piede
+                # Posizione, Piede, In rosa da, Scadenza
+                for field in ("posizione", "piede", "in_rosa_da", "scadenza"):
+                    player_details[field] = label_text(labels, field)
 
                 # Squadra attuale
-                squadra_attuale = find_label_content(info_table, r"Squadra attuale:")
-                if squadra_attuale:
-                    # Assuming the last <a> tag contains the team name
-                    squadra_links = info_table.find_all("a")
+                if "squadra_attuale" in labels:
+                    # The last <a> tag of the content contains the team name
+                    squadra_links = labels["squadra_attuale"].find_all("a")
                     if squadra_links:
                         player_details["squadra_attuale"] = squadra_links[-1].get_text(
                             strip=True
                         )
-
-                # In rosa da
-                in_rosa_da = find_label_content(info_table, r"In rosa da:")
-                if in_rosa_da:
-                    player_details["in_rosa_da"] = in_rosa_da
-
-                # Scadenza
-                scadenza = find_label_content(info_table, r"Scadenza:")
-                if scadenza:
-                    player_details["scadenza"] = scadenza
             else:
-                print("Info table div not found.")
+                logging.warning("Info table div not found.")
 
             # 3. Extract from the second div (detail-position__box)
             detail_position = soup.find("div", class_="detail-position__box")
             if detail_position:
                 # Ruolo naturale
-                ruolo_naturale = find_label_content(detail_position, r"Ruolo naturale:")
-                if ruolo_naturale:
-                    player_details["ruolo_naturale"] = ruolo_naturale
+                labels = build_label_index(detail_position, DETAIL_POSITION_LABELS)
+                player_details["ruolo_naturale"] = label_text(labels, "ruolo_naturale")
 
                 # Altri ruoli
                 altri_ruoli = extract_altri_ruoli(detail_position)
                 if altri_ruoli:
                     player_details["altri_ruoli"] = altri_ruoli
             else:
-                print("Detail position box not found.")
+                logging.warning("Detail position box not found.")
 
             # 4. Extract values
-            valore_div = soup.find("div", class_=re.compile(r"\bcurrent-and-max\b"))
+            valore_div = soup.find("div", class_=CURRENT_AND_MAX_CLASS)
             if valore_div:
                 # Valore attuale
-                valore_attuale = extract_value_from_div(
-                    valore_div, r"\bcurrent-value\b"
-                )
+                valore_attuale = extract_value_from_div(valore_div, CURRENT_VALUE_CLASS)
                 if valore_attuale:
                     player_details["valore_attuale"] = valore_attuale
 
                 # Valore più alto and data di aggiornamento
-                max_div = valore_div.find("div", class_=re.compile(r"\bmax\b"))
+                max_div = valore_div.find("div", class_=MAX_CLASS)
                 if max_div:
-                    valore_piu_alto = extract_value_from_div(max_div, r"\bmax-value\b")
+                    valore_piu_alto = extract_value_from_div(max_div, MAX_VALUE_CLASS)
                     if valore_piu_alto:
                         player_details["valore_piu_alto"] = valore_piu_alto
 
@@ -272,9 +627,9 @@ class TransfermarktScraper:
                     else:
                         player_details["data_aggiornamento"] = "Data non disponibile"
             else:
-                print("'current-and-max' div not found.")
+                logging.warning("'current-and-max' div not found.")
 
         except Exception as e:
-            print(f"Error while scraping player details from {player_url}: {e}")
+            logging.error(f"Error while scraping player details from {player_url}: {e}")
 
         return player_details
@@ -0,0 +1,96 @@
+import threading
+import time
+
+
+class AdaptiveLimiter:
+    """
+    AIMD limit on the number of requests in flight, shared by every worker of a run.
+
+    While responses are healthy the limit grows additively (about +`increase` per
+    window of `limit` responses); on a 429/5xx, a connection error or a latency
+    well above the recent average it is cut multiplicatively by `decrease`, at most
+    once per `cooldown` seconds so that one burst of failures counts as a single
+    congestion signal. `pause` stops every new request until a given time, e.g.
+    for the Retry-After of a 429/503.
+    """
+
+    def __init__(self, initial: float = 4, minimum: float = 1, maximum: float = 16, increase: float = 1.0,
+                 decrease: float = 0.5, latency_factor: float = 3.0, cooldown: float = 1.0):
+        """
+        Args:
+            initial (float, optional): Starting limit. Defaults to 4.
+            minimum (float, optional): Lowest limit. Defaults to 1.
+            maximum (float, optional): Highest limit. Defaults to 16.
+            increase (float, optional): Additive increase per window of healthy responses. Defaults to 1.
+            decrease (float, optional): Multiplicative factor applied on congestion. Defaults to 0.5.
+            latency_factor (float, optional): A response slower than this multiple of the average latency
+                counts as congestion (None to ignore latency). Defaults to 3.
+            cooldown (float, optional): Minimum seconds between two decreases. Defaults to 1.
+        """
+        self.minimum = max(minimum, 1)
+        self.maximum = max(maximum, self.minimum)
+        self.limit = min(max(initial, self.minimum), self.maximum)
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.average_latency = None
+        self._samples = 0
+        self._last_decrease = 0.0
+        self._paused_until = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> float:
+        """
+        Blocks until a request may start. Returns the seconds waited.
+        """
+        start = time.monotonic()
+        with self._condition:
+            while True:
+                pause = self._paused_until - time.monotonic()
+                if pause > 0:
+                    self._condition.wait(pause)
+                elif self.in_flight >= int(self.limit):
+                    self._condition.wait()
+                else:
+                    break
+            self.in_flight += 1
+        return time.monotonic() - start
+
+    def release(self, ok: bool, latency: float = None):
+        """
+        Ends a request and adapts the limit: `ok` is False for 429/5xx and connection errors.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            congested = not ok
+            if ok and latency is not None:
+                slow = (
+                    self.latency_factor is not None
+                    and self._samples >= 5
+                    and latency > self.latency_factor * self.average_latency
+                )
+                congested = slow
+                # La media esclude le risposte anomale, così un rallentamento non alza la soglia
+                if not slow:
+                    self._samples += 1
+                    self.average_latency = latency if self.average_latency is None else (
+                        0.8 * self.average_latency + 0.2 * latency
+                    )
+            if congested:
+                now = time.monotonic()
+                if now - self._last_decrease >= self.cooldown:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self._last_decrease = now
+            else:
+                self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+            self._condition.notify_all()
+
+    def pause(self, seconds: float):
+        """
+        Holds every new request for `seconds` (extends, never shortens, a pause in progress).
+        """
+        with self._condition:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._condition.notify_all()
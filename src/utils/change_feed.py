@@ -0,0 +1,336 @@
+import collections
+import datetime
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from src.scraping.player_record import COLUMN_ORDER
+from src.utils.manifest import hash_contenuto
+
+TIPO_NUOVO = "nuovo"
+TIPO_MODIFICATO = "modificato"
+TIPO_RIMOSSO = "rimosso"
+
+# Campi confrontati tra due run: il contesto della squadra più i campi del giocatore
+CAMPI_CONFRONTO = ["campionato", "squadra"] + [campo for campo in COLUMN_ORDER if campo != "id_giocatore"]
+
+
+def _valore_canonico(valore):
+    """
+    Brings a value to the form it has in every mode (scraped record, manifest, CSV read back as str),
+    so the same data always gives the same hash: None for missing values, strings, lists of strings.
+    """
+    if valore is None or (isinstance(valore, float) and math.isnan(valore)):
+        return None
+    if isinstance(valore, (list, tuple)):
+        return [str(v) for v in valore]
+    if hasattr(valore, "tolist"):
+        return _valore_canonico(valore.tolist())
+    valore = str(valore)
+    return valore if valore not in ("", "nan", "<NA>") else None
+
+
+def record_canonico(contesto: dict, riga) -> dict:
+    """
+    Returns the fields of CAMPI_CONFRONTO of a player row (dict or PlayerRecord) with its team context.
+    """
+    dati = {**contesto, **{campo: riga.get(campo) for campo in COLUMN_ORDER}}
+    return {campo: _valore_canonico(dati.get(campo)) for campo in CAMPI_CONFRONTO}
+
+
+def differenze(vecchio: dict, nuovo: dict) -> dict:
+    """
+    Returns {campo: [vecchio, nuovo]} for the fields whose value differs between two canonical records.
+    """
+    vecchio, nuovo = vecchio or {}, nuovo or {}
+    return {
+        campo: [vecchio.get(campo), nuovo.get(campo)]
+        for campo in CAMPI_CONFRONTO
+        if vecchio.get(campo) != nuovo.get(campo)
+    }
+
+
+class ChangeFeed:
+    """
+    Change detection between scraping runs, keyed on the player id.
+
+    The database keeps, for every (player id, league, season, team), the hash of the last
+    record seen and the record itself. Each team completed during a run is compared
+    with it as soon as its rows are written, and every difference becomes an event
+    of the delta feed:
+
+    - `nuovo`: a player not seen before;
+    - `modificato`: a player whose record changed, with {campo: [vecchio, nuovo]}
+      for the changed fields only. A player who moved to another team in the same
+      season is a change of `squadra` (and of the fields that came with it), not a
+      removal plus a new player;
+    - `rimosso`: a player no longer in the roster of a team completed in the run.
+      Removals are emitted by `chiudi_run`, once every team of the run has been seen,
+      so that transfers between two teams of the run are recognised as such.
+
+    Events are appended to a JSON Lines file per run (`cartella_feed/<run>.jsonl`)
+    while the run progresses and kept in the `modifiche` table, so downstream jobs
+    can recompute only the affected players (`giocatori_modificati`). Teams that are
+    not completed in a run (failed, or outside the leagues and seasons requested)
+    keep their players untouched.
+    """
+
+    def __init__(self, percorso: str = "data/modifiche.sqlite", cartella_feed: str = "data/delta", run: str = None):
+        """
+        Args:
+            percorso (str, optional): Path of the SQLite file. Defaults to "data/modifiche.sqlite".
+            cartella_feed (str, optional): Folder of the JSON Lines files, one per run (None for none). Defaults to "data/delta".
+            run (str, optional): Identifier of the run. Defaults to the current time (YYYYMMDDTHHMMSSffffff).
+                Runs are ordered by when their events were recorded, not by identifier.
+        """
+        os.makedirs(os.path.dirname(percorso) or ".", exist_ok=True)
+        self.run = run or datetime.datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        self.percorso_feed = None
+        if cartella_feed:
+            os.makedirs(cartella_feed, exist_ok=True)
+            self.percorso_feed = os.path.join(cartella_feed, f"{self.run}.jsonl")
+        self.conteggi = collections.Counter()
+        self._squadre_complete = set()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(percorso, check_same_thread=False)
+        # Database creato prima che il campionato facesse parte della chiave: la tabella viene ricostruita
+        chiave = [riga[1] for riga in self._db.execute("PRAGMA table_info(giocatori)") if riga[5]]
+        da_migrare = bool(chiave) and "campionato" not in chiave
+        if da_migrare:
+            with self._db:
+                self._db.execute("DROP INDEX IF EXISTS giocatori_squadra")
+                self._db.execute("ALTER TABLE giocatori RENAME TO giocatori_senza_campionato")
+        self._db.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS giocatori (
+                id_giocatore TEXT NOT NULL,
+                campionato TEXT NOT NULL,
+                stagione TEXT NOT NULL,
+                squadra TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                dati TEXT NOT NULL,
+                visto_run TEXT NOT NULL,
+                aggiornato_il REAL NOT NULL,
+                PRIMARY KEY (id_giocatore, campionato, stagione, squadra)
+            );
+            CREATE INDEX IF NOT EXISTS giocatori_squadra ON giocatori (campionato, stagione, squadra);
+            CREATE TABLE IF NOT EXISTS modifiche (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                run TEXT NOT NULL,
+                tipo TEXT NOT NULL,
+                id_giocatore TEXT NOT NULL,
+                campionato TEXT,
+                stagione TEXT,
+                squadra TEXT,
+                campi TEXT NOT NULL,
+                registrata_il REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS modifiche_run ON modifiche (run);
+            CREATE INDEX IF NOT EXISTS modifiche_giocatore ON modifiche (id_giocatore);
+            CREATE TABLE IF NOT EXISTS run (
+                run TEXT PRIMARY KEY,
+                chiuso_il REAL NOT NULL,
+                nuovi INTEGER NOT NULL,
+                modificati INTEGER NOT NULL,
+                rimossi INTEGER NOT NULL
+            );
+            """
+        )
+        if da_migrare:
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO giocatori "
+                    "SELECT id_giocatore, COALESCE(campionato, ''), stagione, squadra, content_hash, dati, visto_run, aggiornato_il "
+                    "FROM giocatori_senza_campionato"
+                )
+                self._db.execute("DROP TABLE giocatori_senza_campionato")
+
+    def registra_squadra(self, contesto: dict, righe: list) -> list:
+        """
+        Compares the complete roster of a team with the last records seen and emits the events of
+        the new and changed players. Returns the events.
+
+        Args:
+            contesto (dict): campionato, stagione and squadra of the rows.
+            righe (list): The player rows (dicts or PlayerRecords) of the whole team.
+        """
+        campionato, stagione, squadra = str(contesto["campionato"]), str(contesto["stagione"]), str(contesto["squadra"])
+        eventi = []
+        with self._lock:
+            with self._db:
+                for riga in righe:
+                    record = record_canonico(contesto, riga)
+                    id_giocatore = _valore_canonico(riga.get("id_giocatore"))
+                    if id_giocatore is None:
+                        continue
+                    evento = self._confronta(id_giocatore, campionato, stagione, squadra, record)
+                    if evento:
+                        eventi.append(evento)
+                self._squadre_complete.add((campionato, stagione, squadra))
+            self._pubblica(eventi)
+        return eventi
+
+    def registra_frame(self, df) -> list:
+        """
+        Calls registra_squadra for every team of a frame with the campionato, stagione and squadra
+        columns (e.g. the output of consolida_csv). Returns the events.
+        """
+        eventi = []
+        if df is None or df.empty:
+            return eventi
+        for (campionato, stagione, squadra), righe in df.groupby(["campionato", "stagione", "squadra"], sort=False):
+            contesto = {"campionato": campionato, "stagione": stagione, "squadra": squadra}
+            eventi.extend(self.registra_squadra(contesto, righe.to_dict("records")))
+        return eventi
+
+    def chiudi_run(self) -> dict:
+        """
+        Emits the removals of the teams completed in the run (players no longer in their roster)
+        and returns the number of events of the run per type.
+        """
+        with self._lock:
+            eventi = []
+            with self._db:
+                for campionato, stagione, squadra in sorted(self._squadre_complete):
+                    rimossi = self._db.execute(
+                        "SELECT id_giocatore, dati FROM giocatori "
+                        "WHERE campionato = ? AND stagione = ? AND squadra = ? AND visto_run != ?",
+                        (campionato, stagione, squadra, self.run),
+                    ).fetchall()
+                    for id_giocatore, dati in rimossi:
+                        vecchio = json.loads(dati)
+                        eventi.append(self._evento(TIPO_RIMOSSO, id_giocatore, stagione, vecchio, differenze(vecchio, None)))
+                    self._db.execute(
+                        "DELETE FROM giocatori WHERE campionato = ? AND stagione = ? AND squadra = ? AND visto_run != ?",
+                        (campionato, stagione, squadra, self.run),
+                    )
+                self._squadre_complete.clear()
+            self._pubblica(eventi)
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO run (run, chiuso_il, nuovi, modificati, rimossi) VALUES (?, ?, ?, ?, ?)",
+                    (self.run, time.time(), self.conteggi[TIPO_NUOVO], self.conteggi[TIPO_MODIFICATO], self.conteggi[TIPO_RIMOSSO]),
+                )
+            return dict(self.conteggi)
+
+    def modifiche(self, run: str = None, tipo: str = None) -> list:
+        """
+        Returns the events of a run (the last closed run by default), optionally of one type, in order.
+        """
+        with self._lock:
+            run = run or self._ultimo_run()
+            query = "SELECT seq, run, tipo, id_giocatore, campionato, stagione, squadra, campi FROM modifiche WHERE run = ?"
+            parametri = [run]
+            if tipo:
+                query += " AND tipo = ?"
+                parametri.append(tipo)
+            rows = self._db.execute(query + " ORDER BY seq", parametri).fetchall()
+        return [
+            {"seq": seq, "run": run, "tipo": tipo, "id_giocatore": id_giocatore, "campionato": campionato,
+             "stagione": stagione, "squadra": squadra, "campi": json.loads(campi)}
+            for seq, run, tipo, id_giocatore, campionato, stagione, squadra, campi in rows
+        ]
+
+    def giocatori_modificati(self, dal_run: str = None) -> set:
+        """
+        Returns the ids of the players with at least one event in the runs from `dal_run` on
+        (the last closed run by default): the players whose ratings have to be recomputed.
+
+        Runs are ordered by the sequence number of their events; a run without events
+        covers the events recorded after it was closed.
+        """
+        with self._lock:
+            dal_run = dal_run or self._ultimo_run()
+            if dal_run is None:
+                return set()
+            primo_seq, = self._db.execute("SELECT MIN(seq) FROM modifiche WHERE run = ?", (dal_run,)).fetchone()
+            if primo_seq is not None:
+                rows = self._db.execute("SELECT DISTINCT id_giocatore FROM modifiche WHERE seq >= ?", (primo_seq,)).fetchall()
+            else:
+                chiuso = self._db.execute("SELECT chiuso_il FROM run WHERE run = ?", (dal_run,)).fetchone()
+                if chiuso is None:
+                    raise ValueError(f"Run sconosciuto: {dal_run}")
+                rows = self._db.execute(
+                    "SELECT DISTINCT id_giocatore FROM modifiche WHERE registrata_il > ?", chiuso
+                ).fetchall()
+        return {id_giocatore for id_giocatore, in rows}
+
+    def chiudi(self):
+        with self._lock:
+            self._db.close()
+
+    def _ultimo_run(self) -> str:
+        row = self._db.execute("SELECT run FROM run ORDER BY chiuso_il DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def _confronta(self, id_giocatore: str, campionato: str, stagione: str, squadra: str, record: dict) -> dict:
+        """
+        Compares a record with the last one seen for the player, saves it and returns its event (None if unchanged).
+        """
+        content_hash = hash_contenuto(record)
+        precedente = self._db.execute(
+            "SELECT campionato, squadra, content_hash, dati FROM giocatori "
+            "WHERE id_giocatore = ? AND campionato = ? AND stagione = ? AND squadra = ?",
+            (id_giocatore, campionato, stagione, squadra),
+        ).fetchone()
+        if precedente is None:
+            # Trasferimento: lo stesso giocatore nella stessa stagione in un'altra squadra (anche di un altro
+            # campionato) non ancora vista nel run
+            precedente = self._db.execute(
+                "SELECT campionato, squadra, content_hash, dati FROM giocatori "
+                "WHERE id_giocatore = ? AND stagione = ? AND visto_run != ? ORDER BY aggiornato_il DESC LIMIT 1",
+                (id_giocatore, stagione, self.run),
+            ).fetchone()
+            if precedente is not None:
+                self._db.execute(
+                    "DELETE FROM giocatori WHERE id_giocatore = ? AND campionato = ? AND stagione = ? AND squadra = ?",
+                    (id_giocatore, precedente[0], stagione, precedente[1]),
+                )
+
+        self._db.execute(
+            "INSERT OR REPLACE INTO giocatori "
+            "(id_giocatore, campionato, stagione, squadra, content_hash, dati, visto_run, aggiornato_il) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (id_giocatore, campionato, stagione, squadra, content_hash,
+             json.dumps(record, ensure_ascii=False), self.run, time.time()),
+        )
+        if precedente is None:
+            return self._evento(TIPO_NUOVO, id_giocatore, stagione, record, differenze(None, record))
+        if precedente[2] != content_hash:
+            return self._evento(TIPO_MODIFICATO, id_giocatore, stagione, record, differenze(json.loads(precedente[3]), record))
+        return None
+
+    def _evento(self, tipo: str, id_giocatore: str, stagione: str, record: dict, campi: dict) -> dict:
+        return {
+            "run": self.run,
+            "tipo": tipo,
+            "id_giocatore": id_giocatore,
+            "campionato": record.get("campionato"),
+            "stagione": stagione,
+            "squadra": record.get("squadra"),
+            "campi": campi,
+        }
+
+    def _pubblica(self, eventi: list):
+        """
+        Saves the events in the modifiche table and appends them to the feed of the run.
+        """
+        if not eventi:
+            return
+        adesso = time.time()
+        with self._db:
+            self._db.executemany(
+                "INSERT INTO modifiche (run, tipo, id_giocatore, campionato, stagione, squadra, campi, registrata_il) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(e["run"], e["tipo"], e["id_giocatore"], e["campionato"], e["stagione"], e["squadra"],
+                  json.dumps(e["campi"], ensure_ascii=False), adesso) for e in eventi],
+            )
+        if self.percorso_feed:
+            with open(self.percorso_feed, "a", encoding="utf-8") as f:
+                for evento in eventi:
+                    f.write(json.dumps(evento, ensure_ascii=False) + "\n")
+        self.conteggi.update(evento["tipo"] for evento in eventi)
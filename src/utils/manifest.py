@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Stati registrati per ogni URL
+STATO_OK = "ok"
+STATO_ERRORE = "errore"
+STATO_IN_CORSO = "in_corso"
+
+
+def hash_contenuto(dati) -> str:
+    """
+    Returns a stable SHA-1 of JSON-serializable data (dict keys are sorted).
+
+    Args:
+        dati: The data to hash.
+
+    Returns:
+        str: The hex digest.
+    """
+    return hashlib.sha1(json.dumps(dati, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+class RunManifest:
+    """
+    Persistent record of what previous runs fetched, keyed by URL.
+
+    For every competition, team and player URL it stores the page type, the
+    outcome of the last attempt, when it happened, a content hash and
+    (for players) the extracted record, so that a later run can:
+
+    - reuse players fetched successfully within a freshness window instead of
+      requesting their page again;
+    - skip teams whose squad hash is unchanged and whose files were completed;
+    - resume an interrupted run, since anything not marked 'ok' is redone.
+    """
+
+    def __init__(self, percorso: str = "data/manifest.sqlite"):
+        """
+        Args:
+            percorso (str, optional): Path of the SQLite file. Defaults to "data/manifest.sqlite".
+        """
+        os.makedirs(os.path.dirname(percorso) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(percorso, check_same_thread=False)
+        self._db.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS voci (
+                url TEXT PRIMARY KEY,
+                tipo TEXT NOT NULL,
+                stato TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                content_hash TEXT,
+                dati TEXT
+            );
+            """
+        )
+
+    def voce(self, url: str) -> dict:
+        """
+        Returns the manifest entry for `url` as a dict, or None if the URL was never recorded.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT tipo, stato, fetched_at, content_hash, dati FROM voci WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        tipo, stato, fetched_at, content_hash, dati = row
+        return {
+            "url": url,
+            "tipo": tipo,
+            "stato": stato,
+            "fetched_at": fetched_at,
+            "content_hash": content_hash,
+            "dati": json.loads(dati) if dati else None,
+        }
+
+    def fresca(self, url: str, finestra: float) -> dict:
+        """
+        Returns the entry for `url` if it was completed successfully less than `finestra` seconds ago, else None.
+        """
+        if not finestra:
+            return None
+        voce = self.voce(url)
+        if voce and voce["stato"] == STATO_OK and time.time() - voce["fetched_at"] < finestra:
+            return voce
+        return None
+
+    def registra(self, url: str, tipo: str, stato: str, content_hash: str = None, dati=None):
+        """
+        Records the outcome of processing `url`.
+
+        Args:
+            url (str): The page URL.
+            tipo (str): 'competizione', 'squadra' or 'giocatore'.
+            stato (str): STATO_OK, STATO_ERRORE or STATO_IN_CORSO.
+            content_hash (str, optional): Hash of the extracted content. Defaults to the hash of `dati`.
+            dati (optional): JSON-serializable data to keep (e.g. the player record).
+        """
+        if content_hash is None and dati is not None:
+            content_hash = hash_contenuto(dati)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO voci (url, tipo, stato, fetched_at, content_hash, dati) VALUES (?, ?, ?, ?, ?, ?)",
+                (url, tipo, stato, time.time(), content_hash,
+                 json.dumps(dati, ensure_ascii=False, default=str) if dati is not None else None),
+            )
+            self._db.commit()
+
+    def conteggi(self) -> dict:
+        """
+        Returns the number of entries per (tipo, stato).
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT tipo, stato, COUNT(*) FROM voci GROUP BY tipo, stato").fetchall()
+        return {(tipo, stato): n for tipo, stato, n in rows}
+
+    def chiudi(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,115 @@
+import asyncio
+import contextlib
+import threading
+import time
+
+# Byte stimati per ogni carattere di una pagina in lavorazione: il testo più l'albero di
+# BeautifulSoup (misurato sulle pagine in benchmarks/fixtures, parsing completo)
+FATTORE_PAGINA = 20
+
+
+def _risveglia(risveglio):
+    if not risveglio.done():
+        risveglio.set_result(None)
+
+
+class MemoryBudget:
+    """
+    Cap on the memory held by the pages being parsed at the same time, shared by every worker of a run.
+
+    Each page in flight reserves an estimate of its footprint (`fattore` bytes per
+    character of HTML: the text plus its parse tree) from the moment it is parsed
+    until its extraction is done and the tree is torn down. A worker whose page
+    would take the total above `max_mb` waits until other pages are released, so
+    with many concurrent workers the peak memory follows the budget rather than
+    the concurrency. A page larger than the whole budget is still let through
+    when nothing else is in flight, so a run never stalls.
+
+    Coroutines wait with `acquire_async`, which suspends the coroutine instead
+    of a thread, so a full budget never ties up the threads doing the requests.
+    """
+
+    def __init__(self, max_mb: float, fattore: float = FATTORE_PAGINA):
+        """
+        Args:
+            max_mb (float): Memory budget of the pages in flight, in MB.
+            fattore (float, optional): Estimated bytes per character of a page in flight. Defaults to FATTORE_PAGINA.
+        """
+        self.limite = int(max_mb * 1024 * 1024)
+        self.fattore = fattore
+        self.in_uso = 0
+        self.picco = 0
+        self.attese = 0
+        self._condition = threading.Condition()
+        # (loop, future) delle coroutine in attesa, svegliate da release
+        self._in_attesa = []
+
+    def stima(self, caratteri: int) -> int:
+        """
+        Estimated footprint in bytes of a page of `caratteri` characters.
+        """
+        return int(caratteri * self.fattore)
+
+    def acquire(self, caratteri: int) -> float:
+        """
+        Blocks until a page of `caratteri` characters fits in the budget and reserves it.
+        Returns the seconds waited.
+        """
+        byte = self.stima(caratteri)
+        start = time.monotonic()
+        with self._condition:
+            if self.in_uso and self.in_uso + byte > self.limite:
+                self.attese += 1
+                while self.in_uso and self.in_uso + byte > self.limite:
+                    self._condition.wait()
+            self.in_uso += byte
+            self.picco = max(self.picco, self.in_uso)
+        return time.monotonic() - start
+
+    async def acquire_async(self, caratteri: int) -> float:
+        """
+        Suspends the calling coroutine until a page of `caratteri` characters fits in the budget and reserves it.
+        Returns the seconds waited.
+        """
+        byte = self.stima(caratteri)
+        start = time.monotonic()
+        loop = asyncio.get_running_loop()
+        in_attesa = False
+        while True:
+            with self._condition:
+                if not (self.in_uso and self.in_uso + byte > self.limite):
+                    self.in_uso += byte
+                    self.picco = max(self.picco, self.in_uso)
+                    return time.monotonic() - start
+                if not in_attesa:
+                    self.attese += 1
+                    in_attesa = True
+                risveglio = loop.create_future()
+                self._in_attesa.append((loop, risveglio))
+            await risveglio
+
+    def release(self, caratteri: int):
+        """
+        Returns the reservation of a page of `caratteri` characters.
+        """
+        with self._condition:
+            self.in_uso -= self.stima(caratteri)
+            self._condition.notify_all()
+            in_attesa, self._in_attesa = self._in_attesa, []
+        for loop, risveglio in in_attesa:
+            try:
+                loop.call_soon_threadsafe(_risveglia, risveglio)
+            except RuntimeError:
+                # Event loop già chiuso: nessuno aspetta più
+                pass
+
+    @contextlib.contextmanager
+    def riserva(self, caratteri: int):
+        """
+        Context manager around acquire/release; yields the seconds waited.
+        """
+        attesa = self.acquire(caratteri)
+        try:
+            yield attesa
+        finally:
+            self.release(caratteri)
@@ -0,0 +1,208 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Limiti superiori (in secondi) dei bucket degli istogrammi di latenza
+BUCKET_SECONDI = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _Istogramma:
+    __slots__ = ("bucket", "conteggi", "somma", "conteggio", "massimo")
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.conteggi = [0] * (len(bucket) + 1)
+        self.somma = 0.0
+        self.conteggio = 0
+        self.massimo = 0.0
+
+    def osserva(self, valore):
+        self.conteggi[bisect.bisect_left(self.bucket, valore)] += 1
+        self.somma += valore
+        self.conteggio += 1
+        self.massimo = max(self.massimo, valore)
+
+    def quantile(self, q):
+        """
+        Upper bound of the bucket holding the q-th quantile (the maximum for the overflow bucket).
+        """
+        if not self.conteggio:
+            return None
+        soglia = q * self.conteggio
+        cumulato = 0
+        for limite, conteggio in zip(self.bucket, self.conteggi):
+            cumulato += conteggio
+            if cumulato >= soglia:
+                return limite
+        return self.massimo
+
+
+def _chiave(nome, etichette):
+    return nome, tuple(sorted((k, str(v)) for k, v in etichette.items()))
+
+
+def _etichette_prometheus(etichette, extra=()):
+    coppie = list(etichette) + list(extra)
+    if not coppie:
+        return ""
+    valori = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in coppie
+    )
+    return "{" + valori + "}"
+
+
+class Metriche:
+    """
+    Thread-safe registry of run metrics: counters, gauges and latency histograms,
+    each identified by a name and a set of labels (e.g. tipo="giocatore").
+
+    The registry can be exported as a JSON run report (`rapporto`, `salva_rapporto`)
+    or in the Prometheus text exposition format (`testo_prometheus`, `salva_prometheus`),
+    e.g. for the node_exporter textfile collector.
+    """
+
+    def __init__(self, prefisso: str = "fantaai"):
+        """
+        Args:
+            prefisso (str, optional): Prefix of the metric names in the Prometheus export. Defaults to "fantaai".
+        """
+        self.prefisso = prefisso
+        self._lock = threading.Lock()
+        self.azzera()
+
+    def azzera(self):
+        """
+        Drops every recorded value and restarts the run clock.
+        """
+        with self._lock:
+            self._contatori = {}
+            self._valori = {}
+            self._massimi = {}
+            self._istogrammi = {}
+            self.inizio = time.time()
+
+    def incrementa(self, nome: str, valore: float = 1, **etichette):
+        """
+        Adds `valore` to a counter.
+        """
+        chiave = _chiave(nome, etichette)
+        with self._lock:
+            self._contatori[chiave] = self._contatori.get(chiave, 0) + valore
+
+    def imposta(self, nome: str, valore: float, **etichette):
+        """
+        Sets a gauge (e.g. a queue depth); the report keeps both the last and the highest value.
+        """
+        chiave = _chiave(nome, etichette)
+        with self._lock:
+            self._valori[chiave] = valore
+            self._massimi[chiave] = max(self._massimi.get(chiave, valore), valore)
+
+    def osserva(self, nome: str, secondi: float, **etichette):
+        """
+        Records a duration in the histogram `nome`.
+        """
+        chiave = _chiave(nome, etichette)
+        with self._lock:
+            istogramma = self._istogrammi.get(chiave)
+            if istogramma is None:
+                istogramma = self._istogrammi[chiave] = _Istogramma(BUCKET_SECONDI)
+            istogramma.osserva(secondi)
+
+    @contextmanager
+    def cronometra(self, nome: str, **etichette):
+        """
+        Context manager recording the duration of its block in the histogram `nome`.
+        """
+        inizio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.osserva(nome, time.perf_counter() - inizio, **etichette)
+
+    def rapporto(self) -> dict:
+        """
+        Returns every metric as a JSON-serializable dict.
+        """
+        with self._lock:
+            contatori = [{"nome": n, "etichette": dict(e), "valore": v} for (n, e), v in sorted(self._contatori.items())]
+            valori = [
+                {"nome": n, "etichette": dict(e), "valore": v, "massimo": self._massimi[(n, e)]}
+                for (n, e), v in sorted(self._valori.items())
+            ]
+            istogrammi = [
+                {
+                    "nome": n,
+                    "etichette": dict(e),
+                    "conteggio": h.conteggio,
+                    "somma_s": round(h.somma, 6),
+                    "media_ms": round(h.somma / h.conteggio * 1000, 3) if h.conteggio else None,
+                    "p50_ms": round(h.quantile(0.5) * 1000, 3) if h.conteggio else None,
+                    "p95_ms": round(h.quantile(0.95) * 1000, 3) if h.conteggio else None,
+                    "max_ms": round(h.massimo * 1000, 3),
+                }
+                for (n, e), h in sorted(self._istogrammi.items())
+            ]
+            inizio = self.inizio
+        return {
+            "inizio": inizio,
+            "durata_s": round(time.time() - inizio, 3),
+            "contatori": contatori,
+            "valori": valori,
+            "istogrammi": istogrammi,
+        }
+
+    def salva_rapporto(self, percorso: str, **extra):
+        """
+        Writes the JSON run report to `percorso`; `extra` keys are added at the top level.
+        """
+        os.makedirs(os.path.dirname(percorso) or ".", exist_ok=True)
+        with open(percorso, "w", encoding="utf-8") as f:
+            json.dump({**extra, **self.rapporto()}, f, indent=2, ensure_ascii=False)
+
+    def testo_prometheus(self) -> str:
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        righe = []
+        dichiarate = set()
+
+        def dichiara(nome, tipo):
+            if nome not in dichiarate:
+                dichiarate.add(nome)
+                righe.append(f"# TYPE {self.prefisso}_{nome} {tipo}")
+
+        with self._lock:
+            for (nome, etichette), valore in sorted(self._contatori.items()):
+                dichiara(nome, "counter")
+                righe.append(f"{self.prefisso}_{nome}{_etichette_prometheus(etichette)} {valore}")
+            for (nome, etichette), valore in sorted(self._valori.items()):
+                dichiara(nome, "gauge")
+                righe.append(f"{self.prefisso}_{nome}{_etichette_prometheus(etichette)} {valore}")
+            for (nome, etichette), h in sorted(self._istogrammi.items()):
+                dichiara(nome, "histogram")
+                cumulato = 0
+                for limite, conteggio in zip(h.bucket + (float("inf"),), h.conteggi):
+                    cumulato += conteggio
+                    le = "+Inf" if limite == float("inf") else repr(limite)
+                    righe.append(f"{self.prefisso}_{nome}_bucket{_etichette_prometheus(etichette, [('le', le)])} {cumulato}")
+                righe.append(f"{self.prefisso}_{nome}_sum{_etichette_prometheus(etichette)} {h.somma}")
+                righe.append(f"{self.prefisso}_{nome}_count{_etichette_prometheus(etichette)} {h.conteggio}")
+        return "\n".join(righe) + "\n"
+
+    def salva_prometheus(self, percorso: str):
+        """
+        Writes the Prometheus text file atomically, so a collector never reads it half written.
+        """
+        os.makedirs(os.path.dirname(percorso) or ".", exist_ok=True)
+        temporaneo = f"{percorso}.tmp"
+        with open(temporaneo, "w", encoding="utf-8") as f:
+            f.write(self.testo_prometheus())
+        os.replace(temporaneo, percorso)
+
+
+# Registro condiviso da scraper, pipeline e salvataggi di un run
+METRICHE = Metriche()
@@ -0,0 +1,264 @@
+import gzip
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+# Tempo di validità (in secondi) delle pagine in cache per tipo di pagina
+TTL_PER_TIPO = {
+    "competizione": 24 * 3600,
+    "squadra": 24 * 3600,
+    "giocatore": 7 * 24 * 3600,
+    "altro": 24 * 3600,
+}
+
+_TIPI_PAGINA = [
+    ("competizione", re.compile(r"/wettbewerb/")),
+    ("giocatore", re.compile(r"/profil/spieler/")),
+    ("squadra", re.compile(r"/(startseite|kader)/verein/")),
+]
+
+
+def tipo_pagina(url: str) -> str:
+    """
+    Classifies a Transfermarkt URL as 'competizione', 'squadra', 'giocatore' or 'altro'.
+
+    Args:
+        url (str): The page URL.
+
+    Returns:
+        str: The page type.
+    """
+    for tipo, pattern in _TIPI_PAGINA:
+        if pattern.search(url):
+            return tipo
+    return "altro"
+
+
+class CacheMissError(Exception):
+    """
+    Raised in offline mode when a page is not in the cache.
+    """
+
+
+@dataclass
+class CachedPage:
+    html: str
+    etag: str
+    last_modified: str
+    fetched_at: float
+    fresh: bool
+
+
+class PageCache:
+    """
+    Persistent cache of downloaded pages, keyed by URL.
+
+    Page bodies are stored gzip-compressed under `objects/` and named by the
+    SHA-256 of their content, so identical pages are stored once. A SQLite
+    index maps each URL to its body together with the validators (ETag,
+    Last-Modified) and the fetch/access times used for TTL expiry and LRU
+    eviction once the cache grows beyond `max_bytes`.
+
+    Access times of cache hits are kept in memory and written to the index in
+    batches (every `flush_accessi` hits, with each stored page and on close), so a
+    warm cache serves pages without a commit per hit.
+
+    Several processes can share the same cache directory (e.g. the workers of a
+    distributed run): blobs are written to per-process temporary files, the
+    index uses WAL with a busy timeout, and the stored size is read back from
+    the index before each eviction, so `max_bytes` holds for all of them.
+
+    In `offline` mode the cache never lets a request through: every page is
+    served from disk regardless of its age, and a miss raises CacheMissError.
+    """
+
+    def __init__(self, cartella: str = "data/cache", max_bytes: int = 512 * 1024 * 1024, ttl: dict = None, offline: bool = False,
+                 flush_accessi: int = 100):
+        """
+        Args:
+            cartella (str, optional): Cache directory. Defaults to "data/cache".
+            max_bytes (int, optional): Maximum compressed size of the stored pages. Defaults to 512 MiB.
+            ttl (dict, optional): TTL in seconds per page type, overriding TTL_PER_TIPO.
+            offline (bool, optional): Replay purely from cache. Defaults to False.
+            flush_accessi (int, optional): Cache hits whose access time is buffered before writing them. Defaults to 100.
+        """
+        self.cartella = cartella
+        self.max_bytes = max_bytes
+        self.ttl = {**TTL_PER_TIPO, **(ttl or {})}
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.flush_accessi = flush_accessi
+        # url -> ultimo accesso non ancora scritto nell'indice
+        self._accessi = {}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(cartella, "objects"), exist_ok=True)
+        # Timeout lungo perché più processi possono scrivere sullo stesso indice
+        self._db = sqlite3.connect(os.path.join(cartella, "index.sqlite"), timeout=60, check_same_thread=False)
+        self._db.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                page_type TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY,
+                size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS pages_last_access ON pages(last_access);
+            """
+        )
+        self._size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.cartella, "objects", digest[:2], f"{digest}.html.gz")
+
+    def get(self, url: str):
+        """
+        Returns the cached page for `url` as a CachedPage, or None if it is not cached.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT digest, page_type, etag, last_modified, fetched_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            digest, page_type, etag, last_modified, fetched_at = row
+            try:
+                with gzip.open(self._blob_path(digest), "rt", encoding="utf-8") as f:
+                    html = f.read()
+            except (OSError, EOFError, UnicodeDecodeError):
+                # Blob perso, troncato o corrotto: le voci che lo usano non sono più utilizzabili
+                self._rimuovi_blob(digest)
+                self._db.commit()
+                self.misses += 1
+                return None
+            now = time.time()
+            self._accessi[url] = now
+            if len(self._accessi) >= self.flush_accessi:
+                self._scrivi_accessi()
+                self._db.commit()
+            fresh = now - fetched_at < self.ttl.get(page_type, TTL_PER_TIPO["altro"])
+            if fresh:
+                self.hits += 1
+            return CachedPage(html, etag, last_modified, fetched_at, fresh)
+
+    def put(self, url: str, html: str, etag: str = None, last_modified: str = None):
+        """
+        Stores a freshly downloaded page and evicts the least recently used pages if over budget.
+        """
+        data = html.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        with self._lock:
+            known = self._db.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone()
+            if not known:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Gli id dei thread si ripetono tra processi: il pid rende il file temporaneo unico
+                tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with gzip.open(tmp, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+                size = os.path.getsize(path)
+                # Un altro processo può aver salvato la stessa pagina nel frattempo
+                self._db.execute("INSERT OR IGNORE INTO blobs (digest, size) VALUES (?, ?)", (digest, size))
+            # Il commit della scrittura porta con sé gli accessi accumulati
+            self._accessi.pop(url, None)
+            self._scrivi_accessi()
+            now = time.time()
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages (url, digest, page_type, etag, last_modified, fetched_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, digest, tipo_pagina(url), etag, last_modified, now, now),
+            )
+            # Dimensione di tutta la cache, comprese le pagine salvate dagli altri processi
+            self._size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            self._evict()
+            self._db.commit()
+
+    def refresh(self, url: str):
+        """
+        Marks a cached page as fresh again after a successful revalidation (HTTP 304).
+        """
+        with self._lock:
+            now = time.time()
+            self._accessi.pop(url, None)
+            self._db.execute("UPDATE pages SET fetched_at = ?, last_access = ? WHERE url = ?", (now, now, url))
+            self._db.commit()
+            self.revalidated += 1
+
+    def _scrivi_accessi(self):
+        """
+        Writes the buffered access times to the index. Caller holds the lock and commits.
+        """
+        if self._accessi:
+            self._db.executemany(
+                "UPDATE pages SET last_access = ? WHERE url = ? AND last_access < ?",
+                [(accesso, url, accesso) for url, accesso in self._accessi.items()],
+            )
+            self._accessi.clear()
+
+    def _rimuovi_blob(self, digest: str):
+        """
+        Drops a blob, its file and every page stored with it. Caller holds the lock and commits.
+        """
+        for (url,) in self._db.execute("SELECT url FROM pages WHERE digest = ?", (digest,)).fetchall():
+            self._accessi.pop(url, None)
+        self._db.execute("DELETE FROM pages WHERE digest = ?", (digest,))
+        row = self._db.execute("SELECT size FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        if row is not None:
+            self._db.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+            self._size -= row[0]
+        try:
+            os.remove(self._blob_path(digest))
+        except OSError:
+            pass
+
+    def _evict(self):
+        """
+        Drops least recently used pages until the stored size fits in max_bytes. Caller holds the lock.
+        """
+        if self._size > self.max_bytes:
+            # L'ordine LRU deve tenere conto anche degli accessi ancora in memoria
+            self._scrivi_accessi()
+        while self._size > self.max_bytes:
+            row = self._db.execute("SELECT url FROM pages ORDER BY last_access LIMIT 1").fetchone()
+            if row is None:
+                break
+            self._db.execute("DELETE FROM pages WHERE url = ?", row)
+            orphans = self._db.execute(
+                "SELECT digest, size FROM blobs WHERE digest NOT IN (SELECT digest FROM pages)"
+            ).fetchall()
+            for digest, size in orphans:
+                try:
+                    os.remove(self._blob_path(digest))
+                except OSError:
+                    pass
+                self._db.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+                self._size -= size
+
+    def urls(self) -> list:
+        """
+        Returns the URLs of all cached pages.
+        """
+        with self._lock:
+            return [url for (url,) in self._db.execute("SELECT url FROM pages")]
+
+    def close(self):
+        with self._lock:
+            self._scrivi_accessi()
+            self._db.commit()
+            self._db.close()
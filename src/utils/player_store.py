@@ -0,0 +1,228 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+# Colonne della tabella giocatori dopo normalizza_giocatori, con il tipo SQLite
+COLONNE_ARCHIVIO = [
+    ("id_giocatore", "INTEGER"),
+    ("numero_maglia", "INTEGER"),
+    ("nome", "TEXT"),
+    ("cognome", "TEXT"),
+    ("data_nascita", "TEXT"),
+    ("età", "INTEGER"),
+    ("luogo_nascita", "TEXT"),
+    ("altezza", "REAL"),
+    ("nazionalità", "TEXT"),
+    ("nazionalità_principale", "TEXT"),
+    ("posizione", "TEXT"),
+    ("piede", "TEXT"),
+    ("ruolo_naturale", "TEXT"),
+    ("altri_ruoli", "TEXT"),
+    ("in_rosa_da", "TEXT"),
+    ("scadenza", "TEXT"),
+    ("squadra_attuale", "TEXT"),
+    ("valore_attuale", "REAL"),
+    ("valore_piu_alto", "REAL"),
+    ("data_aggiornamento", "TEXT"),
+]
+
+# Colonne salvate come liste JSON
+_COLONNE_LISTA = ("nazionalità", "altri_ruoli")
+
+_INDICI = {
+    "giocatori_campionato": ("campionato", "stagione", "squadra"),
+    "giocatori_squadra": ("squadra",),
+    "giocatori_posizione": ("posizione", "valore_attuale"),
+    "giocatori_ruolo": ("ruolo_naturale", "valore_attuale"),
+    "giocatori_nazionalita": ("nazionalità_principale",),
+    "giocatori_valore": ("valore_attuale",),
+    "giocatori_id": ("id_giocatore",),
+}
+
+
+def _q(colonna):
+    return f'"{colonna}"'
+
+
+def _valore_sql(valore):
+    """
+    Converts a value of a normalized frame to a type sqlite3 can store (None for missing values).
+    """
+    if isinstance(valore, (list, tuple, np.ndarray)):
+        return json.dumps([str(v) for v in valore], ensure_ascii=False)
+    if valore is None or valore is pd.NA or valore is pd.NaT:
+        return None
+    if isinstance(valore, float) and np.isnan(valore):
+        return None
+    if isinstance(valore, pd.Timestamp):
+        return valore.strftime("%Y-%m-%d")
+    if isinstance(valore, np.generic):
+        return valore.item()
+    return valore
+
+
+class PlayerStore:
+    """
+    Local SQLite database of teams and players, indexed for the queries of the FantaAI tools.
+
+    Players are stored with typed columns (the output of normalizza_giocatori:
+    values in euro, heights in metres, ISO dates) and indexed on league, season,
+    team, position, natural role, main nationality, market value and player id,
+    so questions like "Serie A centre-backs under 25 worth less than 10m" are
+    answered by `cerca` in milliseconds instead of reloading every CSV.
+
+    Updates are incremental: `salva_giocatori` replaces only the teams present
+    in the frame it receives, in one transaction per call.
+    """
+
+    def __init__(self, percorso: str = "data/giocatori.sqlite"):
+        """
+        Args:
+            percorso (str, optional): Path of the SQLite file. Defaults to "data/giocatori.sqlite".
+        """
+        os.makedirs(os.path.dirname(percorso) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(percorso, check_same_thread=False)
+        colonne = ", ".join(f"{_q(nome)} {tipo}" for nome, tipo in COLONNE_ARCHIVIO)
+        indici = "\n".join(
+            f"CREATE INDEX IF NOT EXISTS {nome} ON giocatori ({', '.join(_q(c) for c in colonne_indice)});"
+            for nome, colonne_indice in _INDICI.items()
+        )
+        self._db.executescript(
+            f"""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS squadre (
+                campionato TEXT NOT NULL,
+                stagione TEXT NOT NULL,
+                squadra TEXT NOT NULL,
+                giocatori INTEGER NOT NULL,
+                aggiornata_il REAL NOT NULL,
+                PRIMARY KEY (campionato, stagione, squadra)
+            );
+            CREATE TABLE IF NOT EXISTS giocatori (
+                campionato TEXT NOT NULL,
+                stagione TEXT NOT NULL,
+                squadra TEXT NOT NULL,
+                ordine INTEGER NOT NULL,
+                {colonne}
+            );
+            {indici}
+            """
+        )
+
+    def salva_giocatori(self, df: pd.DataFrame):
+        """
+        Replaces the players of every (campionato, stagione, squadra) present in `df`.
+
+        Args:
+            df (pd.DataFrame): Normalized player rows (normalizza_giocatori) with the columns
+                campionato, stagione and squadra.
+        """
+        if df.empty:
+            return
+        nomi = [nome for nome, _ in COLONNE_ARCHIVIO]
+        inserisci = (
+            f"INSERT INTO giocatori (campionato, stagione, squadra, ordine, {', '.join(_q(n) for n in nomi)}) "
+            f"VALUES ({', '.join('?' * (len(nomi) + 4))})"
+        )
+        adesso = time.time()
+        with self._lock, self._db:
+            for (campionato, stagione, squadra), righe in df.groupby(["campionato", "stagione", "squadra"], sort=False, observed=True):
+                chiave = (str(campionato), str(stagione), str(squadra))
+                self._db.execute("DELETE FROM giocatori WHERE campionato = ? AND stagione = ? AND squadra = ?", chiave)
+                valori = [righe[nome].tolist() if nome in righe.columns else [None] * len(righe) for nome in nomi]
+                self._db.executemany(
+                    inserisci,
+                    (chiave + (ordine,) + tuple(_valore_sql(v) for v in riga) for ordine, riga in enumerate(zip(*valori))),
+                )
+                self._db.execute(
+                    "INSERT OR REPLACE INTO squadre (campionato, stagione, squadra, giocatori, aggiornata_il) VALUES (?, ?, ?, ?, ?)",
+                    chiave + (len(righe), adesso),
+                )
+
+    def cerca(self, campionato: str = None, stagione: str = None, squadra: str = None, posizione: str = None,
+              ruolo: str = None, nazionalita: str = None, eta_min: int = None, eta_max: int = None,
+              valore_min: float = None, valore_max: float = None, ordina_per: str = "valore_attuale",
+              decrescente: bool = True, limite: int = None) -> pd.DataFrame:
+        """
+        Returns the players matching every given filter (None = no filter).
+
+        Args:
+            campionato (str, optional): League, e.g. "serie a".
+            stagione (str, optional): Season, e.g. "2024".
+            squadra (str, optional): Team name.
+            posizione (str, optional): Exact position, e.g. "Difesa - Difensore centrale".
+            ruolo (str, optional): Natural role, e.g. "Difensore centrale".
+            nazionalita (str, optional): Main nationality.
+            eta_min (int, optional): Minimum age, inclusive.
+            eta_max (int, optional): Maximum age, inclusive ("under 25" is eta_max=24).
+            valore_min (float, optional): Minimum market value in euro, inclusive.
+            valore_max (float, optional): Maximum market value in euro, inclusive.
+            ordina_per (str, optional): Column to sort by. Defaults to "valore_attuale".
+            decrescente (bool, optional): Sort in descending order. Defaults to True.
+            limite (int, optional): Maximum number of rows.
+
+        Returns:
+            pd.DataFrame: The matching players, with nationalities and other roles as lists.
+        """
+        filtri = [
+            ("campionato = ?", campionato),
+            ("stagione = ?", None if stagione is None else str(stagione)),
+            ("squadra = ?", squadra),
+            ('"posizione" = ?', posizione),
+            ('"ruolo_naturale" = ?', ruolo),
+            ('"nazionalità_principale" = ?', nazionalita),
+            ('"età" >= ?', eta_min),
+            ('"età" <= ?', eta_max),
+            ('"valore_attuale" >= ?', valore_min),
+            ('"valore_attuale" <= ?', valore_max),
+        ]
+        condizioni = [condizione for condizione, valore in filtri if valore is not None]
+        parametri = [valore for _, valore in filtri if valore is not None]
+        colonne_valide = {"campionato", "stagione", "squadra", "ordine"} | {nome for nome, _ in COLONNE_ARCHIVIO}
+        if ordina_per not in colonne_valide:
+            raise ValueError(f"Colonna di ordinamento sconosciuta: {ordina_per}")
+        query = "SELECT * FROM giocatori"
+        if condizioni:
+            query += " WHERE " + " AND ".join(condizioni)
+        query += f" ORDER BY {_q(ordina_per)} IS NULL, {_q(ordina_per)} {'DESC' if decrescente else 'ASC'}"
+        if limite:
+            query += " LIMIT ?"
+            parametri.append(int(limite))
+        return self.sql(query, parametri)
+
+    def giocatore(self, id_giocatore) -> pd.DataFrame:
+        """
+        Returns every row of a player (one per season and team), oldest season first.
+        """
+        return self.sql("SELECT * FROM giocatori WHERE id_giocatore = ? ORDER BY stagione", [int(id_giocatore)])
+
+    def squadre(self, campionato: str = None, stagione: str = None) -> pd.DataFrame:
+        """
+        Returns the stored teams, optionally of one league and season.
+        """
+        filtri = [("campionato = ?", campionato), ("stagione = ?", None if stagione is None else str(stagione))]
+        condizioni = [condizione for condizione, valore in filtri if valore is not None]
+        query = "SELECT * FROM squadre" + (" WHERE " + " AND ".join(condizioni) if condizioni else "")
+        return self.sql(query + " ORDER BY campionato, stagione, squadra", [v for _, v in filtri if v is not None])
+
+    def sql(self, query: str, parametri=()) -> pd.DataFrame:
+        """
+        Runs a read query on the store and returns the result as a DataFrame.
+        """
+        with self._lock:
+            df = pd.read_sql_query(query, self._db, params=list(parametri))
+        for colonna in _COLONNE_LISTA:
+            if colonna in df.columns:
+                df[colonna] = df[colonna].map(lambda v: json.loads(v) if isinstance(v, str) else v)
+        return df
+
+    def chiudi(self):
+        with self._lock:
+            self._db.close()
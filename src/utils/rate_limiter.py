@@ -0,0 +1,60 @@
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter shared by every worker of a scraping run.
+
+    Tokens are refilled continuously at `rate` per second up to `capacity`.
+    Each request takes one token; when the bucket is empty the caller is told
+    how long to wait for its reserved token, so concurrent callers are spaced
+    out instead of all sleeping the same fixed delay. The same instance can be
+    used from threads (`acquire`) and from an event loop (`acquire_async`).
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        """
+        Args:
+            rate (float): Tokens added per second (i.e. requests per second).
+            capacity (float, optional): Maximum burst size. Defaults to 1.
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Reserves one token and returns how many seconds the caller must wait before using it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self) -> float:
+        """
+        Blocks the calling thread until a token is available. Returns the seconds waited.
+        """
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        """
+        Suspends the calling coroutine until a token is available. Returns the seconds waited.
+        """
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
@@ -0,0 +1,159 @@
+import email.utils
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+import requests
+
+# HTTP status codes of a temporary condition (rate limiting, overload) worth retrying
+RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+
+# Stati delle pagine nella coda dei ritentativi
+STATO_IN_ATTESA = "in_attesa"
+STATO_ESAURITO = "esaurito"
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    True for connection errors, timeouts and HTTP errors with a status in RETRY_STATUS.
+    """
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and error.response.status_code in RETRY_STATUS
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+def retry_after_seconds(value) -> float:
+    """
+    Parses a Retry-After header, given either as seconds or as an HTTP date.
+    Returns the seconds to wait (never negative), or None if the header is missing or malformed.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """
+    Exponential backoff with full jitter: a random delay in [0, min(cap, base * 2**attempt)],
+    so that workers that failed together do not all retry at the same moment.
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class RetryQueue:
+    """
+    Persistent queue of pages that failed and are waiting to be retried, keyed by URL.
+
+    Each entry keeps the number of attempts made, when the next attempt is due,
+    the last error and optional JSON data needed to redo the work. Entries are
+    removed once the page is fetched; pages that run out of attempts stay in the
+    queue marked STATO_ESAURITO, so they can be inspected after the run. Since the
+    queue is on disk, the backoff of a page survives a restart: a new run can
+    wait for the due time instead of immediately requesting the page again.
+    """
+
+    def __init__(self, percorso: str = "data/ritentativi.sqlite"):
+        """
+        Args:
+            percorso (str, optional): Path of the SQLite file. Defaults to "data/ritentativi.sqlite".
+        """
+        os.makedirs(os.path.dirname(percorso) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(percorso, check_same_thread=False)
+        self._db.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS ritentativi (
+                url TEXT PRIMARY KEY,
+                tipo TEXT NOT NULL,
+                stato TEXT NOT NULL,
+                tentativi INTEGER NOT NULL,
+                prossimo REAL NOT NULL,
+                errore TEXT,
+                dati TEXT
+            );
+            """
+        )
+
+    def programma(self, url: str, tipo: str, tentativi: int, prossimo: float, errore: str = None, dati=None):
+        """
+        Adds or updates the entry of `url`, due at the epoch time `prossimo`.
+
+        Args:
+            url (str): The page URL.
+            tipo (str): Page type, e.g. 'giocatore'.
+            tentativi (int): Attempts already made.
+            prossimo (float): Epoch time of the next attempt.
+            errore (str, optional): The last error.
+            dati (optional): JSON-serializable data needed to retry the page.
+        """
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO ritentativi (url, tipo, stato, tentativi, prossimo, errore, dati) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, tipo, STATO_IN_ATTESA, tentativi, prossimo, errore,
+                 json.dumps(dati, ensure_ascii=False, default=str) if dati is not None else None),
+            )
+            self._db.commit()
+
+    def esaurito(self, url: str, errore: str = None):
+        """
+        Marks `url` as having run out of attempts.
+        """
+        with self._lock:
+            self._db.execute("UPDATE ritentativi SET stato = ?, errore = ? WHERE url = ?", (STATO_ESAURITO, errore, url))
+            self._db.commit()
+
+    def completa(self, url: str):
+        """
+        Removes `url` from the queue after a successful attempt.
+        """
+        with self._lock:
+            self._db.execute("DELETE FROM ritentativi WHERE url = ?", (url,))
+            self._db.commit()
+
+    def in_attesa(self, tipo: str = None) -> list:
+        """
+        Returns the entries still waiting to be retried (optionally of one `tipo`), earliest due first.
+        """
+        query = "SELECT url, tipo, tentativi, prossimo, errore, dati FROM ritentativi WHERE stato = ?"
+        parametri = [STATO_IN_ATTESA]
+        if tipo:
+            query += " AND tipo = ?"
+            parametri.append(tipo)
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY prossimo", parametri).fetchall()
+        return [
+            {
+                "url": url,
+                "tipo": tipo,
+                "tentativi": tentativi,
+                "prossimo": prossimo,
+                "errore": errore,
+                "dati": json.loads(dati) if dati else None,
+            }
+            for url, tipo, tentativi, prossimo, errore, dati in rows
+        ]
+
+    def conteggi(self) -> dict:
+        """
+        Returns the number of entries per (tipo, stato).
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT tipo, stato, COUNT(*) FROM ritentativi GROUP BY tipo, stato").fetchall()
+        return {(tipo, stato): n for tipo, stato, n in rows}
+
+    def chiudi(self):
+        with self._lock:
+            self._db.close()
@@ -1,28 +1,242 @@
+import ast
 import os
+import tempfile
+import time
+from urllib.parse import quote
+
 import pandas as pd
 import logging
 
-def salva_df(df: pd.DataFrame, cartella: str, nome_file: str, formato: str = "csv"):
+from src.utils.metrics import METRICHE
+
+def _scrivi_atomico(percorso: str, scrivi):
     """
-    Salva un DataFrame in formato CSV o JSON nella cartella specificata.
+    Scrive un file passando da un file temporaneo nella stessa cartella e lo rinomina al termine,
+    così chi legge vede sempre il file precedente o quello nuovo completo.
+
+    Args:
+        percorso (str): Il percorso finale del file.
+        scrivi (callable): Funzione che riceve il percorso temporaneo e vi scrive i dati.
+    """
+    fd, percorso_tmp = tempfile.mkstemp(dir=os.path.dirname(percorso) or ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        scrivi(percorso_tmp)
+        os.replace(percorso_tmp, percorso)
+    except BaseException:
+        os.remove(percorso_tmp)
+        raise
+
+def salva_df(df: pd.DataFrame, cartella: str, nome_file: str, formato: str = "csv") -> bool:
+    """
+    Salva un DataFrame in formato CSV, JSON o Parquet nella cartella specificata.
+    Il file viene sostituito in modo atomico (file temporaneo + rename).
 
     Args:
         df (pd.DataFrame): Il DataFrame da salvare.
         cartella (str): Il percorso della cartella dove salvare il file.
         nome_file (str): Il nome del file senza estensione.
-        formato (str, optional): Il formato di salvataggio ("csv" o "json"). Defaults to "csv".
+        formato (str, optional): Il formato di salvataggio ("csv", "json" o "parquet"). Defaults to "csv".
+
+    Returns:
+        bool: True se il file è stato scritto; gli errori vengono registrati nel log e restituiscono False.
     """
     try:
         os.makedirs(cartella, exist_ok=True)  # Crea la cartella se non esiste
+        if formato in ("csv", "json", "parquet"):
+            METRICHE.incrementa("righe_scritte_totale", len(df), formato=formato)
         if formato == "csv":
             percorso = os.path.join(cartella, f"{nome_file}.csv")
-            df.to_csv(percorso, index=False, encoding="utf-8")
-            logging.info(f"Dati salvati in CSV: {percorso}")
+            with METRICHE.cronometra("scrittura_secondi", formato=formato):
+                _scrivi_atomico(percorso, lambda tmp: df.to_csv(tmp, index=False, encoding="utf-8"))
+            logging.debug(f"Dati salvati in CSV: {percorso}")
         elif formato == "json":
             percorso = os.path.join(cartella, f"{nome_file}.json")
-            df.to_json(percorso, orient="records", force_ascii=False, indent=4)
-            logging.info(f"Dati salvati in JSON: {percorso}")
+            with METRICHE.cronometra("scrittura_secondi", formato=formato):
+                _scrivi_atomico(percorso, lambda tmp: df.to_json(tmp, orient="records", force_ascii=False, indent=4))
+            logging.debug(f"Dati salvati in JSON: {percorso}")
+        elif formato == "parquet":
+            percorso = os.path.join(cartella, f"{nome_file}.parquet")
+            with METRICHE.cronometra("scrittura_secondi", formato=formato):
+                _scrivi_atomico(percorso, lambda tmp: _tipizza(df).to_parquet(tmp, index=False, compression="zstd"))
+            logging.debug(f"Dati salvati in Parquet: {percorso}")
         else:
             logging.error(f"Formato di salvataggio non supportato: {formato}")
+            return False
     except Exception as e:
         logging.error(f"Errore nel salvataggio del DataFrame: {e}")
+        return False
+    return True
+
+
+# Colonne che contengono liste di valori (salvate come list<string> in Parquet)
+COLONNE_LISTA = ["nazionalità", "altri_ruoli"]
+
+# Colonne di partizionamento del dataset consolidato
+PARTIZIONI_DATASET = ["campionato", "stagione"]
+
+def _da_lista(valore):
+    """
+    Converte una lista letta da CSV (es. "['Italia', 'Francia']") in una lista Python.
+    """
+    if isinstance(valore, str) and valore.startswith("["):
+        try:
+            return ast.literal_eval(valore)
+        except (ValueError, SyntaxError):
+            return None
+    return valore
+
+def _tipizza(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Prepara un DataFrame per il formato colonnare: le colonne testuali diventano stringhe,
+    le colonne lista restano liste e le colonne già numeriche o datetime non vengono toccate.
+    """
+    df = df.copy()
+    for colonna in df.columns:
+        if colonna in COLONNE_LISTA:
+            df[colonna] = [valore if isinstance(valore, list) else None for valore in df[colonna]]
+        elif df[colonna].dtype == object:
+            df[colonna] = df[colonna].astype("string")
+    return df
+
+def _cartella_partizione(cartella: str, partizioni: list, valori) -> str:
+    """
+    Restituisce la cartella hive (es. campionato=serie%20a/stagione=2024) di una combinazione di partizioni,
+    con i valori codificati come li scrive e li legge pyarrow.
+    """
+    return os.path.join(cartella, *(f"{p}={quote(str(v), safe='')}" for p, v in zip(partizioni, valori)))
+
+def salva_frammento_dataset(df: pd.DataFrame, cartella: str, nome_frammento: str, partizioni: list = None,
+                            compressione: str = "zstd") -> str:
+    """
+    Salva le righe di una sola combinazione di partizioni (es. una squadra) nel file <nome_frammento>.parquet
+    della loro cartella di partizione. Solo quel file viene sostituito, in modo atomico: le altre squadre
+    della partizione restano invariate.
+
+    Args:
+        df (pd.DataFrame): Le righe da salvare, tutte con gli stessi valori delle colonne di partizione.
+        cartella (str): La cartella radice del dataset.
+        nome_frammento (str): Il nome del file nella partizione (es. la squadra), senza estensione.
+        partizioni (list, optional): Colonne di partizionamento. Defaults to PARTIZIONI_DATASET.
+        compressione (str, optional): Codec di compressione. Defaults to "zstd".
+
+    Returns:
+        str: Il percorso del file scritto.
+    """
+    partizioni = partizioni or PARTIZIONI_DATASET
+    cartella_partizione = _cartella_partizione(cartella, partizioni, [df[p].iloc[0] for p in partizioni])
+    os.makedirs(cartella_partizione, exist_ok=True)
+    percorso = os.path.join(cartella_partizione, f"{quote(str(nome_frammento), safe=' ')}.parquet")
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Le colonne di partizione sono nel percorso, come nei file scritti da pyarrow.dataset
+    tabella = pa.Table.from_pandas(_tipizza(df.drop(columns=partizioni)), preserve_index=False)
+    # Una colonna lista tutta vuota in una squadra resta list<string>, così i file della partizione hanno lo stesso schema
+    for colonna in COLONNE_LISTA:
+        if colonna in tabella.column_names and pa.types.is_null(tabella.schema.field(colonna).type):
+            indice = tabella.column_names.index(colonna)
+            tabella = tabella.set_column(indice, colonna, tabella.column(colonna).cast(pa.list_(pa.string())))
+    inizio = time.perf_counter()
+    _scrivi_atomico(percorso, lambda tmp: pq.write_table(tabella, tmp, compression=compressione))
+    METRICHE.osserva("scrittura_secondi", time.perf_counter() - inizio, formato="dataset")
+    METRICHE.incrementa("righe_scritte_totale", len(df), formato="dataset")
+    logging.debug(f"Frammento del dataset salvato in {percorso} ({len(df)} righe)")
+    return percorso
+
+def salva_dataset(df: pd.DataFrame, cartella: str, partizioni: list = None, compressione: str = "zstd",
+                  sostituisci_partizioni: bool = False):
+    """
+    Salva un DataFrame in un dataset Parquet partizionato (una cartella per combinazione di partizioni),
+    con un file per squadra in ogni partizione (salva_frammento_dataset). Vengono sostituiti solo i file
+    delle squadre presenti in `df`; con `sostituisci_partizioni` anche gli altri file delle partizioni
+    presenti in `df` vengono rimossi (ricostruzione completa, es. da consolida_csv).
+
+    Args:
+        df (pd.DataFrame): Il DataFrame da salvare.
+        cartella (str): La cartella radice del dataset.
+        partizioni (list, optional): Colonne di partizionamento. Defaults to PARTIZIONI_DATASET.
+        compressione (str, optional): Codec di compressione. Defaults to "zstd".
+        sostituisci_partizioni (bool, optional): Rimuove i file delle partizioni non riscritti. Defaults to False.
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        logging.error("pyarrow non installato: impossibile salvare il dataset Parquet")
+        return
+    partizioni = partizioni or PARTIZIONI_DATASET
+    try:
+        chiavi = partizioni + (["squadra"] if "squadra" in df.columns else [])
+        scritti = set()
+        for valori, gruppo in df.groupby([df[c].astype(str) for c in chiavi], sort=False):
+            nome = valori[-1] if "squadra" in df.columns else "part-0"
+            scritti.add(salva_frammento_dataset(gruppo, cartella, nome, partizioni, compressione))
+        if sostituisci_partizioni:
+            for cartella_partizione in {os.path.dirname(percorso) for percorso in scritti}:
+                for nome in os.listdir(cartella_partizione):
+                    percorso = os.path.join(cartella_partizione, nome)
+                    if nome.endswith(".parquet") and percorso not in scritti:
+                        os.remove(percorso)
+        logging.info(f"Dataset salvato in {cartella} ({len(df)} righe)")
+    except Exception as e:
+        logging.error(f"Errore nel salvataggio del dataset: {e}")
+
+def carica_dataset(cartella: str, colonne: list = None, filtri: list = None) -> pd.DataFrame:
+    """
+    Legge un dataset Parquet partizionato leggendo solo le colonne e le partizioni richieste.
+
+    Args:
+        cartella (str): La cartella radice del dataset.
+        colonne (list, optional): Colonne da leggere (proiezione). Defaults to None (tutte).
+        filtri (list, optional): Filtri nel formato di pyarrow, es. [("campionato", "==", "serie a")].
+            I filtri sulle colonne di partizione evitano di aprire le altre cartelle. Defaults to None.
+
+    Returns:
+        pd.DataFrame: Le righe che soddisfano i filtri.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    # Le partizioni restano stringhe (es. stagione "2024") come nei CSV
+    partizionamento = ds.partitioning(pa.schema([(p, pa.string()) for p in PARTIZIONI_DATASET]), flavor="hive")
+    dataset = ds.dataset(cartella, format="parquet", partitioning=partizionamento)
+    filtro = pq.filters_to_expression(filtri) if filtri else None
+    return dataset.to_table(columns=colonne, filter=filtro).to_pandas()
+
+def consolida_csv(cartella_raw: str = "data/raw", nome_file: str = "informazioni_giocatori", squadre: list = None) -> pd.DataFrame:
+    """
+    Raccoglie in un unico DataFrame i file per squadra di data/raw/<campionato>/<stagione>/<squadra>/,
+    aggiungendo le colonne campionato, stagione e squadra. Utile per costruire il dataset da run precedenti.
+
+    Args:
+        cartella_raw (str, optional): La cartella radice dei CSV. Defaults to "data/raw".
+        nome_file (str, optional): Il nome dei file (senza estensione). Defaults to "informazioni_giocatori".
+        squadre (list, optional): Tuple (campionato, stagione, squadra) da leggere, invece di tutte. Defaults to None.
+
+    Returns:
+        pd.DataFrame: Tutte le righe trovate.
+    """
+    if squadre is None:
+        squadre = []
+        for campionato in sorted(os.listdir(cartella_raw)) if os.path.isdir(cartella_raw) else []:
+            for stagione in sorted(os.listdir(os.path.join(cartella_raw, campionato))):
+                cartella_stagione = os.path.join(cartella_raw, campionato, stagione)
+                if os.path.isdir(cartella_stagione):
+                    squadre.extend((campionato, stagione, squadra) for squadra in sorted(os.listdir(cartella_stagione)))
+    frames = []
+    for campionato, stagione, squadra in squadre:
+        percorso = os.path.join(cartella_raw, campionato, stagione, squadra, f"{nome_file}.csv")
+        if not os.path.isfile(percorso):
+            continue
+        frame = pd.read_csv(percorso, dtype=str)
+        for colonna in COLONNE_LISTA:
+            if colonna in frame.columns:
+                frame[colonna] = frame[colonna].map(_da_lista)
+        frame.insert(0, "squadra", squadra)
+        frame.insert(0, "stagione", stagione)
+        frame.insert(0, "campionato", campionato)
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
@@ -1,5 +1,70 @@
+import importlib.util
+import logging
 import re
-from bs4 import BeautifulSoup, Tag, NavigableString
+from bs4 import BeautifulSoup, SoupStrainer, Tag, NavigableString
+
+# Parser backends for BeautifulSoup, fastest first; html.parser is always available
+PARSER_BACKENDS = ["lxml", "html.parser"]
+
+def available_parser(preferred: str = None) -> str:
+    """
+    Returns the fastest installed BeautifulSoup parser backend.
+
+    Args:
+        preferred (str, optional): A backend to use if installed (e.g. "lxml"). Defaults to None.
+
+    Returns:
+        str: The backend name, "html.parser" if no faster one is installed.
+    """
+    for backend in ([preferred] if preferred else []) + PARSER_BACKENDS:
+        if backend == "html.parser" or importlib.util.find_spec(backend) is not None:
+            return backend
+    return "html.parser"
+
+def class_pattern(*classes: str) -> re.Pattern:
+    """
+    Builds a regex matching an element that has any of `classes` among its classes.
+
+    Unlike a plain class name it also works inside a SoupStrainer, where the
+    class attribute is still the raw space-separated string.
+
+    Args:
+        *classes (str): The class names to match.
+
+    Returns:
+        re.Pattern: The compiled pattern.
+    """
+    alternatives = "|".join(re.escape(c) for c in classes)
+    return re.compile(rf"(?:^|\s)(?:{alternatives})(?:\s|$)")
+
+# Restricted parsing: the only subtrees each page type needs to be built
+PARSE_ONLY = {
+    "competizione": SoupStrainer("table", class_=class_pattern("items")),
+    "squadra": SoupStrainer("table", class_=class_pattern("items")),
+    "giocatore": SoupStrainer(class_=class_pattern(
+        "data-header__headline-wrapper", "info-table", "detail-position__box", "current-and-max"
+    )),
+}
+
+def release_soup(soup: BeautifulSoup):
+    """
+    Tears down a parse tree once its data has been extracted.
+
+    A BeautifulSoup tree is a web of reference cycles (parent, next_element, ...),
+    so dropping the last reference does not free it: it waits for a full run of the
+    cyclic garbage collector, and with many pages parsed in parallel those trees
+    pile up. Decomposing the top-level elements and then the soup itself breaks the
+    cycles, so the memory is returned as soon as the call ends. The soup must not be
+    used afterwards; values already extracted as plain strings are unaffected.
+
+    Args:
+        soup (BeautifulSoup): The parsed page, or None.
+    """
+    if soup is None:
+        return
+    for element in list(soup.contents):
+        element.decompose()
+    soup.decompose()
 
 def find_table(soup: BeautifulSoup, table_class: str = "items") -> Tag:
     """
@@ -15,13 +80,13 @@ def find_table(soup: BeautifulSoup, table_class: str = "items") -> Tag:
     try:
         table = soup.find("table", class_=table_class)
         if table:
-            print(f"Found table with class '{table_class}'.")
+            logging.debug(f"Found table with class '{table_class}'.")
             return table
         else:
-            print(f"No table found with class '{table_class}'.")
+            logging.warning(f"No table found with class '{table_class}'.")
             return None
     except Exception as e:
-        print(f"Error finding table with class '{table_class}': {e}")
+        logging.error(f"Error finding table with class '{table_class}': {e}")
         return None
 
 def extract_links_from_table(table: Tag, exclude_class: str = "bg_blau_20", 
@@ -41,11 +106,11 @@ def extract_links_from_table(table: Tag, exclude_class: str = "bg_blau_20",
     try:
         tbody = table.find("tbody")
         if not tbody:
-            print("Table body <tbody> not found.")
+            logging.warning("Table body <tbody> not found.")
             return data
 
         rows = tbody.find_all("tr", class_=lambda x: x != exclude_class)
-        print(f"Found {len(rows)} rows excluding class '{exclude_class}'.")
+        logging.debug(f"Found {len(rows)} rows excluding class '{exclude_class}'.")
 
         for row in rows:
             td = row.find("td", class_=td_class.split()[0])  # Assuming first class is unique
@@ -56,9 +121,9 @@ def extract_links_from_table(table: Tag, exclude_class: str = "bg_blau_20",
                     link = a_tag['href']
 
                     data.append({"name": name, "link": link})
-                    print(f"Extracted: Name='{name}', Link='{link}'")
+                    logging.debug(f"Extracted: Name='{name}', Link='{link}'")
     except Exception as e:
-        print(f"Error extracting links from table: {e}")
+        logging.error(f"Error extracting links from table: {e}")
     return data
 
 def make_absolute_url(base_url: str, relative_url: str) -> str:
@@ -76,6 +141,49 @@ def make_absolute_url(base_url: str, relative_url: str) -> str:
         return relative_url
     return f"{base_url}{relative_url}"
 
+def competition_season_url(competition_url: str, season: str) -> str:
+    """
+    Returns the URL of a competition page for a given season.
+
+    Args:
+        competition_url (str): The competition URL, e.g. ".../serie-a/startseite/wettbewerb/IT1".
+        season (str): The starting year of the season, e.g. "2024" for 2024/25.
+
+    Returns:
+        str: The season URL, e.g. ".../serie-a/startseite/wettbewerb/IT1/plus/?saison_id=2024".
+    """
+    url = competition_url.split("?")[0].rstrip("/")
+    if url.endswith("/plus"):
+        url = url[: -len("/plus")]
+    return f"{url}/plus/?saison_id={season}"
+
+def team_season_url(team_url: str, season: str) -> str:
+    """
+    Returns the URL of a team page for a given season, replacing any season already in the URL.
+
+    Args:
+        team_url (str): The team URL, e.g. ".../startseite/verein/5" or ".../startseite/verein/5/saison_id/2023".
+        season (str): The starting year of the season.
+
+    Returns:
+        str: The season URL, e.g. ".../startseite/verein/5/saison_id/2024".
+    """
+    url = re.sub(r"/saison_id/[^/]*", "", team_url.rstrip("/"))
+    return f"{url}/saison_id/{season}"
+
+def player_id(player_url: str) -> str:
+    """
+    Returns the transfermarkt player id (the number after /spieler/) of a player URL, or None.
+
+    Args:
+        player_url (str): A player URL, e.g. ".../cristiano-ronaldo/profil/spieler/8198".
+
+    Returns:
+        str: The id, e.g. "8198"; the same for every slug, season and page type of the player.
+    """
+    match = re.search(r"/spieler/(\d+)", player_url or "")
+    return match.group(1) if match else None
+
 def find_label_content(soup: BeautifulSoup, label_regex: str, content_class: str = "info-table__content--bold") -> str:
     """
     Finds the content corresponding to a label using regex.
@@ -95,9 +203,91 @@ def find_label_content(soup: BeautifulSoup, label_regex: str, content_class: str
             if content:
                 return content.get_text(strip=True)
     except Exception as e:
-        print(f"Error finding label '{label_regex}': {e}")
+        logging.error(f"Error finding label '{label_regex}': {e}")
     return None
 
+# Declarative extraction spec: (field, label regex) for the labelled rows of a player page.
+# Each spec is compiled once into a single alternation whose group names are the fields.
+INFO_TABLE_SPEC = [
+    ("nato_il", r"Nato il:"),
+    ("luogo_nascita", r"Luogo di nascita:"),
+    ("altezza", r"Altezza:"),
+    ("nazionalita", r"Nazionalità:"),
+    ("posizione", r"Posizione:"),
+    ("piede", r"Piede:"),
+    ("squadra_attuale", r"Squadra attuale:"),
+    ("in_rosa_da", r"In rosa da:"),
+    ("scadenza", r"Scadenza:"),
+]
+DETAIL_POSITION_SPEC = [
+    ("ruolo_naturale", r"Ruolo naturale:"),
+]
+
+def compile_label_spec(spec: list) -> re.Pattern:
+    """
+    Compiles a (field, label regex) spec into one case-insensitive pattern with a named group per field.
+
+    Args:
+        spec (list): List of (field, label_regex) tuples.
+
+    Returns:
+        re.Pattern: The compiled pattern; `match.lastgroup` is the matched field.
+    """
+    return re.compile("|".join(f"(?P<{field}>{label})" for field, label in spec), re.I)
+
+INFO_TABLE_LABELS = compile_label_spec(INFO_TABLE_SPEC)
+DETAIL_POSITION_LABELS = compile_label_spec(DETAIL_POSITION_SPEC)
+ALTRO_RUOLO_LABEL = re.compile(r"Altro ruolo:", re.I)
+CURRENT_AND_MAX_CLASS = re.compile(r"\bcurrent-and-max\b")
+CURRENT_VALUE_CLASS = re.compile(r"\bcurrent-value\b")
+MAX_CLASS = re.compile(r"\bmax\b")
+MAX_VALUE_CLASS = re.compile(r"\bmax-value\b")
+
+def build_label_index(container: Tag, label_pattern: re.Pattern, content_class: str = "info-table__content--bold") -> dict:
+    """
+    Maps each field of a compiled label spec to its content span in a single traversal of the container.
+
+    Only the first occurrence of each label is kept, like find_label_content.
+
+    Args:
+        container (Tag): The BeautifulSoup Tag object holding the label/content spans.
+        label_pattern (re.Pattern): A pattern built with compile_label_spec.
+        content_class (str, optional): The class of the content span. Defaults to "info-table__content--bold".
+
+    Returns:
+        dict: A dictionary field -> content Tag.
+    """
+    index = {}
+    try:
+        for span in container.find_all("span"):
+            text = span.string
+            if not text:
+                continue
+            match = label_pattern.search(text)
+            if match and match.lastgroup not in index:
+                content = span.find_next_sibling("span", class_=content_class)
+                if content:
+                    index[match.lastgroup] = content
+    except Exception as e:
+        logging.error(f"Error building label index: {e}")
+    return index
+
+def label_text(index: dict, field: str) -> str:
+    """
+    Returns the stripped text of an indexed content span, or None if the field is missing.
+
+    Args:
+        index (dict): A dictionary built by build_label_index.
+        field (str): The field to look up.
+
+    Returns:
+        str: The text content or None if not found.
+    """
+    content = index.get(field)
+    if content is None:
+        return None
+    return content.get_text(strip=True) or None
+
 def parse_player_name(header: Tag) -> dict:
     """
     Parses the player's first name and last name from the header.
@@ -119,7 +309,7 @@ def parse_player_name(header: Tag) -> dict:
             elif child.name == "strong":
                 cognome = child.get_text(strip=True)
     except Exception as e:
-        print(f"Error parsing player name: {e}")
+        logging.error(f"Error parsing player name: {e}")
     return {"nome": nome, "cognome": cognome}
 
 def extract_nationalities(nazionalita_span: Tag) -> list:
@@ -136,7 +326,7 @@ def extract_nationalities(nazionalita_span: Tag) -> list:
     try:
         nazionalita = [img["title"] for img in nazionalita_span.find_all("img", alt=True)]
     except Exception as e:
-        print(f"Error extracting nationalities: {e}")
+        logging.error(f"Error extracting nationalities: {e}")
     return nazionalita
 
 def extract_altri_ruoli(detail_position: Tag) -> list:
@@ -151,13 +341,13 @@ def extract_altri_ruoli(detail_position: Tag) -> list:
     """
     altri_ruoli = []
     try:
-        altri_ruoli_label = detail_position.find("dt", text=re.compile(r"Altro ruolo:", re.I))
+        altri_ruoli_label = detail_position.find("dt", string=ALTRO_RUOLO_LABEL)
         if altri_ruoli_label:
             altri_ruoli_dds = altri_ruoli_label.find_next_siblings("dd")
             if altri_ruoli_dds:
                 altri_ruoli = [dd.get_text(strip=True) for dd in altri_ruoli_dds]
     except Exception as e:
-        print(f"Error extracting other roles: {e}")
+        logging.error(f"Error extracting other roles: {e}")
     return altri_ruoli
 
 def extract_player_details_from_header(header: Tag) -> dict:
@@ -180,23 +370,24 @@ def extract_player_details_from_header(header: Tag) -> dict:
         name_parts = parse_player_name(header)
         details.update(name_parts)
     except Exception as e:
-        print(f"Error extracting player details from header: {e}")
+        logging.error(f"Error extracting player details from header: {e}")
     return details
 
-def extract_value_from_div(valore_div: Tag, value_class: str, fallback: bool = False) -> str:
+def extract_value_from_div(valore_div: Tag, value_class: re.Pattern, fallback: bool = False) -> str:
     """
     Extracts a value from a div based on the provided class.
 
     Args:
         valore_div (Tag): The BeautifulSoup Tag object representing the value div.
-        value_class (str): The class to search for within the div.
+        value_class (re.Pattern): The compiled class pattern to search for within the div
+            (e.g. CURRENT_VALUE_CLASS or MAX_VALUE_CLASS).
         fallback (bool, optional): If True, applies fallback logic. Defaults to False.
 
     Returns:
         str: The extracted value or None if not found.
     """
     try:
-        value_tag = valore_div.find("div", class_=re.compile(value_class))
+        value_tag = valore_div.find("div", class_=value_class)
         if value_tag:
             a_tag = value_tag.find("a")
             if a_tag:
@@ -204,5 +395,138 @@ def extract_value_from_div(valore_div: Tag, value_class: str, fallback: bool = F
             else:
                 return value_tag.get_text(strip=True)
     except Exception as e:
-        print(f"Error extracting value with class '{value_class}': {e}")
+        logging.error(f"Error extracting value with class '{value_class.pattern}': {e}")
     return None
+
+# Macro area (come riportata in "Posizione:" sul profilo) di ciascun ruolo della rosa
+MACRO_RUOLI = {
+    "Portiere": "Portiere",
+    "Difensore centrale": "Difesa",
+    "Terzino sinistro": "Difesa",
+    "Terzino destro": "Difesa",
+    "Difesa": "Difesa",
+    "Mediano": "Centrocampo",
+    "Centrale": "Centrocampo",
+    "Trequartista": "Centrocampo",
+    "Esterno sinistro": "Centrocampo",
+    "Esterno destro": "Centrocampo",
+    "Centrocampo": "Centrocampo",
+    "Ala sinistra": "Attacco",
+    "Ala destra": "Attacco",
+    "Seconda punta": "Attacco",
+    "Punta centrale": "Attacco",
+    "Attacco": "Attacco",
+}
+
+# Intestazioni delle colonne della rosa dettagliata (plus/1) e relativo campo
+SQUAD_HEADERS = [
+    (re.compile(r"^#$"), "numero_maglia"),
+    (re.compile(r"Giocatore", re.I), "giocatore"),
+    (re.compile(r"Nato il|Età", re.I), "nato_il"),
+    (re.compile(r"Naz", re.I), "nazionalità"),
+    (re.compile(r"Altezza", re.I), "altezza"),
+    (re.compile(r"Piede", re.I), "piede"),
+    (re.compile(r"In rosa da", re.I), "in_rosa_da"),
+    (re.compile(r"Contratto|Scadenza", re.I), "scadenza"),
+    (re.compile(r"Valore", re.I), "valore_attuale"),
+]
+
+def detailed_squad_url(team_url: str) -> str:
+    """
+    Converts a team URL into the URL of its detailed roster view ("kader" page with /plus/1).
+
+    Args:
+        team_url (str): The team URL, e.g. ".../startseite/verein/5/saison_id/2024".
+
+    Returns:
+        str: The detailed roster URL, e.g. ".../kader/verein/5/saison_id/2024/plus/1".
+    """
+    url = team_url.rstrip("/").replace("/startseite/verein/", "/kader/verein/")
+    if not url.endswith("/plus/1"):
+        url = f"{url}/plus/1"
+    return url
+
+def split_player_name(full_name: str) -> dict:
+    """
+    Splits a roster name into first name and last name the way the profile header does
+    (single-word names are treated as last names).
+
+    Args:
+        full_name (str): The full name as shown in the roster.
+
+    Returns:
+        dict: A dictionary with 'nome' and 'cognome' keys.
+    """
+    parts = full_name.split(" ", 1)
+    if len(parts) == 1:
+        return {"nome": "", "cognome": parts[0]}
+    return {"nome": parts[0], "cognome": parts[1]}
+
+def extract_squad_from_table(table: Tag) -> list:
+    """
+    Extracts one record per player from the detailed roster table.
+
+    Columns are located through the table header, so the extra columns shown for
+    past seasons are skipped. Fields not shown in the roster are left out of the records.
+
+    Args:
+        table (Tag): The BeautifulSoup Tag object representing the roster table.
+
+    Returns:
+        list: A list of dictionaries with 'name', 'link' and the player detail fields found.
+    """
+    squad = []
+    try:
+        thead = table.find("thead")
+        tbody = table.find("tbody")
+        if not thead or not tbody:
+            logging.warning("Roster table header or body not found.")
+            return squad
+
+        # Mappa posizione della colonna -> campo, tenendo conto dei colspan
+        columns = []
+        for th in thead.find_all("th"):
+            label = th.get_text(strip=True)
+            field = next((f for pattern, f in SQUAD_HEADERS if pattern.search(label)), None)
+            columns.extend([field] * int(th.get("colspan", 1)))
+
+        for row in tbody.find_all("tr", recursive=False):
+            cells = row.find_all("td", recursive=False)
+            if len(cells) != len(columns):
+                continue
+            record = {}
+            for field, cell in zip(columns, cells):
+                if field == "giocatore":
+                    a_tag = cell.select_one("td.hauptlink a[href]") or cell.find("a", href=True)
+                    if not a_tag:
+                        break
+                    record["name"] = a_tag.get_text(strip=True)
+                    record["link"] = a_tag["href"]
+                    record.update(split_player_name(record["name"]))
+                    inline_rows = cell.find_all("tr")
+                    if len(inline_rows) > 1:
+                        ruolo = inline_rows[-1].get_text(strip=True)
+                        record["ruolo_naturale"] = ruolo
+                        macro = MACRO_RUOLI.get(ruolo)
+                        if macro:
+                            record["posizione"] = ruolo if macro == ruolo else f"{macro} - {ruolo}"
+                elif field == "nazionalità":
+                    record["nazionalità"] = [img["title"] for img in cell.find_all("img", title=True)]
+                elif field == "nato_il":
+                    text = cell.get_text(strip=True)
+                    if "(" in text and ")" in text:
+                        data_nascita, età = text.split("(")
+                        record["data_nascita"] = data_nascita.strip()
+                        record["età"] = età.strip(")")
+                elif field:
+                    text = cell.get_text(" ", strip=True).replace("\xa0", " ")
+                    if field == "altezza":
+                        text = text.replace("m", "").strip()
+                    if text and text != "-":
+                        record[field] = text
+            if "link" in record:
+                squad.append(record)
+        logging.debug(f"Extracted {len(squad)} players from the detailed roster.")
+    except Exception as e:
+        logging.error(f"Error extracting squad from table: {e}")
+    return squad
@@ -0,0 +1,16 @@
+def seasons_with_backfill(seasons: list, backfill: int) -> list:
+    """
+    Adds the `backfill` seasons preceding the oldest of `seasons`, most recent first.
+
+    Args:
+        seasons (list): Seasons as starting years, e.g. ["2024"].
+        backfill (int): Number of earlier seasons to add.
+
+    Returns:
+        list: E.g. ["2024", "2023", "2022"] for (["2024"], 2).
+    """
+    result = sorted(set(str(s) for s in seasons), reverse=True)
+    if backfill and result:
+        oldest = int(result[-1])
+        result += [str(oldest - i) for i in range(1, backfill + 1)]
+    return result
@@ -0,0 +1,52 @@
+import collections
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def mappa_limitata(funzione, elementi, max_in_corso: int = 8, ordinato: bool = True, executor: ThreadPoolExecutor = None):
+    """
+    Lazily applies `funzione` to the items of an iterable in a thread pool and yields
+    (elemento, risultato) pairs as soon as they are available.
+
+    Unlike executor.map or a dict of futures built up front, at most `max_in_corso`
+    calls are in flight: the next item is taken from `elementi` only when a result
+    has been consumed, so `elementi` can itself be a lazy generator (e.g. rosters
+    fetched one team at a time) and memory stays bounded however long it is.
+    If the consumer stops early, the calls not yet started are cancelled.
+
+    Args:
+        funzione (callable): Called as funzione(elemento) in a worker thread. Exceptions are re-raised
+            to the consumer when the pair of their item is due.
+        elementi (iterable): The items, consumed lazily.
+        max_in_corso (int, optional): Maximum number of calls in flight. Defaults to 8.
+        ordinato (bool, optional): Yield in input order (True) or in completion order (False). Defaults to True.
+        executor (ThreadPoolExecutor, optional): Pool to submit to. Defaults to a private pool of `max_in_corso` threads.
+    """
+    proprio = executor is None
+    executor = executor or ThreadPoolExecutor(max_workers=max_in_corso, thread_name_prefix="stream")
+    elementi = iter(elementi)
+    in_corso = collections.OrderedDict()  # future -> elemento, nell'ordine di invio
+
+    def riempi():
+        while len(in_corso) < max_in_corso:
+            try:
+                elemento = next(elementi)
+            except StopIteration:
+                return
+            in_corso[executor.submit(funzione, elemento)] = elemento
+
+    try:
+        riempi()
+        while in_corso:
+            if ordinato:
+                future = next(iter(in_corso))
+            else:
+                future = next(iter(wait(in_corso, return_when=FIRST_COMPLETED).done))
+            elemento = in_corso.pop(future)
+            risultato = future.result()
+            riempi()
+            yield elemento, risultato
+    finally:
+        for future in in_corso:
+            future.cancel()
+        if proprio:
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,324 @@
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+# Stati dei lavori nella coda
+STATO_IN_CODA = "in_coda"
+STATO_IN_CORSO = "in_corso"
+STATO_FATTO = "fatto"
+STATO_FALLITO = "fallito"
+
+Lavoro = namedtuple("Lavoro", ["id", "tipo", "chiave", "dati", "tentativi", "genitore"])
+
+
+def _json(dati):
+    return json.dumps(dati, ensure_ascii=False, default=str) if dati is not None else None
+
+
+class WorkQueue:
+    """
+    File-backed work queue with leases, shared by any number of worker processes.
+
+    Each item has a type, a unique key (adding an existing key is a no-op, so
+    filling the queue of an interrupted run again resumes it) and JSON data.
+    A worker claims an item with `prendi`, which leases it for `visibilita`
+    seconds, and then acknowledges it with `completa` or `fallisci`. An item whose
+    lease expires (the worker crashed or was killed) becomes claimable again; an
+    item claimed `max_tentativi` times without success is marked STATO_FALLITO.
+
+    Items can have children (e.g. the players of a team): `completa` adds them in
+    the same transaction as the acknowledgement, and when the last child of an
+    item added with `al_completamento` is finished, a follow-up item of that type
+    is queued for it (e.g. writing the team file with the results of its players,
+    which `risultati` returns).
+
+    Every operation is a short SQLite transaction taken with BEGIN IMMEDIATE, so
+    processes on the same machine, or on several machines sharing the file, never
+    claim the same item twice. WAL is faster but needs shared memory, so it is
+    only usable when every worker runs on the same machine (`wal=False` for a file
+    on a network share).
+    """
+
+    def __init__(self, percorso: str = "data/coda.sqlite", visibilita: float = 120, max_tentativi: int = 3, wal: bool = True):
+        """
+        Args:
+            percorso (str, optional): Path of the SQLite file. Defaults to "data/coda.sqlite".
+            visibilita (float, optional): Seconds an item stays leased to the worker that claimed it. Defaults to 120.
+            max_tentativi (int, optional): Claims of an item before it is marked as failed. Defaults to 3.
+            wal (bool, optional): Use the WAL journal (all workers on one machine). Defaults to True.
+        """
+        os.makedirs(os.path.dirname(percorso) or ".", exist_ok=True)
+        self.visibilita = visibilita
+        self.max_tentativi = max_tentativi
+        self._lock = threading.Lock()
+        # Le transazioni sono esplicite (BEGIN IMMEDIATE); timeout lungo perché più processi scrivono sullo stesso file
+        self._db = sqlite3.connect(percorso, timeout=60, isolation_level=None, check_same_thread=False)
+        self._db.executescript(
+            f"""
+            PRAGMA journal_mode = {"WAL" if wal else "DELETE"};
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS lavori (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tipo TEXT NOT NULL,
+                chiave TEXT NOT NULL UNIQUE,
+                dati TEXT,
+                priorita INTEGER NOT NULL DEFAULT 0,
+                stato TEXT NOT NULL,
+                tentativi INTEGER NOT NULL DEFAULT 0,
+                disponibile_dal REAL NOT NULL,
+                lease_scade REAL,
+                worker TEXT,
+                genitore TEXT,
+                al_completamento TEXT,
+                risultato TEXT,
+                errore TEXT,
+                aggiornato_il REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS lavori_disponibili ON lavori (stato, priorita, disponibile_dal);
+            CREATE INDEX IF NOT EXISTS lavori_genitore ON lavori (genitore, stato);
+            CREATE TABLE IF NOT EXISTS parametri (
+                nome TEXT PRIMARY KEY,
+                valore TEXT
+            );
+            CREATE TABLE IF NOT EXISTS condivisi (
+                chiave TEXT PRIMARY KEY,
+                valore TEXT
+            );
+            """
+        )
+
+    def aggiungi(self, tipo: str, chiave: str, dati=None, priorita: int = 0, al_completamento: str = None) -> bool:
+        """
+        Queues an item, unless an item with the same key exists. Returns True if it was added.
+
+        Args:
+            tipo (str): Item type, e.g. 'competizione'.
+            chiave (str): Unique key, e.g. the page URL.
+            dati (optional): JSON-serializable data needed to process the item.
+            priorita (int, optional): Lower values are claimed first. Defaults to 0.
+            al_completamento (str, optional): Type of the follow-up item queued when all the children are finished.
+        """
+        with self._transazione():
+            return self._inserisci(tipo, chiave, dati, priorita, al_completamento=al_completamento)
+
+    def prendi(self, worker: str) -> Lavoro:
+        """
+        Claims the next available item (queued, or with an expired lease) for `worker`.
+        Returns a Lavoro, or None if nothing can be claimed right now.
+        """
+        adesso = time.time()
+        with self._transazione():
+            # Lease scaduti di lavori già presi troppe volte: il worker cade su quel lavoro, non va ripreso
+            esauriti = self._db.execute(
+                "SELECT id, genitore FROM lavori WHERE stato = ? AND lease_scade <= ? AND tentativi >= ?",
+                (STATO_IN_CORSO, adesso, self.max_tentativi),
+            ).fetchall()
+            for id_lavoro, genitore in esauriti:
+                self._db.execute(
+                    "UPDATE lavori SET stato = ?, errore = ?, aggiornato_il = ? WHERE id = ?",
+                    (STATO_FALLITO, "lease scaduto", adesso, id_lavoro),
+                )
+                if genitore:
+                    self._verifica_genitore(genitore)
+            riga = self._db.execute(
+                "SELECT id, tipo, chiave, dati, tentativi, genitore FROM lavori "
+                "WHERE (stato = ? AND disponibile_dal <= ?) OR (stato = ? AND lease_scade <= ?) "
+                "ORDER BY priorita, id LIMIT 1",
+                (STATO_IN_CODA, adesso, STATO_IN_CORSO, adesso),
+            ).fetchone()
+            if riga is None:
+                return None
+            id_lavoro, tipo, chiave, dati, tentativi, genitore = riga
+            self._db.execute(
+                "UPDATE lavori SET stato = ?, worker = ?, lease_scade = ?, tentativi = tentativi + 1, aggiornato_il = ? WHERE id = ?",
+                (STATO_IN_CORSO, worker, adesso + self.visibilita, adesso, id_lavoro),
+            )
+        return Lavoro(id_lavoro, tipo, chiave, json.loads(dati) if dati else None, tentativi + 1, genitore)
+
+    def completa(self, lavoro: Lavoro, worker: str, risultato=None, figli: list = ()) -> bool:
+        """
+        Acknowledges a claimed item, with its result and its children.
+        Returns False if the lease was lost (expired and claimed by another worker): nothing is saved.
+
+        Args:
+            lavoro (Lavoro): The item returned by prendi.
+            worker (str): The worker that claimed it.
+            risultato (optional): JSON-serializable result, returned by `risultati` to the follow-up of the parent.
+            figli (list, optional): Children as dicts with tipo, chiave, dati and optionally priorita and al_completamento.
+        """
+        with self._transazione():
+            if not self._possiede(lavoro, worker):
+                return False
+            for figlio in figli:
+                self._inserisci(
+                    figlio["tipo"], figlio["chiave"], figlio.get("dati"), figlio.get("priorita", 0),
+                    genitore=lavoro.chiave, al_completamento=figlio.get("al_completamento"),
+                )
+            self._db.execute(
+                "UPDATE lavori SET stato = ?, lease_scade = NULL, risultato = ?, errore = NULL, aggiornato_il = ? WHERE id = ?",
+                (STATO_FATTO, _json(risultato), time.time(), lavoro.id),
+            )
+            self._verifica_genitore(lavoro.chiave)
+            if lavoro.genitore:
+                self._verifica_genitore(lavoro.genitore)
+        return True
+
+    def fallisci(self, lavoro: Lavoro, worker: str, errore: str, attesa: float = 0) -> bool:
+        """
+        Releases a claimed item that could not be processed: it is queued again after `attesa` seconds,
+        or marked as failed if it has been claimed max_tentativi times. Returns False if the lease was lost.
+        """
+        adesso = time.time()
+        with self._transazione():
+            if not self._possiede(lavoro, worker):
+                return False
+            if lavoro.tentativi >= self.max_tentativi:
+                self._db.execute(
+                    "UPDATE lavori SET stato = ?, lease_scade = NULL, errore = ?, aggiornato_il = ? WHERE id = ?",
+                    (STATO_FALLITO, errore, adesso, lavoro.id),
+                )
+                if lavoro.genitore:
+                    self._verifica_genitore(lavoro.genitore)
+            else:
+                self._db.execute(
+                    "UPDATE lavori SET stato = ?, lease_scade = NULL, disponibile_dal = ?, errore = ?, aggiornato_il = ? WHERE id = ?",
+                    (STATO_IN_CODA, adesso + attesa, errore, adesso, lavoro.id),
+                )
+        return True
+
+    def rinnova(self, lavoro: Lavoro, worker: str) -> bool:
+        """
+        Extends the lease of a claimed item by `visibilita` seconds. Returns False if the lease was lost.
+        """
+        with self._transazione():
+            if not self._possiede(lavoro, worker):
+                return False
+            self._db.execute("UPDATE lavori SET lease_scade = ? WHERE id = ?", (time.time() + self.visibilita, lavoro.id))
+        return True
+
+    def risultati(self, genitore: str) -> list:
+        """
+        Returns (dati, risultato, stato) of the children of `genitore`, in the order they were added.
+        """
+        with self._lock:
+            righe = self._db.execute(
+                "SELECT dati, risultato, stato FROM lavori WHERE genitore = ? ORDER BY id", (genitore,)
+            ).fetchall()
+        return [(json.loads(dati) if dati else None, json.loads(risultato) if risultato else None, stato)
+                for dati, risultato, stato in righe]
+
+    def vuota(self) -> bool:
+        """
+        True when no item is queued or in progress: the run is over.
+        """
+        with self._lock:
+            riga = self._db.execute(
+                "SELECT 1 FROM lavori WHERE stato IN (?, ?) LIMIT 1", (STATO_IN_CODA, STATO_IN_CORSO)
+            ).fetchone()
+        return riga is None
+
+    def conteggi(self) -> dict:
+        """
+        Returns the number of items per (tipo, stato).
+        """
+        with self._lock:
+            righe = self._db.execute("SELECT tipo, stato, COUNT(*) FROM lavori GROUP BY tipo, stato").fetchall()
+        return {(tipo, stato): n for tipo, stato, n in righe}
+
+    def imposta_parametri(self, parametri: dict):
+        """
+        Saves the run parameters every worker has to share (e.g. the base URL of the site).
+        """
+        with self._transazione():
+            self._db.executemany(
+                "INSERT OR REPLACE INTO parametri (nome, valore) VALUES (?, ?)",
+                [(nome, _json(valore)) for nome, valore in parametri.items()],
+            )
+
+    def parametri(self) -> dict:
+        with self._lock:
+            righe = self._db.execute("SELECT nome, valore FROM parametri").fetchall()
+        return {nome: json.loads(valore) if valore is not None else None for nome, valore in righe}
+
+    def condividi(self, chiave: str, valore):
+        """
+        Stores a JSON-serializable value that every worker of the run can read with `condiviso`
+        (e.g. a player profile, so it is fetched once per run and not once per process).
+        The first value stored for a key is kept.
+        """
+        with self._transazione():
+            self._db.execute("INSERT OR IGNORE INTO condivisi (chiave, valore) VALUES (?, ?)", (chiave, _json(valore)))
+
+    def condiviso(self, chiave: str):
+        """
+        Returns the value stored with `condividi` under `chiave`, or None.
+        """
+        with self._lock:
+            riga = self._db.execute("SELECT valore FROM condivisi WHERE chiave = ?", (chiave,)).fetchone()
+        return json.loads(riga[0]) if riga and riga[0] is not None else None
+
+    def svuota(self):
+        """
+        Removes every item, parameter and shared value, to start a new run.
+        """
+        with self._transazione():
+            self._db.execute("DELETE FROM lavori")
+            self._db.execute("DELETE FROM parametri")
+            self._db.execute("DELETE FROM condivisi")
+
+    def chiudi(self):
+        with self._lock:
+            self._db.close()
+
+    @contextlib.contextmanager
+    def _transazione(self):
+        """
+        BEGIN IMMEDIATE ... COMMIT (ROLLBACK on errors) under the lock of the queue: the write lock of the
+        file is taken at the start, so two processes cannot read the same available item and both claim it.
+        """
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def _inserisci(self, tipo, chiave, dati, priorita, genitore=None, al_completamento=None) -> bool:
+        adesso = time.time()
+        cursore = self._db.execute(
+            "INSERT OR IGNORE INTO lavori (tipo, chiave, dati, priorita, stato, disponibile_dal, genitore, al_completamento, aggiornato_il) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (tipo, chiave, _json(dati), priorita, STATO_IN_CODA, adesso, genitore, al_completamento, adesso),
+        )
+        return cursore.rowcount > 0
+
+    def _possiede(self, lavoro: Lavoro, worker: str) -> bool:
+        """
+        True if the item is still leased to `worker` (same claim: the attempts have not changed).
+        """
+        riga = self._db.execute(
+            "SELECT 1 FROM lavori WHERE id = ? AND stato = ? AND worker = ? AND tentativi = ?",
+            (lavoro.id, STATO_IN_CORSO, worker, lavoro.tentativi),
+        ).fetchone()
+        return riga is not None
+
+    def _verifica_genitore(self, chiave: str):
+        """
+        Queues the follow-up of `chiave` if it is done and none of its children is queued or in progress.
+        """
+        riga = self._db.execute("SELECT stato, dati, al_completamento FROM lavori WHERE chiave = ?", (chiave,)).fetchone()
+        if riga is None or riga[0] != STATO_FATTO or not riga[2]:
+            return
+        in_sospeso = self._db.execute(
+            "SELECT 1 FROM lavori WHERE genitore = ? AND stato IN (?, ?) LIMIT 1", (chiave, STATO_IN_CODA, STATO_IN_CORSO)
+        ).fetchone()
+        if in_sospeso is None:
+            # Priorità massima: chiude il lavoro (es. scrive il file della squadra) prima di prenderne altri
+            self._inserisci(riga[2], f"{riga[2]}:{chiave}", json.loads(riga[1]) if riga[1] else None, -1, genitore=None)
+
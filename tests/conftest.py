@@ -0,0 +1,48 @@
+import pytest
+
+from benchmarks.corpus import build_corpus
+from benchmarks.server import StandInServer
+
+
+@pytest.fixture(scope="session")
+def corpus():
+    """
+    Small generated corpus with the markup of transfermarkt.it: one league, two seasons.
+    """
+    return build_corpus(2, 10, seasons=("2023", "2024"), leagues={"serie a": "IT1"})
+
+
+@pytest.fixture
+def server(corpus):
+    """
+    Local stand-in of the site serving `corpus`, so no test touches the live site.
+    """
+    with StandInServer(dict(corpus)) as server:
+        yield server
+
+
+@pytest.fixture
+def profili(corpus):
+    """
+    Paths of the player profiles of `corpus`.
+    """
+    return sorted(percorso for percorso in corpus if "/profil/spieler/" in percorso)
+
+
+@pytest.fixture
+def crea_scraper(server):
+    """
+    Factory of TransfermarktScrapers on the stand-in, without rate limit and with short retries
+    unless overridden by the keyword arguments.
+    """
+    from src.scraping.scraper import TransfermarktScraper
+    from src.utils.rate_limiter import TokenBucket
+
+    def crea(**opzioni):
+        opzioni = {
+            "base_url": server.base_url, "rate_limiter": TokenBucket(rate=float("inf")),
+            "backoff_base": 0.01, "backoff_max": 0.05, **opzioni,
+        }
+        return TransfermarktScraper(**opzioni)
+
+    return crea
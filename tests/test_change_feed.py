@@ -0,0 +1,128 @@
+import json
+import sqlite3
+
+from benchmarks.corpus import competition_urls
+from src.processing.pipeline import ScrapingPipeline
+from src.utils.change_feed import TIPO_MODIFICATO, TIPO_NUOVO, TIPO_RIMOSSO, ChangeFeed, record_canonico
+from src.utils.manifest import hash_contenuto
+
+STAGIONI = ["2023", "2024"]
+
+
+def _run(crea_scraper, campionati, tmp_path, run):
+    modifiche = ChangeFeed(str(tmp_path / "modifiche.sqlite"), str(tmp_path / "delta"), run=run)
+    ScrapingPipeline(crea_scraper(), workers_dettagli=4, modifiche=modifiche).esegui(campionati, STAGIONI)
+    conteggi = modifiche.chiudi_run()
+    return modifiche, conteggi
+
+
+def test_second_run_reports_only_the_changed_player(server, crea_scraper, profili, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    campionati = competition_urls(server.base_url, {"serie a": "IT1"})
+    modifiche, conteggi = _run(crea_scraper, campionati, tmp_path, "20240101T000000000000")
+    assert conteggi == {TIPO_NUOVO: 10 * 2 * len(STAGIONI)}
+    modifiche.chiudi()
+
+    # Cambia il valore di mercato di un giocatore sul sito
+    percorso = profili[0]
+    vecchio = crea_scraper().scrape_player_details(server.base_url + percorso)["valore_attuale"]
+    pagina = server.pages[percorso]
+    inizio = pagina.index(">", pagina.index('<div class="current-value"><a')) + 1
+    server.pages[percorso] = pagina[:inizio] + "€ 1,00 mln" + pagina[pagina.index("</a>", inizio):]
+
+    modifiche, conteggi = _run(crea_scraper, campionati, tmp_path, "20240102T000000000000")
+    eventi = modifiche.modifiche()
+    assert conteggi[TIPO_MODIFICATO] == len(eventi) >= 1
+    id_giocatore = percorso.rsplit("/", 1)[-1]
+    assert {evento["id_giocatore"] for evento in eventi} == {id_giocatore}
+    assert all(evento["campi"] == {"valore_attuale": [vecchio, "€ 1,00 mln"]} for evento in eventi)
+    assert modifiche.giocatori_modificati() == {id_giocatore}
+    with open(modifiche.percorso_feed, encoding="utf-8") as f:
+        assert [json.loads(riga) for riga in f] == [{k: v for k, v in e.items() if k != "seq"} for e in eventi]
+    modifiche.chiudi()
+
+
+def test_removed_and_transferred_players(tmp_path):
+    modifiche = ChangeFeed(str(tmp_path / "modifiche.sqlite"), cartella_feed=None, run="1")
+    milan = {"campionato": "serie a", "stagione": "2024", "squadra": "Milan"}
+    inter = {"campionato": "serie a", "stagione": "2024", "squadra": "Inter"}
+    modifiche.registra_squadra(milan, [{"id_giocatore": "1", "nome": "Theo"}, {"id_giocatore": "2", "nome": "Rafael"}])
+    modifiche.registra_squadra(inter, [{"id_giocatore": "3", "nome": "Nicolò"}])
+    modifiche.chiudi_run()
+    modifiche.chiudi()
+
+    # Nel run successivo il giocatore 2 passa all'Inter e il giocatore 3 lascia la squadra
+    modifiche = ChangeFeed(str(tmp_path / "modifiche.sqlite"), cartella_feed=None, run="2")
+    modifiche.registra_squadra(milan, [{"id_giocatore": "1", "nome": "Theo"}])
+    modifiche.registra_squadra(inter, [{"id_giocatore": "2", "nome": "Rafael"}])
+    assert modifiche.chiudi_run() == {TIPO_MODIFICATO: 1, TIPO_RIMOSSO: 1}
+    eventi = {evento["id_giocatore"]: evento for evento in modifiche.modifiche()}
+    assert eventi["2"]["tipo"] == TIPO_MODIFICATO
+    assert eventi["2"]["campi"] == {"squadra": ["Milan", "Inter"]}
+    assert eventi["3"]["tipo"] == TIPO_RIMOSSO
+    assert modifiche.giocatori_modificati() == {"2", "3"}
+    assert modifiche.giocatori_modificati("1") == {"1", "2", "3"}
+    modifiche.chiudi()
+
+
+def test_same_team_name_in_two_leagues_is_kept_apart(tmp_path):
+    modifiche = ChangeFeed(str(tmp_path / "modifiche.sqlite"), cartella_feed=None, run="1")
+    portogallo = {"campionato": "liga portugal", "stagione": "2024", "squadra": "Sporting"}
+    spagna = {"campionato": "la liga", "stagione": "2024", "squadra": "Sporting"}
+    modifiche.registra_squadra(portogallo, [{"id_giocatore": "1", "nome": "Pedro"}])
+    modifiche.registra_squadra(spagna, [{"id_giocatore": "2", "nome": "Pablo"}])
+    modifiche.chiudi_run()
+    modifiche.chiudi()
+
+    # Solo la squadra portoghese nel run: i giocatori dell'omonima spagnola non sono rimossi
+    modifiche = ChangeFeed(str(tmp_path / "modifiche.sqlite"), cartella_feed=None, run="2")
+    assert modifiche.registra_squadra(portogallo, [{"id_giocatore": "1", "nome": "Pedro"}]) == []
+    assert modifiche.chiudi_run() == {}
+    modifiche.chiudi()
+
+
+def test_runs_are_ordered_by_time_not_by_identifier(tmp_path):
+    squadra = {"campionato": "serie a", "stagione": "2024", "squadra": "Milan"}
+    for run, giocatori in [("run-b", ["1"]), ("run-a", ["1", "2"]), ("run-0", ["1", "2"]), ("run-9", ["1", "2", "3"])]:
+        modifiche = ChangeFeed(str(tmp_path / "modifiche.sqlite"), cartella_feed=None, run=run)
+        modifiche.registra_squadra(squadra, [{"id_giocatore": g} for g in giocatori])
+        modifiche.chiudi_run()
+        modifiche.chiudi()
+
+    modifiche = ChangeFeed(str(tmp_path / "modifiche.sqlite"), cartella_feed=None)
+    # L'ultimo run è quello chiuso per ultimo, anche se il suo identificativo non è il maggiore
+    assert [evento["id_giocatore"] for evento in modifiche.modifiche()] == ["3"]
+    assert modifiche.giocatori_modificati() == {"3"}
+    assert modifiche.giocatori_modificati("run-a") == {"2", "3"}
+    # Un run senza eventi copre quelli registrati dopo la sua chiusura
+    assert modifiche.giocatori_modificati("run-0") == {"3"}
+    assert modifiche.giocatori_modificati("run-b") == {"1", "2", "3"}
+    modifiche.chiudi()
+
+
+def test_database_without_the_league_in_the_key_is_migrated(tmp_path):
+    percorso = str(tmp_path / "modifiche.sqlite")
+    db = sqlite3.connect(percorso)
+    db.executescript(
+        """
+        CREATE TABLE giocatori (
+            id_giocatore TEXT NOT NULL, stagione TEXT NOT NULL, squadra TEXT NOT NULL, campionato TEXT,
+            content_hash TEXT NOT NULL, dati TEXT NOT NULL, visto_run TEXT NOT NULL, aggiornato_il REAL NOT NULL,
+            PRIMARY KEY (id_giocatore, stagione, squadra)
+        );
+        CREATE INDEX giocatori_squadra ON giocatori (stagione, squadra);
+        """
+    )
+    squadra = {"campionato": "serie a", "stagione": "2024", "squadra": "Milan"}
+    record = record_canonico(squadra, {"id_giocatore": "1", "nome": "Theo"})
+    db.execute(
+        "INSERT INTO giocatori VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        ("1", "2024", "Milan", "serie a", hash_contenuto(record), json.dumps(record), "0", 0.0),
+    )
+    db.commit()
+    db.close()
+
+    modifiche = ChangeFeed(percorso, cartella_feed=None, run="1")
+    assert modifiche.registra_squadra(squadra, [{"id_giocatore": "1", "nome": "Theo"}]) == []
+    assert modifiche.registra_squadra(squadra, [{"id_giocatore": "1", "nome": "Théo"}])[0]["tipo"] == TIPO_MODIFICATO
+    modifiche.chiudi()
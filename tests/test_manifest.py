@@ -0,0 +1,45 @@
+from benchmarks.corpus import competition_urls
+from src.processing.pipeline import ScrapingPipeline
+from src.utils.manifest import STATO_ERRORE, STATO_OK, RunManifest
+
+STAGIONI = ["2023", "2024"]
+
+
+def _richieste_profili(server):
+    return sum(n for percorso, n in server.hits.items() if "/profil/spieler/" in percorso)
+
+
+def _esegui(crea_scraper, campionati, manifest):
+    pipeline = ScrapingPipeline(crea_scraper(), workers_dettagli=4, manifest=manifest, freschezza=3600, ritentativi=0)
+    pipeline.esegui(campionati, STAGIONI)
+    return pipeline
+
+
+def test_resumed_run_only_redoes_the_incomplete_team(server, crea_scraper, profili, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    campionati = competition_urls(server.base_url, {"serie a": "IT1"})
+    manifest = RunManifest(str(tmp_path / "manifest.sqlite"))
+
+    # Primo run interrotto: un profilo non è raggiungibile e la sua squadra resta incompleta
+    mancante = profili[0]
+    pagina = server.pages.pop(mancante)
+    _esegui(crea_scraper, campionati, manifest)
+    conteggi = manifest.conteggi()
+    assert conteggi[("squadra", STATO_ERRORE)] >= 1
+    assert conteggi[("squadra", STATO_OK)] + conteggi[("squadra", STATO_ERRORE)] == 2 * len(STAGIONI)
+
+    # Il run successivo richiede solo il profilo mancante; le squadre complete non generano richieste
+    server.pages[mancante] = pagina
+    richieste = _richieste_profili(server)
+    pipeline = _esegui(crea_scraper, campionati, manifest)
+    assert _richieste_profili(server) - richieste == 1
+    assert pipeline.squadre_invariate == conteggi[("squadra", STATO_OK)]
+    assert manifest.conteggi()[("squadra", STATO_OK)] == 2 * len(STAGIONI)
+    assert ("squadra", STATO_ERRORE) not in manifest.conteggi()
+
+    # A run completato nessuna squadra richiede più i profili
+    richieste = _richieste_profili(server)
+    pipeline = _esegui(crea_scraper, campionati, manifest)
+    assert _richieste_profili(server) == richieste
+    assert pipeline.squadre_invariate == 2 * len(STAGIONI)
+    manifest.chiudi()
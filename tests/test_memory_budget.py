@@ -0,0 +1,93 @@
+import asyncio
+import threading
+import time
+
+from benchmarks.bench_memory import misura
+from src.scraping.async_scraper import AsyncTransfermarktScraper
+from src.utils.memory_budget import MemoryBudget
+from src.utils.rate_limiter import TokenBucket
+
+WORKERS = 8
+# Picco massimo per pagina in corso con gli alberi rilasciati dopo l'estrazione
+LIMITE_PER_PAGINA_KB = 512
+
+
+def test_peak_per_in_flight_page_is_bounded(server, profili):
+    picco_kb, _ = misura(server.base_url, profili, WORKERS)
+    assert picco_kb / WORKERS < LIMITE_PER_PAGINA_KB
+
+
+def test_peak_stays_within_memory_budget(server, profili):
+    budget = MemoryBudget(1)
+    picco_kb, _ = misura(server.base_url, profili, WORKERS, budget=budget)
+    assert picco_kb * 1024 <= budget.limite
+    assert budget.in_uso == 0
+    assert budget.picco <= budget.limite
+
+
+def test_budget_waits_for_release():
+    budget = MemoryBudget(1, fattore=1)
+    pagina = budget.limite // 2 + 1
+    budget.acquire(pagina)
+    entrata = threading.Event()
+
+    def secondo():
+        budget.acquire(pagina)
+        entrata.set()
+
+    thread = threading.Thread(target=secondo)
+    thread.start()
+    assert not entrata.wait(0.1)
+    budget.release(pagina)
+    assert entrata.wait(1)
+    thread.join()
+    assert budget.attese == 1
+
+
+def test_page_larger_than_budget_passes_when_nothing_is_in_flight():
+    budget = MemoryBudget(1, fattore=1)
+    inizio = time.monotonic()
+    with budget.riserva(budget.limite * 2):
+        assert budget.in_uso == budget.limite * 2
+    assert time.monotonic() - inizio < 1
+    assert budget.in_uso == 0
+
+
+def test_async_wait_suspends_only_the_coroutine():
+    budget = MemoryBudget(1, fattore=1)
+    pagina = budget.limite // 2 + 1
+    budget.acquire(pagina)
+
+    async def scenario():
+        attesa = asyncio.create_task(budget.acquire_async(pagina))
+        # L'event loop continua a girare mentre la coroutine aspetta
+        await asyncio.sleep(0.05)
+        assert not attesa.done()
+        # Il rilascio può arrivare da un altro thread
+        threading.Thread(target=budget.release, args=(pagina,)).start()
+        return await asyncio.wait_for(attesa, 1)
+
+    assert asyncio.run(scenario()) > 0
+    assert budget.attese == 1
+    assert budget.in_uso == pagina
+
+
+def test_async_memory_wait_leaves_the_fetch_threads_free(server, profili):
+    budget = MemoryBudget(1, fattore=1)
+    budget.acquire(budget.limite)
+
+    async def scenario():
+        scraper = AsyncTransfermarktScraper(
+            base_url=server.base_url, rate_limiter=TokenBucket(rate=float("inf")), max_concurrency=1, memory_budget=budget
+        )
+        dettagli = asyncio.create_task(scraper.scrape_player_details(server.base_url + profili[0]))
+        while not budget.attese:
+            await asyncio.sleep(0.01)
+        # Il primo profilo aspetta il budget, ma l'unico thread delle richieste resta disponibile
+        assert await asyncio.wait_for(scraper.get_page(server.base_url + profili[1]), 2)
+        assert not dettagli.done()
+        budget.release(budget.limite)
+        return await asyncio.wait_for(dettagli, 2)
+
+    assert asyncio.run(scenario())["id_giocatore"] == profili[0].rsplit("/", 1)[-1]
+    assert budget.in_uso == 0
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from src.processing.normalization import normalizza_giocatori
+
+
+def test_nazionalita_principale_is_the_first_of_the_list():
+    df = normalizza_giocatori(pd.DataFrame({"nazionalità": [["Italia", "Francia"], [], None, np.array(["Brasile"])]}))
+    assert [None if pd.isna(v) else v for v in df["nazionalità_principale"]] == ["Italia", None, None, "Brasile"]
+
+
+def test_nazionalita_column_all_missing():
+    # Una squadra in cui nessun giocatore ha la nazionalità: la colonna è tutta NaN (float)
+    df = normalizza_giocatori(pd.DataFrame({"id_giocatore": ["1", "2"], "nazionalità": [np.nan, np.nan]}))
+    assert df["nazionalità_principale"].isna().all()
+    assert isinstance(df["nazionalità_principale"].dtype, pd.CategoricalDtype)
+
+
+def test_valori_altezza_e_date():
+    df = normalizza_giocatori(pd.DataFrame({
+        "valore_attuale": ["€ 45,00 mln", "€ 800 mila", "-"],
+        "altezza": ["1,85 m", None, "1,90"],
+        "data_nascita": ["12/03/2001 (23)", "", None],
+    }))
+    assert df["valore_attuale"].tolist()[:2] == [45_000_000.0, 800_000.0]
+    assert np.isnan(df["valore_attuale"].iloc[2])
+    assert df["altezza"].dtype == np.float32
+    assert df["data_nascita"].iloc[0] == pd.Timestamp(2001, 3, 12)
+    assert df["data_nascita"].iloc[1:].isna().all()
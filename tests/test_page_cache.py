@@ -0,0 +1,134 @@
+import gzip
+
+import pytest
+
+from benchmarks.server import StandInServer
+from src.utils.page_cache import CacheMissError, PageCache, tipo_pagina
+
+PROFILO = "https://www.transfermarkt.it/mario-rossi/profil/spieler/1"
+SQUADRA = "https://www.transfermarkt.it/squadra/kader/verein/1/saison_id/2024"
+
+
+def test_tipo_pagina():
+    assert tipo_pagina(PROFILO) == "giocatore"
+    assert tipo_pagina(SQUADRA) == "squadra"
+    assert tipo_pagina("https://www.transfermarkt.it/serie-a/startseite/wettbewerb/IT1") == "competizione"
+    assert tipo_pagina("https://www.transfermarkt.it/") == "altro"
+
+
+def test_ttl_per_page_type(tmp_path):
+    cache = PageCache(str(tmp_path), ttl={"giocatore": 0})
+    cache.put(PROFILO, "<html>profilo</html>", etag='"a"')
+    cache.put(SQUADRA, "<html>squadra</html>")
+    profilo, squadra = cache.get(PROFILO), cache.get(SQUADRA)
+    assert profilo.html == "<html>profilo</html>" and profilo.etag == '"a"'
+    assert not profilo.fresh
+    assert squadra.fresh
+    assert cache.get("https://www.transfermarkt.it/assente") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
+
+
+def test_identical_pages_share_one_blob(tmp_path):
+    cache = PageCache(str(tmp_path))
+    cache.put(PROFILO, "<html>uguale</html>")
+    cache.put(SQUADRA, "<html>uguale</html>")
+    assert cache._db.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 1
+    cache.close()
+
+
+def test_evicts_least_recently_used_pages(tmp_path):
+    cache = PageCache(str(tmp_path), max_bytes=10**6, flush_accessi=1000)
+    for indice in range(3):
+        cache.put(f"{PROFILO}{indice}", f"<html>{indice}</html>")
+    dimensione = cache._size // 3
+    cache.max_bytes = dimensione * 3
+    # L'accesso resta in memoria finché l'eviction non lo scrive: la pagina 0 diventa la più recente
+    cache.get(f"{PROFILO}0")
+    cache.put(f"{PROFILO}3", "<html>3</html>")
+    assert sorted(cache.urls()) == [f"{PROFILO}0", f"{PROFILO}2", f"{PROFILO}3"]
+    assert cache._size <= cache.max_bytes
+    assert cache._size == cache._db.execute("SELECT SUM(size) FROM blobs").fetchone()[0]
+    cache.close()
+
+
+def test_corrupt_blob_is_dropped_with_its_size(tmp_path):
+    cache = PageCache(str(tmp_path))
+    cache.put(PROFILO, "<html>profilo</html>")
+    cache.put(SQUADRA, "<html>squadra</html>")
+    digest = cache._db.execute("SELECT digest FROM pages WHERE url = ?", (PROFILO,)).fetchone()[0]
+    with open(cache._blob_path(digest), "wb") as f:
+        f.write(b"non gzip")
+    assert cache.get(PROFILO) is None
+    assert cache.urls() == [SQUADRA]
+    assert cache._size == cache._db.execute("SELECT SUM(size) FROM blobs").fetchone()[0]
+    cache.close()
+
+
+@pytest.mark.parametrize("contenuto", [
+    lambda dati: dati[: len(dati) // 2],  # gzip troncato: EOFError
+    lambda dati: gzip.compress(b"\xff\xfe non utf-8"),  # UnicodeDecodeError
+])
+def test_truncated_or_undecodable_blob_is_dropped_and_fetched_again(tmp_path, server, profili, crea_scraper, contenuto):
+    cache = PageCache(str(tmp_path))
+    scraper = crea_scraper(cache=cache)
+    url = server.base_url + profili[0]
+    html = scraper.get_page(url, raise_errors=True)
+    digest = cache._db.execute("SELECT digest FROM pages WHERE url = ?", (url,)).fetchone()[0]
+    with open(cache._blob_path(digest), "rb") as f:
+        dati = f.read()
+    with open(cache._blob_path(digest), "wb") as f:
+        f.write(contenuto(dati))
+    assert cache.get(url) is None
+    assert cache._size == cache._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+    # La pagina viene scaricata di nuovo e torna in cache
+    assert scraper.get_page(url, raise_errors=True) == html
+    assert server.hits[profili[0]] == 2
+    assert cache.get(url).html == html
+    cache.close()
+
+
+def test_access_times_survive_close(tmp_path):
+    cache = PageCache(str(tmp_path), flush_accessi=1000)
+    cache.put(PROFILO, "<html>profilo</html>")
+    scritto = cache._db.execute("SELECT last_access FROM pages").fetchone()[0]
+    cache.get(PROFILO)
+    cache.close()
+    cache = PageCache(str(tmp_path))
+    assert cache._db.execute("SELECT last_access FROM pages").fetchone()[0] > scritto
+    cache.close()
+
+
+def test_stale_page_is_revalidated_with_etag(tmp_path, corpus, profili, crea_scraper):
+    with StandInServer(dict(corpus), etag=True) as server:
+        cache = PageCache(str(tmp_path), ttl={"giocatore": 0})
+        scraper = crea_scraper(cache=cache, base_url=server.base_url)
+        url = server.base_url + profili[0]
+        prima = scraper.get_page(url, raise_errors=True)
+        seconda = scraper.get_page(url, raise_errors=True)
+        assert seconda == prima
+        assert server.hits[profili[0]] == 2
+        assert server.not_modified == 1
+        assert cache.revalidated == 1
+        cache.close()
+
+
+def test_fresh_page_is_served_without_requests(tmp_path, server, profili, crea_scraper):
+    cache = PageCache(str(tmp_path))
+    scraper = crea_scraper(cache=cache)
+    url = server.base_url + profili[0]
+    assert scraper.get_page(url, raise_errors=True) == scraper.get_page(url, raise_errors=True)
+    assert server.hits[profili[0]] == 1
+    cache.close()
+
+
+def test_offline_mode_serves_stale_pages_and_raises_on_miss(tmp_path, server, profili, crea_scraper):
+    cache = PageCache(str(tmp_path), ttl={"giocatore": 0})
+    crea_scraper(cache=cache).get_page(server.base_url + profili[0], raise_errors=True)
+    cache.offline = True
+    scraper = crea_scraper(cache=cache)
+    assert scraper.get_page(server.base_url + profili[0], raise_errors=True)
+    with pytest.raises(CacheMissError):
+        scraper.get_page(server.base_url + profili[1], raise_errors=True)
+    assert server.hits == {profili[0]: 1}
+    cache.close()
@@ -0,0 +1,35 @@
+import pytest
+
+from src.scraping.parser_pool import ParserPool
+from src.utils.metrics import Metriche
+
+
+@pytest.fixture(scope="module")
+def parser_pool():
+    with ParserPool(processes=1) as pool:
+        yield pool
+
+
+def _conteggi(metriche, nome):
+    return {
+        istogramma["etichette"]["tipo"]: istogramma["conteggio"]
+        for istogramma in metriche.rapporto()["istogrammi"] if istogramma["nome"] == nome
+    }
+
+
+def test_pool_extracts_the_same_records_and_reports_the_worker_timings(server, crea_scraper, profili, parser_pool):
+    metriche = Metriche()
+    con_pool = crea_scraper(parser_pool=parser_pool, metriche=metriche)
+    senza_pool = crea_scraper(metriche=Metriche())
+    for percorso in profili[:3]:
+        assert con_pool.scrape_player_details(server.base_url + percorso) == senza_pool.scrape_player_details(server.base_url + percorso)
+    # Parsing ed estrazione avvengono nel processo, ma i loro tempi finiscono nelle metriche del run
+    assert _conteggi(metriche, "parse_secondi") == {"giocatore": 3}
+    assert _conteggi(metriche, "estrazione_secondi") == {"giocatore": 3, "giocatore_processo": 3}
+
+
+def test_page_not_fetched_keeps_the_player_id(server, crea_scraper, parser_pool):
+    scraper = crea_scraper(parser_pool=parser_pool, max_retries=0)
+    dettagli = scraper.scrape_player_details(f"{server.base_url}/sconosciuto/profil/spieler/999999")
+    assert dettagli["id_giocatore"] == "999999"
+    assert dettagli == crea_scraper(max_retries=0).scrape_player_details(f"{server.base_url}/sconosciuto/profil/spieler/999999")
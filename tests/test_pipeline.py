@@ -0,0 +1,42 @@
+import os
+
+import pandas as pd
+
+from benchmarks.corpus import competition_urls
+from src.processing.pipeline import ScrapingPipeline
+from src.processing.processing import scrape_and_save_players, scrape_and_save_teams
+
+STAGIONI = ["2023", "2024"]
+
+
+def _leggi_dati(cartella):
+    dati = {}
+    for radice, _, file in os.walk(os.path.join(cartella, "data", "raw")):
+        for nome in file:
+            percorso = os.path.join(radice, nome)
+            dati[os.path.relpath(percorso, cartella)] = pd.read_csv(percorso, dtype=str)
+    return dati
+
+
+def test_pipeline_writes_the_same_files_as_the_sequential_run(server, crea_scraper, tmp_path, monkeypatch):
+    campionati = competition_urls(server.base_url, {"serie a": "IT1"})
+
+    (tmp_path / "sequenziale").mkdir()
+    monkeypatch.chdir(tmp_path / "sequenziale")
+    scraper = crea_scraper()
+    for campionato in campionati.values():
+        for stagione in STAGIONI:
+            squadre = scrape_and_save_teams(scraper, campionato, stagione)
+            for _, team in squadre.iterrows():
+                scrape_and_save_players(scraper, team, campionato["nome"], stagione)
+
+    (tmp_path / "pipeline").mkdir()
+    monkeypatch.chdir(tmp_path / "pipeline")
+    ScrapingPipeline(crea_scraper(), workers_dettagli=4).esegui(campionati, STAGIONI)
+
+    sequenziale, pipeline = _leggi_dati(tmp_path / "sequenziale"), _leggi_dati(tmp_path / "pipeline")
+    # Due stagioni da due squadre: squadre.csv, giocatori.csv e informazioni_giocatori.csv di ogni squadra
+    assert len(sequenziale) == 2 * (1 + 2 * 2)
+    assert sorted(pipeline) == sorted(sequenziale)
+    for percorso, atteso in sequenziale.items():
+        pd.testing.assert_frame_equal(pipeline[percorso], atteso, obj=percorso)
@@ -0,0 +1,37 @@
+import pytest
+from bs4 import BeautifulSoup
+
+from benchmarks.bench_parse_player import FIXTURE, estrazione_per_etichetta
+from src.scraping.scraper import TransfermarktScraper
+from src.utils.scraper_utils import INFO_TABLE_LABELS, INFO_TABLE_SPEC, build_label_index, find_label_content, label_text
+
+
+def _pagine(corpus, profili):
+    with open(FIXTURE, encoding="utf-8") as f:
+        yield f.read()
+    for percorso in profili[:5]:
+        pagina = corpus[percorso]
+        yield pagina.decode("utf-8") if isinstance(pagina, bytes) else pagina
+
+
+def test_label_index_matches_the_label_by_label_scan(corpus, profili):
+    for html in _pagine(corpus, profili):
+        info_table = BeautifulSoup(html, "html.parser").select_one("div.info-table.info-table--right-space")
+        labels = build_label_index(info_table, INFO_TABLE_LABELS)
+        for campo, etichetta in INFO_TABLE_SPEC:
+            if campo != "nazionalita":
+                assert label_text(labels, campo) == find_label_content(info_table, etichetta), campo
+        assert label_text(labels, "nato_il")
+
+
+@pytest.mark.parametrize("campo", [
+    "nome", "cognome", "luogo_nascita", "posizione", "piede", "squadra_attuale", "in_rosa_da",
+    "scadenza", "nazionalità", "ruolo_naturale", "altri_ruoli", "valore_attuale", "valore_piu_alto",
+])
+def test_player_details_match_the_previous_extraction(corpus, profili, campo):
+    scraper = TransfermarktScraper()
+    for html in _pagine(corpus, profili):
+        soup = BeautifulSoup(html, "html.parser")
+        attesi = estrazione_per_etichetta(soup)
+        # Il parser lascia None, non una lista vuota, quando non ci sono altri ruoli
+        assert scraper.parse_player_details(soup)[campo] == (attesi.get(campo) or None)
@@ -0,0 +1,66 @@
+import threading
+
+import pytest
+import requests
+
+from src.scraping.player_registry import PlayerRegistry
+from src.utils.work_queue import WorkQueue
+
+
+def test_concurrent_requests_fetch_the_profile_once(server, profili, crea_scraper):
+    registro = PlayerRegistry(crea_scraper())
+    url = server.base_url + profili[0]
+    record = []
+
+    def chiedi():
+        record.append(registro.get(url, raise_errors=True))
+
+    threads = [threading.Thread(target=chiedi) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert server.hits == {profili[0]: 1}
+    assert (registro.fetched, registro.shared) == (1, 7)
+    assert len({r["cognome"] for r in record}) == 1
+    # Ogni chiamante riceve una copia che può completare per conto suo
+    record[0]["cognome"] = "modificato"
+    assert registro.get(url)["cognome"] != "modificato"
+
+
+def test_profile_is_keyed_on_the_player_id(server, profili, crea_scraper):
+    registro = PlayerRegistry(crea_scraper())
+    percorso = profili[0]
+    registro.get(server.base_url + percorso, raise_errors=True)
+    # Stesso id con slug diverso (la pagina non esiste sul sito di prova): nessuna nuova richiesta
+    altro_slug = "/altro-nome" + percorso[percorso.index("/profil/"):]
+    assert registro.get(server.base_url + altro_slug, raise_errors=True)["cognome"]
+    assert sum(server.hits.values()) == 1
+
+
+def test_failed_profile_is_fetched_again(server, crea_scraper):
+    registro = PlayerRegistry(crea_scraper())
+    url = server.base_url + "/assente/profil/spieler/999999"
+    with pytest.raises(requests.HTTPError):
+        registro.get(url, raise_errors=True)
+    assert registro.get(url)["id_giocatore"] == "999999"
+    assert server.hits["/assente/profil/spieler/999999"] == 2
+
+
+def test_complete_fetches_only_when_required_fields_are_missing(server, profili, crea_scraper):
+    registro = PlayerRegistry(crea_scraper())
+    link = server.base_url + profili[0]
+    completo = registro.complete({"link": link, "nome": "Mario", "cognome": "Rossi"}, required_fields=["nome", "cognome"])
+    assert completo["cognome"] == "Rossi" and not server.hits
+    completo = registro.complete({"link": link, "nome": "Mario"}, required_fields=["nome", "luogo_nascita"])
+    assert completo["luogo_nascita"] and server.hits == {profili[0]: 1}
+
+
+def test_profiles_are_shared_between_registries_through_the_queue(tmp_path, server, profili, crea_scraper):
+    percorso = str(tmp_path / "coda.sqlite")
+    primo = PlayerRegistry(crea_scraper(), condivisi=WorkQueue(percorso))
+    secondo = PlayerRegistry(crea_scraper(), condivisi=WorkQueue(percorso))
+    url = server.base_url + profili[0]
+    assert primo.get(url, raise_errors=True).to_dict() == secondo.get(url, raise_errors=True).to_dict()
+    assert server.hits == {profili[0]: 1}
+    assert (secondo.fetched, secondo.shared) == (0, 1)
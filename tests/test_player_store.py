@@ -0,0 +1,61 @@
+import pandas as pd
+
+from benchmarks.corpus import competition_urls
+from src.processing.pipeline import ScrapingPipeline
+from src.utils.player_store import PlayerStore
+
+STAGIONI = ["2023", "2024"]
+
+
+def _archivio_dalla_pipeline(server, crea_scraper, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    archivio = PlayerStore(str(tmp_path / "giocatori.sqlite"))
+    ScrapingPipeline(crea_scraper(), workers_dettagli=4, archivio=archivio).esegui(
+        competition_urls(server.base_url, {"serie a": "IT1"}), STAGIONI
+    )
+    return archivio
+
+
+def test_cerca_matches_filtering_the_whole_table(server, crea_scraper, tmp_path, monkeypatch):
+    archivio = _archivio_dalla_pipeline(server, crea_scraper, tmp_path, monkeypatch)
+    squadre = archivio.squadre()
+    assert len(squadre) == 2 * len(STAGIONI)
+    assert set(squadre["giocatori"]) == {10}
+
+    tutti = archivio.sql("SELECT * FROM giocatori")
+    assert len(tutti) == 10 * len(squadre)
+    # Colonne tipizzate: valori in euro, età intere
+    assert tutti["valore_attuale"].dropna().gt(100_000).all()
+    soglia = tutti["valore_attuale"].median()
+    risultato = archivio.cerca(campionato="serie a", stagione="2024", eta_max=30, valore_max=soglia)
+    attesi = tutti[
+        (tutti["stagione"] == "2024") & (tutti["età"] <= 30) & (tutti["valore_attuale"] <= soglia)
+    ].sort_values("valore_attuale", ascending=False, kind="stable")
+    assert len(risultato) > 0
+    assert list(risultato["id_giocatore"]) == list(attesi["id_giocatore"])
+    assert list(risultato["valore_attuale"]) == sorted(risultato["valore_attuale"], reverse=True)
+    assert all(isinstance(nazioni, list) for nazioni in risultato["nazionalità"])
+
+    id_giocatore = int(risultato["id_giocatore"].iloc[0])
+    assert set(archivio.giocatore(id_giocatore)["id_giocatore"]) == {id_giocatore}
+    archivio.chiudi()
+
+
+def test_salva_giocatori_replaces_only_the_given_team(server, crea_scraper, tmp_path, monkeypatch):
+    archivio = _archivio_dalla_pipeline(server, crea_scraper, tmp_path, monkeypatch)
+    prima = archivio.sql("SELECT * FROM giocatori")
+    squadra = prima["squadra"].iloc[0]
+    righe = prima[(prima["stagione"] == "2024") & (prima["squadra"] == squadra)].head(2)
+
+    archivio.salva_giocatori(righe.drop(columns=["ordine"]))
+    dopo = archivio.sql("SELECT * FROM giocatori")
+    sostituita = (dopo["stagione"] == "2024") & (dopo["squadra"] == squadra)
+    assert list(dopo[sostituita]["id_giocatore"]) == list(righe["id_giocatore"])
+    # Le altre squadre, e la stessa squadra nelle altre stagioni, non cambiano
+    altre = (prima["stagione"] != "2024") | (prima["squadra"] != squadra)
+    pd.testing.assert_frame_equal(
+        dopo[~sostituita].reset_index(drop=True), prima[altre].reset_index(drop=True)
+    )
+    squadre = archivio.squadre(stagione="2024").set_index("squadra")
+    assert squadre.loc[squadra, "giocatori"] == 2
+    archivio.chiudi()
@@ -0,0 +1,75 @@
+import os
+
+import pandas as pd
+
+from benchmarks.corpus import POSIZIONI, competition_urls
+from src.processing.pipeline import ScrapingPipeline
+from src.processing.post_processing import carica_ordine_posizioni, cartelle_squadre, order_positions
+
+STAGIONI = ["2023", "2024"]
+# Come sul profilo ("Difesa - Terzino destro"); l'ala destra manca dal file e i suoi giocatori vanno in fondo
+ORDINE = {
+    ruolo if ruolo == macro else f"{macro} - {ruolo}": ordine
+    for ordine, (ruolo, macro) in enumerate(POSIZIONI) if ruolo != "Ala destra"
+}
+
+
+def _scrivi_posizioni(cartella):
+    os.makedirs(cartella / "data", exist_ok=True)
+    pd.DataFrame({"posizione": list(ORDINE), "ordine": list(ORDINE.values())}).to_csv(
+        cartella / "data" / "posizioni.csv", index=False
+    )
+
+
+def _file_squadre(campionati):
+    return {percorso: pd.read_csv(percorso, dtype=str, keep_default_na=False)
+            for _, percorso in cartelle_squadre(campionati, STAGIONI)}
+
+
+def test_order_positions_sorts_every_team_file(server, crea_scraper, tmp_path, monkeypatch):
+    campionati = competition_urls(server.base_url, {"serie a": "IT1"})
+    monkeypatch.chdir(tmp_path)
+    ScrapingPipeline(crea_scraper(), workers_dettagli=4).esegui(campionati, STAGIONI)
+    _scrivi_posizioni(tmp_path)
+    prima = _file_squadre(campionati)
+
+    order_positions(campionati, STAGIONI)
+    dopo = _file_squadre(campionati)
+    assert len(dopo) == 2 * len(STAGIONI)
+    assert any(list(giocatori["posizione"]) != list(prima[percorso]["posizione"]) for percorso, giocatori in dopo.items())
+    assert any("Attacco - Ala destra" in set(giocatori["posizione"]) for giocatori in dopo.values())
+    for percorso, giocatori in dopo.items():
+        # Stesse righe e stesse colonne, solo in un altro ordine
+        assert list(giocatori.columns) == list(prima[percorso].columns)
+        pd.testing.assert_frame_equal(
+            giocatori.sort_values(list(giocatori.columns)).reset_index(drop=True),
+            prima[percorso].sort_values(list(giocatori.columns)).reset_index(drop=True),
+        )
+        ordini = [ORDINE.get(posizione, len(POSIZIONI)) for posizione in giocatori["posizione"]]
+        assert ordini == sorted(ordini), percorso
+
+    # I file già ordinati non vengono riscritti
+    modificati = {percorso: os.stat(percorso).st_mtime_ns for percorso in dopo}
+    order_positions(campionati, STAGIONI)
+    assert {percorso: os.stat(percorso).st_mtime_ns for percorso in dopo} == modificati
+
+
+def test_sink_writes_the_same_order_as_order_positions(server, crea_scraper, tmp_path, monkeypatch):
+    campionati = competition_urls(server.base_url, {"serie a": "IT1"})
+    for cartella in ("dopo", "sink"):
+        (tmp_path / cartella).mkdir()
+        _scrivi_posizioni(tmp_path / cartella)
+
+    monkeypatch.chdir(tmp_path / "dopo")
+    ScrapingPipeline(crea_scraper(), workers_dettagli=4).esegui(campionati, STAGIONI)
+    order_positions(campionati, STAGIONI)
+    attesi = _file_squadre(campionati)
+
+    monkeypatch.chdir(tmp_path / "sink")
+    ScrapingPipeline(crea_scraper(), workers_dettagli=4, ordine_posizioni=carica_ordine_posizioni()).esegui(
+        campionati, STAGIONI
+    )
+    ottenuti = _file_squadre(campionati)
+    assert sorted(ottenuti) == sorted(attesi)
+    for percorso, giocatori in attesi.items():
+        pd.testing.assert_frame_equal(ottenuti[percorso], giocatori, obj=percorso)
@@ -0,0 +1,54 @@
+import threading
+import time
+
+import pytest
+
+from src.utils.rate_limiter import TokenBucket
+
+
+def test_rejects_non_positive_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+def test_spaces_requests_at_the_configured_rate():
+    bucket = TokenBucket(rate=20)
+    inizio = time.monotonic()
+    for _ in range(11):
+        bucket.acquire()
+    # Il primo token è disponibile subito, gli altri 10 arrivano a 20 al secondo
+    assert 0.45 <= time.monotonic() - inizio < 1.5
+
+
+def test_burst_up_to_capacity_then_rate():
+    bucket = TokenBucket(rate=10, capacity=5)
+    assert [bucket.reserve() for _ in range(5)] == [0.0] * 5
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.02)
+
+
+def test_rate_is_shared_by_concurrent_threads():
+    bucket = TokenBucket(rate=40)
+    attese = []
+
+    def lavora():
+        for _ in range(5):
+            attese.append(bucket.acquire())
+
+    threads = [threading.Thread(target=lavora) for _ in range(4)]
+    inizio = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 20 richieste da 4 thread: 19 intervalli di 1/40 s, non 4 volte il ritmo
+    assert 0.45 <= time.monotonic() - inizio < 1.5
+
+
+def test_scraper_requests_follow_the_bucket(server, profili, crea_scraper):
+    scraper = crea_scraper(rate_limiter=TokenBucket(rate=25))
+    url = [server.base_url + percorso for percorso in profili[:11]]
+    inizio = time.monotonic()
+    dettagli = [record for _, record in scraper.iter_player_details(url, max_in_flight=8)]
+    assert 0.38 <= time.monotonic() - inizio
+    assert len(dettagli) == 11
+    assert sum(server.hits.values()) == 11
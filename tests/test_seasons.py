@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+
+import pandas as pd
+
+from benchmarks.corpus import competition_urls
+from src.processing.pipeline import ScrapingPipeline
+from src.utils.scraper_utils import competition_season_url, team_season_url
+from src.utils.seasons import seasons_with_backfill
+
+
+def test_season_urls():
+    assert competition_season_url("https://x/serie-a/startseite/wettbewerb/IT1", "2023") == (
+        "https://x/serie-a/startseite/wettbewerb/IT1/plus/?saison_id=2023"
+    )
+    # Una stagione già presente viene sostituita
+    assert competition_season_url("https://x/serie-a/startseite/wettbewerb/IT1/plus/?saison_id=2024", "2023") == (
+        "https://x/serie-a/startseite/wettbewerb/IT1/plus/?saison_id=2023"
+    )
+    assert team_season_url("https://x/inter/startseite/verein/46/", "2023") == "https://x/inter/startseite/verein/46/saison_id/2023"
+    assert team_season_url("https://x/inter/startseite/verein/46/saison_id/2024", "2023") == (
+        "https://x/inter/startseite/verein/46/saison_id/2023"
+    )
+
+
+def test_seasons_with_backfill():
+    assert seasons_with_backfill(["2024"], 0) == ["2024"]
+    assert seasons_with_backfill(["2023", "2024"], 2) == ["2024", "2023", "2022", "2021"]
+    assert seasons_with_backfill([2024, "2024"], 1) == ["2024", "2023"]
+    assert seasons_with_backfill([], 3) == []
+
+
+def test_backfill_scrapes_each_season_roster_and_each_profile_once(server, crea_scraper, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    campionati = competition_urls(server.base_url, {"serie a": "IT1"})
+    stagioni = seasons_with_backfill(["2024"], 1)
+    ScrapingPipeline(crea_scraper(), workers_dettagli=4).esegui(campionati, stagioni)
+
+    scraper = crea_scraper()
+    giocatori = {}
+    for stagione in stagioni:
+        squadre = pd.read_csv(tmp_path / "data" / "raw" / "serie a" / stagione / "squadre.csv", dtype=str)
+        assert all(link.endswith(f"/saison_id/{stagione}") for link in squadre["link"])
+        for _, squadra in squadre.iterrows():
+            salvati = pd.read_csv(tmp_path / "data" / "raw" / "serie a" / stagione / squadra["name"] / "giocatori.csv", dtype=str)
+            # La rosa salvata è quella della stagione, non quella corrente (senza i link ripetuti della pagina)
+            rosa = scraper.scrape_players(team_season_url(squadra["link"], stagione))
+            assert list(salvati["link"]) == list(dict.fromkeys(giocatore["link"] for giocatore in rosa))
+            giocatori[(stagione, squadra["name"])] = set(salvati["link"])
+    assert any(giocatori[("2023", squadra)] != giocatori[("2024", squadra)] for _, squadra in giocatori)
+
+    # Ogni profilo viene richiesto una sola volta, anche se il giocatore è in entrambe le stagioni
+    profili = {percorso: n for percorso, n in server.hits.items() if "/profil/spieler/" in percorso}
+    assert len(profili) == len(set().union(*giocatori.values()))
+    assert set(profili.values()) == {1}
+
+
+def test_fast_commands_do_not_import_the_scraper():
+    # I moduli dei comandi order, export e delta, importati in un interprete nuovo
+    codice = (
+        "import sys, main\n"
+        "import src.processing.post_processing, src.processing.normalization, src.utils.save_utils, src.utils.change_feed\n"
+        "main.seleziona_stagioni(None)\n"
+        "print(sorted(m for m in ('bs4', 'requests', 'src.scraping.scraper') if m in sys.modules))"
+    )
+    radice = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    uscita = subprocess.run([sys.executable, "-c", codice], cwd=radice, capture_output=True, text=True, check=True)
+    assert uscita.stdout.strip() == "[]"
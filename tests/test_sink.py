@@ -0,0 +1,120 @@
+import csv
+import os
+import threading
+import time
+
+import pytest
+
+from src.processing.sink import DettagliSink
+from src.utils.save_utils import _scrivi_atomico, carica_dataset
+
+
+def _leggi(cartella):
+    with open(os.path.join(cartella, "informazioni_giocatori.csv"), encoding="utf-8", newline="") as f:
+        return list(csv.reader(f))
+
+
+def _riga(indice):
+    return {"id_giocatore": str(indice), "nome": f"Nome{indice}", "cognome": f"Cognome{indice}"}
+
+
+def test_team_file_is_written_once_in_roster_order(tmp_path):
+    cartella = str(tmp_path / "squadra")
+    completate = []
+    with DettagliSink(colonne=["id_giocatore", "nome", "cognome"], al_completamento=lambda c, s: completate.append((c, s))) as sink:
+        sink.attendi_squadra(cartella, 4)
+        for indice in (3, 0, 2):
+            sink.scrivi(cartella, indice, _riga(indice))
+        sink.scarta(cartella, 1)
+        deadline = time.monotonic() + 2
+        while not completate and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # La squadra è completa: il file c'è già prima della chiusura del sink
+        assert completate == [(cartella, 1)]
+        assert _leggi(cartella) == [["id_giocatore", "nome", "cognome"], ["0", "Nome0", "Cognome0"],
+                                    ["2", "Nome2", "Cognome2"], ["3", "Nome3", "Cognome3"]]
+    assert (sink.file_scritti, sink.righe_scritte) == (1, 3)
+
+
+def test_team_whose_file_cannot_be_written_is_not_reported_complete(tmp_path):
+    # La cartella della squadra sta sotto un file: la scrittura non può riuscire
+    (tmp_path / "file").write_text("")
+    cartella = str(tmp_path / "file" / "squadra")
+    completate = []
+    with DettagliSink(colonne=["id_giocatore", "nome", "cognome"], al_completamento=lambda c, s: completate.append((c, s))) as sink:
+        sink.attendi_squadra(cartella, 2)
+        for indice in range(2):
+            sink.scrivi(cartella, indice, _riga(indice))
+    assert completate == []
+    assert (sink.file_scritti, sink.righe_scritte) == (0, 0)
+
+
+def test_concurrent_writers_produce_whole_files(tmp_path):
+    squadre = [str(tmp_path / f"squadra{numero}") for numero in range(4)]
+    with DettagliSink(colonne=["id_giocatore", "nome", "cognome"]) as sink:
+        for cartella in squadre:
+            sink.attendi_squadra(cartella, 25)
+
+        def lavora(cartella, resto):
+            for indice in reversed(range(resto, 25, 2)):
+                sink.scrivi(cartella, indice, _riga(indice))
+
+        # Due thread per squadra, con le righe pari e dispari in ordine inverso
+        threads = [threading.Thread(target=lavora, args=(cartella, resto)) for cartella in squadre for resto in (0, 1)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    for cartella in squadre:
+        righe = _leggi(cartella)
+        assert righe[0] == ["id_giocatore", "nome", "cognome"]
+        assert [riga[0] for riga in righe[1:]] == [str(indice) for indice in range(25)]
+        assert not [nome for nome in os.listdir(cartella) if nome.endswith(".tmp")]
+
+
+def test_incomplete_team_is_flushed_periodically_and_at_close(tmp_path):
+    cartella = str(tmp_path / "squadra")
+    with DettagliSink(colonne=["id_giocatore"], intervallo_flush=0.05) as sink:
+        sink.attendi_squadra(cartella, 3)
+        sink.scrivi(cartella, 0, _riga(0))
+        deadline = time.monotonic() + 2
+        while not os.path.exists(os.path.join(cartella, "informazioni_giocatori.csv")) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert _leggi(cartella) == [["id_giocatore"], ["0"]]
+        sink.scrivi(cartella, 1, _riga(1))
+    assert _leggi(cartella) == [["id_giocatore"], ["0"], ["1"]]
+
+
+def test_atomic_write_keeps_the_previous_file_on_errors(tmp_path):
+    percorso = str(tmp_path / "informazioni_giocatori.csv")
+    with open(percorso, "w") as f:
+        f.write("id_giocatore\n1\n")
+
+    def scrivi_a_meta(tmp):
+        with open(tmp, "w") as f:
+            f.write("id_gioc")
+        raise OSError("disco pieno")
+
+    with pytest.raises(OSError):
+        _scrivi_atomico(percorso, scrivi_a_meta)
+    with open(percorso) as f:
+        assert f.read() == "id_giocatore\n1\n"
+    assert os.listdir(tmp_path) == ["informazioni_giocatori.csv"]
+
+
+def test_dataset_keeps_teams_not_written_in_this_run(tmp_path):
+    dataset = str(tmp_path / "dataset")
+
+    def esegui(squadre):
+        with DettagliSink(colonne=["id_giocatore", "nome"], cartella_dataset=dataset) as sink:
+            for squadra, giocatori in squadre:
+                cartella = str(tmp_path / "raw" / squadra)
+                sink.attendi_squadra(cartella, len(giocatori), {"campionato": "serie a", "stagione": "2024", "squadra": squadra})
+                for indice, id_giocatore in enumerate(giocatori):
+                    sink.scrivi(cartella, indice, _riga(id_giocatore))
+
+    esegui([("Inter", [1, 2]), ("Milan", [3])])
+    # Secondo run: il Milan non viene scaricato e resta com'era
+    esegui([("Inter", [4])])
+    df = carica_dataset(dataset).sort_values("id_giocatore")
+    assert df[["squadra", "id_giocatore"]].values.tolist() == [["Milan", 3], ["Inter", 4]]
@@ -0,0 +1,36 @@
+from src.scraping.scraper import SQUAD_FIELDS
+from src.utils.scraper_utils import split_player_name
+
+
+def _prima_squadra(server, scraper):
+    return scraper.scrape_teams(f"{server.base_url}/serie-a/startseite/wettbewerb/IT1")[0]
+
+
+def test_detailed_roster_matches_the_profiles_in_one_request(server, crea_scraper):
+    scraper = crea_scraper()
+    squadra = _prima_squadra(server, scraper)
+    richieste = sum(server.hits.values())
+    rosa = scraper.scrape_squad(squadra["link"])
+    # Una sola pagina (la rosa dettagliata) per tutti i giocatori della squadra
+    assert sum(server.hits.values()) == richieste + 1
+    assert len(rosa) == 10
+    assert len({giocatore["id_giocatore"] for giocatore in rosa}) == 10
+    for giocatore in rosa[:3]:
+        profilo = scraper.scrape_player_details(giocatore["link"])
+        # Il numero di maglia della rosa generata non coincide con quello del profilo
+        for campo in set(SQUAD_FIELDS) - {"numero_maglia"}:
+            assert giocatore[campo] == profilo[campo], campo
+
+
+def test_missing_fields_are_completed_from_the_profile(server, crea_scraper):
+    scraper = crea_scraper()
+    giocatore = scraper.scrape_squad(_prima_squadra(server, scraper)["link"])[0]
+    assert giocatore["luogo_nascita"] is None
+    assert scraper.complete_player_details(giocatore)["luogo_nascita"] is None
+    completo = scraper.complete_player_details(giocatore, SQUAD_FIELDS + ["luogo_nascita"])
+    assert completo["luogo_nascita"] and completo["cognome"] == giocatore["cognome"]
+
+
+def test_split_player_name():
+    assert split_player_name("Nicolò Barella") == {"nome": "Nicolò", "cognome": "Barella"}
+    assert split_player_name("Pelé")["cognome"] == "Pelé"
@@ -0,0 +1,60 @@
+import pandas as pd
+
+from benchmarks.corpus import competition_urls
+from src.processing.processing import iter_giocatori, iter_squadre, scrape_streaming
+from src.processing.sink import DettagliSink
+from src.utils.scraper_utils import player_id
+from src.utils.streaming import mappa_limitata
+
+STAGIONI = ["2023", "2024"]
+
+
+def _richieste(server, frammento):
+    return sum(n for percorso, n in server.hits.items() if frammento in percorso)
+
+
+def test_generators_only_fetch_what_the_consumer_reaches(server, crea_scraper, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    scraper = crea_scraper()
+    squadre = iter_squadre(scraper, competition_urls(server.base_url, {"serie a": "IT1"}), STAGIONI)
+    righe = iter_giocatori(scraper, squadre, max_in_corso=3)
+    prima = next(righe)
+    assert prima.indice == 0 and prima.giocatori_squadra == 10 and prima.dettagli is not None
+    # Una sola competizione e una sola rosa lette; al più max_in_corso profili oltre a quello consegnato
+    assert _richieste(server, "/startseite/wettbewerb/") == 1
+    assert _richieste(server, "/startseite/verein/") == 1
+    assert 1 <= _richieste(server, "/profil/spieler/") <= 4
+    righe.close()
+
+
+def test_scrape_streaming_writes_every_team_in_roster_order(server, crea_scraper, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with DettagliSink() as sink:
+        inviate = scrape_streaming(
+            crea_scraper(), competition_urls(server.base_url, {"serie a": "IT1"}), STAGIONI, sink, max_in_corso=4
+        )
+    assert inviate == 10 * 2 * len(STAGIONI)
+    assert sink.file_scritti == 2 * len(STAGIONI)
+    for cartella in (tmp_path / "data" / "raw" / "serie a").glob("*/*/"):
+        giocatori = pd.read_csv(cartella / "giocatori.csv", dtype=str)
+        dettagli = pd.read_csv(cartella / "informazioni_giocatori.csv", dtype=str)
+        assert list(dettagli["id_giocatore"]) == [player_id(link) for link in giocatori["link"]]
+
+
+def test_mappa_limitata_pulls_items_lazily():
+    estratti = []
+
+    def elementi():
+        for i in range(100):
+            estratti.append(i)
+            yield i
+
+    def quadrato(i):
+        return i * i
+
+    risultati = mappa_limitata(quadrato, elementi(), max_in_corso=4)
+    assert [next(risultati) for _ in range(5)] == [(i, i * i) for i in range(5)]
+    # Solo gli elementi già consumati più quelli in corso sono stati estratti dal generatore
+    assert len(estratti) <= 5 + 4
+    risultati.close()
+    assert sorted(r for _, r in mappa_limitata(quadrato, range(20), max_in_corso=3, ordinato=False)) == [i * i for i in range(20)]
@@ -0,0 +1,144 @@
+import time
+
+from src.processing.distributed import WorkerCoda
+from src.utils.work_queue import STATO_FALLITO, STATO_FATTO, STATO_IN_CODA, WorkQueue
+
+
+def _stato(coda, chiave):
+    return coda._db.execute("SELECT stato FROM lavori WHERE chiave = ?", (chiave,)).fetchone()[0]
+
+
+def test_duplicate_keys_are_ignored(tmp_path):
+    coda = WorkQueue(str(tmp_path / "coda.sqlite"))
+    assert coda.aggiungi("squadra", "a", {"nome": "A"})
+    assert not coda.aggiungi("squadra", "a", {"nome": "altro"})
+    assert coda.prendi("w1").dati == {"nome": "A"}
+    assert coda.prendi("w2") is None
+    coda.chiudi()
+
+
+def test_expired_lease_is_claimed_by_another_worker(tmp_path):
+    coda = WorkQueue(str(tmp_path / "coda.sqlite"), visibilita=0.2)
+    coda.aggiungi("giocatore", "g")
+    primo = coda.prendi("w1")
+    assert coda.prendi("w2") is None
+    time.sleep(0.25)
+    secondo = coda.prendi("w2")
+    assert secondo.chiave == "g" and secondo.tentativi == 2
+    # Il primo worker ha perso il lease: il suo risultato viene scartato
+    assert not coda.completa(primo, "w1", {"da": "w1"})
+    assert not coda.fallisci(primo, "w1", "errore")
+    assert coda.completa(secondo, "w2", {"da": "w2"})
+    assert coda._db.execute("SELECT risultato FROM lavori").fetchone()[0] == '{"da": "w2"}'
+    assert coda.vuota()
+    coda.chiudi()
+
+
+def test_rinnova_keeps_the_lease(tmp_path):
+    coda = WorkQueue(str(tmp_path / "coda.sqlite"), visibilita=0.2)
+    coda.aggiungi("giocatore", "g")
+    lavoro = coda.prendi("w1")
+    for _ in range(3):
+        time.sleep(0.1)
+        assert coda.rinnova(lavoro, "w1")
+    assert coda.prendi("w2") is None
+    assert coda.completa(lavoro, "w1")
+    coda.chiudi()
+
+
+def test_failed_item_is_retried_then_marked_failed(tmp_path):
+    coda = WorkQueue(str(tmp_path / "coda.sqlite"), max_tentativi=2)
+    coda.aggiungi("giocatore", "g")
+    assert coda.fallisci(coda.prendi("w1"), "w1", "503", attesa=0)
+    assert _stato(coda, "g") == STATO_IN_CODA
+    assert coda.fallisci(coda.prendi("w1"), "w1", "503", attesa=0)
+    assert _stato(coda, "g") == STATO_FALLITO
+    assert coda.prendi("w1") is None
+    assert coda.vuota()
+    coda.chiudi()
+
+
+def test_retry_waits_for_the_backoff(tmp_path):
+    coda = WorkQueue(str(tmp_path / "coda.sqlite"))
+    coda.aggiungi("giocatore", "g")
+    coda.fallisci(coda.prendi("w1"), "w1", "503", attesa=0.2)
+    assert coda.prendi("w1") is None
+    time.sleep(0.25)
+    assert coda.prendi("w1").tentativi == 2
+    coda.chiudi()
+
+
+def test_lease_expired_max_tentativi_times_marks_the_item_failed(tmp_path):
+    coda = WorkQueue(str(tmp_path / "coda.sqlite"), visibilita=0.1, max_tentativi=2)
+    coda.aggiungi("giocatore", "g")
+    for worker in ("w1", "w2"):
+        assert coda.prendi(worker) is not None
+        time.sleep(0.15)
+    # Entrambi i worker sono caduti sul lavoro: non viene preso una terza volta
+    assert coda.prendi("w3") is None
+    assert _stato(coda, "g") == STATO_FALLITO
+    coda.chiudi()
+
+
+def test_follow_up_is_queued_when_all_children_are_done(tmp_path):
+    coda = WorkQueue(str(tmp_path / "coda.sqlite"), max_tentativi=1)
+    coda.aggiungi("squadra", "s", {"nome": "S"}, al_completamento="salva")
+    squadra = coda.prendi("w1")
+    figli = [{"tipo": "giocatore", "chiave": f"g{indice}", "dati": {"indice": indice}, "priorita": 1} for indice in range(3)]
+    coda.completa(squadra, "w1", figli=figli)
+    giocatori = [coda.prendi("w1") for _ in range(3)]
+    coda.completa(giocatori[0], "w1", {"riga": 0})
+    coda.fallisci(giocatori[1], "w1", "404")
+    assert coda.prendi("w1") is None
+    coda.completa(giocatori[2], "w1", {"riga": 2})
+    salva = coda.prendi("w1")
+    assert (salva.tipo, salva.dati) == ("salva", {"nome": "S"})
+    assert coda.risultati("s") == [
+        ({"indice": 0}, {"riga": 0}, STATO_FATTO),
+        ({"indice": 1}, None, STATO_FALLITO),
+        ({"indice": 2}, {"riga": 2}, STATO_FATTO),
+    ]
+    coda.chiudi()
+
+
+def test_shared_values_and_parameters_are_cleared_by_svuota(tmp_path):
+    percorso = str(tmp_path / "coda.sqlite")
+    coda, altra = WorkQueue(percorso), WorkQueue(percorso)
+    coda.imposta_parametri({"base_url": "http://127.0.0.1"})
+    coda.condividi("profilo:1", {"cognome": "Rossi"})
+    coda.condividi("profilo:1", {"cognome": "Bianchi"})
+    assert altra.condiviso("profilo:1") == {"cognome": "Rossi"}
+    assert altra.parametri() == {"base_url": "http://127.0.0.1"}
+    coda.svuota()
+    assert altra.condiviso("profilo:1") is None and altra.parametri() == {}
+    coda.chiudi()
+    altra.chiudi()
+
+
+class _Lento(WorkerCoda):
+    """
+    WorkerCoda con un solo tipo di lavoro che dura più della visibilità del lease
+    e un thread in più dei lavori, pronto a riprendere un lease scaduto.
+    """
+
+    def __init__(self, coda, durata):
+        super().__init__(coda, scraper=None, thread=3, attesa=0.05)
+        self._gestori = {"lento": self._lento}
+        self.durata = durata
+
+    def _lento(self, lavoro):
+        time.sleep(self.durata)
+        return {"chiave": lavoro.chiave}, ()
+
+
+def test_lease_is_renewed_while_the_item_runs(tmp_path):
+    coda = WorkQueue(str(tmp_path / "coda.sqlite"), visibilita=0.3)
+    for indice in range(2):
+        coda.aggiungi("lento", f"lavoro-{indice}")
+    worker = _Lento(coda, durata=1.0)
+    assert worker.esegui() == {"lento": 2}
+    assert worker.lease_persi == 0
+    assert coda.conteggi() == {("lento", STATO_FATTO): 2}
+    # Nessun lavoro è stato preso una seconda volta alla scadenza del lease
+    assert coda._db.execute("SELECT MAX(tentativi) FROM lavori").fetchone()[0] == 1
+    coda.chiudi()